@@ -0,0 +1,202 @@
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from models import WoWPlayer, WoWGroup
+from roster_generator import ROLE_MIXES, generateRoster
+from engine import ANYTIME, EXACT, GREEDY, OPTIMAL, GroupEngine
+import group_creator
+import sampling
+import scoring
+
+# Times every group creation engine over synthetic rosters, from a handful of
+# players up to 10,000, and reports throughput, latency percentiles and peak
+# memory. Run it before deploying and compare against a saved baseline:
+#
+#   python benchmark.py --json baseline.json
+#   python benchmark.py --baseline baseline.json
+
+DEFAULT_SIZES = [5, 25, 100, 1000, 10000]
+
+# Every case runs at least MIN_RUNS times, then keeps going until MIN_TIME
+# seconds have passed or it has run MAX_RUNS times
+MIN_RUNS = 3
+MIN_TIME = 0.5
+MAX_RUNS = 1000
+
+# How much slower than the baseline p50 a case may get before it counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+
+# An engine is run with the roster, a seed and a stats dict it may fill in,
+# like stats['phases'] from create_mythic_plus_groups
+@dataclass
+class Engine:
+    name: str
+    run: Callable[[List[WoWPlayer], int, dict], List[WoWGroup]]
+    # Rosters bigger than this take too long to be worth timing
+    maxPlayers: Optional[int] = None
+
+
+def _parallel(mode: str) -> Callable[[List[WoWPlayer], int, dict], List[WoWGroup]]:
+    def run(players: List[WoWPlayer], seed: int, stats: dict) -> List[WoWGroup]:
+        return GroupEngine(mode=mode, seed=seed).solve(players, stats=stats)
+    return run
+
+
+def _sampled(players: List[WoWPlayer], seed: int, stats: dict) -> List[WoWGroup]:
+    return sampling.sample_mythic_plus_groups(players, samples=4, workers=0, seed=seed, engine=GroupEngine()).groups
+
+
+# Add new engines here to have them benchmarked
+ENGINES: Dict[str, Engine] = {engine.name: engine for engine in [
+    Engine('group_creator', lambda players, seed, stats: group_creator.create_mythic_plus_groups(players),
+           maxPlayers=1000),
+    Engine('parallel-greedy', _parallel(GREEDY)),
+    Engine('parallel-optimal', _parallel(OPTIMAL), maxPlayers=1000),
+    Engine('parallel-exact', _parallel(EXACT)),
+    Engine('parallel-anytime', _parallel(ANYTIME)),
+    Engine('sampling-greedy', _sampled, maxPlayers=1000),
+]}
+
+
+@dataclass
+class CaseResult:
+    engine: str
+    players: int
+    mix: str
+    runs: int
+    groups: int
+    opsPerSec: float
+    mean: float
+    p50: float
+    p99: float
+    max: float
+    # Peak memory allocated during one run, in bytes
+    peakMemory: int
+    # Mean seconds per run spent in each phase, for engines that report them
+    phases: Dict[str, float] = field(default_factory=dict)
+
+
+# The smallest sample that at least q of all samples are at or below
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+def runCase(engine: Engine, players: List[WoWPlayer], mix: str, seed: int = 0) -> CaseResult:
+    timings = []
+    phases: Dict[str, float] = {}
+    groups: List[WoWGroup] = []
+    started = time.perf_counter()
+    while len(timings) < MAX_RUNS and (len(timings) < MIN_RUNS or time.perf_counter() - started < MIN_TIME):
+        stats = {}
+        start = time.perf_counter()
+        groups = engine.run(players, seed + len(timings), stats)
+        timings.append(time.perf_counter() - start)
+        for name, stat in stats.get('phases', {}).items():
+            phases[name] = phases.get(name, 0.0) + stat.seconds
+
+    # Measured in a run of its own since tracing allocations slows everything down
+    tracemalloc.start()
+    try:
+        engine.run(players, seed, {})
+        peakMemory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    mean = sum(timings) / len(timings)
+    return CaseResult(
+        engine=engine.name, players=len(players), mix=mix, runs=len(timings), groups=len(groups),
+        opsPerSec=1 / mean if mean else float('inf'), mean=mean, p50=percentile(timings, 0.5),
+        p99=percentile(timings, 0.99), max=max(timings), peakMemory=peakMemory,
+        phases={name: seconds / len(timings) for name, seconds in phases.items()},
+    )
+
+
+def runBenchmarks(engines: List[Engine], sizes: List[int], mixes: List[str], seed: int = 0,
+                  report: Callable[[CaseResult], None] = None) -> List[CaseResult]:
+    results = []
+    for mix in mixes:
+        for size in sizes:
+            players = generateRoster(size, mix, rng=random.Random(f"{seed}-{mix}-{size}"))
+            for engine in engines:
+                if engine.maxPlayers is not None and size > engine.maxPlayers:
+                    continue
+                result = runCase(engine, players, mix, seed)
+                results.append(result)
+                if report:
+                    report(result)
+    return results
+
+
+# Cases whose p50 got slower than the baseline by more than the tolerance, with the phase that grew most
+def findRegressions(results: List[CaseResult], baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    previous = {(r['engine'], r['players'], r['mix']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        old = previous.get((result.engine, result.players, result.mix))
+        if old and result.p50 > old['p50'] * (1 + tolerance):
+            regression = f"{result.engine} with {result.players} players ({result.mix}): " \
+                         f"p50 {old['p50'] * 1000:.2f}ms -> {result.p50 * 1000:.2f}ms"
+            # Point at the phase that slowed down the most, when both runs timed their phases
+            oldPhases = old.get('phases', {})
+            growth = {name: seconds - oldPhases[name] for name, seconds in result.phases.items() if name in oldPhases}
+            if growth:
+                phase = max(growth, key=growth.get)
+                regression += f", mostly in {phase} (+{growth[phase] * 1000:.2f}ms)"
+            regressions.append(regression)
+    return regressions
+
+
+def formatResult(result: CaseResult) -> str:
+    return f"{result.engine:<18} {result.mix:<15} {result.players:>6} players " \
+           f"{result.opsPerSec:>10.1f} ops/s  p50 {result.p50 * 1000:>9.2f}ms  p99 {result.p99 * 1000:>9.2f}ms  " \
+           f"peak {result.peakMemory / 1024:>9.1f}KiB  ({result.runs} runs)"
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the mythic+ group creators")
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=sorted(ENGINES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--mixes', nargs='+', choices=sorted(ROLE_MIXES), default=['balanced'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Write the results as JSON to this file, or - for stdout")
+    parser.add_argument('--baseline', help="Fail when a case got slower than in this JSON file")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    quiet = args.json == '-'
+    results = runBenchmarks([ENGINES[name] for name in args.engines], args.sizes, args.mixes, args.seed,
+                            report=None if quiet else lambda result: print(formatResult(result), flush=True))
+
+    output = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': scoring.np is not None,
+        'time': time.time(),
+        'results': [asdict(result) for result in results],
+    }
+    if args.json == '-':
+        json.dump(output, sys.stdout, indent=2)
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(output, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = findRegressions(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,58 @@
 import discord
 import os
 import asyncio
+from dataclasses import replace
+from typing import Optional
 from discord.ext import commands
 from dotenv import load_dotenv
 from models import WoWPlayer
-from parallel_group_creator import create_mythic_plus_groups
+from pairing_history import PairingHistory
+from engine import ANYTIME, GREEDY, STREAMING_MODES, GroupEngine
+from sessions import DEFAULT_MAX_BYTES, DEFAULT_MAX_SESSIONS, SessionManager
+from offload import DEFAULT_TIMEOUT, THREAD, makeExecutor, solveOffloaded, streamOffloaded
+from tracing import debugTracer, defaultTracer as tracer, parseLevel
+from phase_timer import formatPhases
+from reveal import BATCH, DEFAULT_REVEAL_TIME, Frame, groupFrames, groupsPerMessage, revealChanges, revealGroups
+from roster_cache import RosterCache
+from warm_start import DEFAULT_DEBOUNCE, WarmStarter
+from matchmaker import Matchmaker
+from repair import repairGroups
+from rotation import MAX_ROUNDS, planOffloaded
 from oldbot import oldCoreWheel
 
 load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
-PLACEHOLDER_CHAR = ':question:'
+# Where each guild's pairing history is saved, {guild} is replaced by the guild's ID
+PAIRING_HISTORY_PATH = os.getenv("PAIRING_HISTORY_PATH", "pairing_history_{guild}.json")
+# How long !wheel may spend improving the groups, in seconds
+WHEEL_DEADLINE = float(os.getenv("WHEEL_DEADLINE", "0.05"))
+# Where the groups are computed, off the event loop: a 'thread' or 'process' pool, with this many workers.
+# If that takes longer than WHEEL_TIMEOUT seconds the plain greedy groups are used instead.
+WHEEL_EXECUTOR = os.getenv("WHEEL_EXECUTOR", THREAD)
+WHEEL_WORKERS = int(os.getenv("WHEEL_WORKERS", "0")) or None
+WHEEL_TIMEOUT = float(os.getenv("WHEEL_TIMEOUT", str(DEFAULT_TIMEOUT)))
+# Trace level (DEBUG, INFO, WARNING or OFF) for the wheel's decisions, kept in a ring buffer.
+# Set TRACE_ECHO to also print every recorded event.
+TRACE_LEVEL = os.getenv("TRACE_LEVEL", "OFF")
+TRACE_ECHO = os.getenv("TRACE_ECHO", "") not in ("", "0", "false")
+# How many channels' wheels to remember, and roughly how much memory they may use together
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", str(DEFAULT_MAX_SESSIONS)))
+MAX_SESSION_BYTES = int(os.getenv("MAX_SESSION_BYTES", str(DEFAULT_MAX_BYTES)))
+# Precompute the groups in the background whenever someone joins or leaves a voice channel, once
+# nobody has for WARM_DEBOUNCE seconds, so !wheel there doesn't wait for the solver.
+# There's no hurry then, so the solver gets WARM_DEADLINE seconds instead of WHEEL_DEADLINE.
+WARM_START = os.getenv("WARM_START", "1") not in ("", "0", "false")
+WARM_DEBOUNCE = float(os.getenv("WARM_DEBOUNCE", str(DEFAULT_DEBOUNCE)))
+WARM_DEADLINE = float(os.getenv("WARM_DEADLINE", "1.0"))
+# Longest the groups may take to reveal, in seconds. With many groups the animation gets shorter.
+REVEAL_TIME = float(os.getenv("REVEAL_TIME", str(DEFAULT_REVEAL_TIME)))
+# How !wheel builds the groups when none were precomputed. It reveals them while they're being built,
+# which only works in a mode that finishes one group at a time: 'greedy', or 'exact' for small rosters.
+WHEEL_STREAM_MODE = os.getenv("WHEEL_STREAM_MODE", GREEDY)
+if WHEEL_STREAM_MODE not in STREAMING_MODES:
+    raise ValueError(f"WHEEL_STREAM_MODE must be one of {STREAMING_MODES}, not {WHEEL_STREAM_MODE}")
+# How !wheel sends the groups: 'batch' packs up to 10 groups in each message, 'single' sends one message per group
+WHEEL_OUTPUT = os.getenv("WHEEL_OUTPUT", BATCH)
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -18,31 +61,91 @@ intents.members = True
 client = discord.Client(intents=intents)
 bot = commands.Bot(command_prefix=["!", "/"], intents=intents)
 
-debug = False
+tracer.level = parseLevel(TRACE_LEVEL)
+tracer.echo = TRACE_ECHO
 
-lastPlayerList = []
-lastGroups = []
+# Who has played with whom over past wheels, so groups keep getting mixed up
+# week to week and not just compared to the last wheel. Each guild has its
+# own, shared by its channels, so a wheel in one guild doesn't age another's
+# pairings and players with the same name in different guilds aren't mixed up.
+pairingHistories = {}
+# Held while a guild's history is being saved, so two saves don't write the file at once
+historyLocks = {}
+
+def historyPath(guildId) -> str:
+    return PAIRING_HISTORY_PATH.format(guild=guildId)
+
+def guildHistory(guildId) -> PairingHistory:
+    history = pairingHistories.get(guildId)
+    if history is None:
+        history = pairingHistories[guildId] = PairingHistory.load(historyPath(guildId))
+    return history
+
+# Saves a guild's pairing history in the executor, from a snapshot so wheels can keep recording meanwhile
+async def saveHistory(guildId):
+    snapshot = guildHistory(guildId).copy()
+    lock = historyLocks.get(guildId)
+    if lock is None:
+        lock = historyLocks[guildId] = asyncio.Lock()
+    async with lock:
+        await asyncio.get_running_loop().run_in_executor(executor, snapshot.save, historyPath(guildId))
+
+# One session per guild and channel, each with its own players, groups and
+# engine, so wheels in different channels can run at the same time
+sessions = SessionManager(
+    engineFactory=lambda guildId: GroupEngine(mode=ANYTIME, deadline=WHEEL_DEADLINE, history=guildHistory(guildId),
+                                              tracer=tracer),
+    maxSessions=MAX_SESSIONS,
+    maxBytes=MAX_SESSION_BYTES,
+)
+
+
+executor = makeExecutor(WHEEL_EXECUTOR, WHEEL_WORKERS)
+
+# The players in every channel a wheel has run in, so a wheel doesn't rebuild them from the members.
+# Members are keyed by guild too, since the same user can be in several guilds with different roles.
+rosters = RosterCache(makePlayer=lambda member: memberPlayer(member), memberId=lambda member: (member.guild.id, member.id))
+
+# One looking for group queue per guild, shared by all its channels
+matchmakers = {}
+
+warmStarter = WarmStarter(
+    solve=lambda engine, players: solveOffloaded(engine, players, executor, WARM_DEADLINE + WHEEL_TIMEOUT,
+                                                 deadline=WARM_DEADLINE),
+    debounce=WARM_DEBOUNCE,
+    tracer=tracer,
+)
+
+
+def sessionKey(ctx):
+    return (ctx.guild.id if ctx.guild else None, ctx.channel.id)
 
 # Returns the member's nickname if it exists, or their normal Discord name if
 # they don't have a nickname set.
 # This corresponds to the member's WoW in game name, usually.
-def WoWName(member, debug: bool = None):
-    if debug: print(f"WoWName - Member: {member}\nNick: {member.nick}\nGlobal: {member.global_name}")
+def WoWName(member):
+    tracer.debug('member_name', lambda: f"WoWName - Member: {member}\nNick: {member.nick}\nGlobal: {member.global_name}")
     rawName =  member.nick if member.nick != None else member.global_name if member.global_name != None else str(member)
     return rawName.replace('.', '')
 
-async def showLongTyping(channel):
+async def showLongTyping(channel, debug: bool = False):
     if not debug:
         async with channel.typing():
             await asyncio.sleep(2)
 
-async def showShortTyping(channel):
-    if not debug:
-        async with channel.typing():
-            await asyncio.sleep(1)
+# Print out a group in an embed to keep it tidy
+def toEmbed(frame: Frame) -> discord.Embed:
+    embed = discord.Embed(title=frame.title)
+    for field in frame.fields:
+        embed.add_field(name=field.name, value=field.value, inline=field.inline)
+    return embed
 
-def dashed(name):
-     return '?' * len(name)
+# Posts frames as a message of embeds in the channel
+def frameSender(channel):
+    return lambda frames: channel.send(embeds=[toEmbed(f) for f in frames])
+
+def editFrames(message, frames):
+    return message.edit(embeds=[toEmbed(f) for f in frames])
 
 # !test
 # Runs the !wheel function, but hardcoded to use testing data in my personal
@@ -57,9 +160,78 @@ async def test(ctx):
 #
 # The available roles are:
 # Tank, Healer, DPS, Tank Offspec, Healer Offspec, DPS Offspec
+#
+# !wheel plan 4 plans the night's rounds in the background, mixing everyone
+# up as much as possible and taking turns on offspecs and utilities, and
+# !wheel next then reveals the next planned round straight away.
 @bot.command()
-async def wheel(ctx):
-    await coreWheel(ctx=ctx, debugValue=False)
+async def wheel(ctx, action: str = None, rounds: int = 3):
+    if action is None:
+        await coreWheel(ctx=ctx, debugValue=False)
+    elif action == "plan":
+        async with sessions.acquire(*sessionKey(ctx)) as session:
+            await planWheel(ctx, session, rounds)
+    elif action == "next":
+        async with sessions.acquire(*sessionKey(ctx)) as session:
+            await nextWheel(ctx, session)
+    else:
+        await ctx.send("Use !wheel, !wheel plan 4 or !wheel next.")
+
+# !fix
+# Fixes the groups of the last !wheel after people joined or left the
+# channel, moving as few players as possible, and shows the groups that changed.
+@bot.command()
+async def fix(ctx):
+    async with sessions.acquire(*sessionKey(ctx)) as session:
+        await fixWheel(ctx, session)
+
+# !reroll 3
+# Mixes up just the players of the given groups again, and edits only those
+# groups' embeds. A single group is mixed with another one, picked at random.
+@bot.command()
+async def reroll(ctx, *numbers: int):
+    async with sessions.acquire(*sessionKey(ctx)) as session:
+        await rerollWheel(ctx, session, numbers)
+
+# !lfg
+# Joins the server's looking for group queue with your Discord roles. A
+# group is formed and announced as soon as the queue has a tank, a healer
+# and three DPS with battle res and bloodlust, longest waiting first.
+@bot.command()
+@commands.guild_only()
+async def lfg(ctx):
+    player = memberPlayer(ctx.author)
+    if player is None:
+        await ctx.send("You need a Tank, Healer or DPS role to look for a group.")
+        return
+    matchmaker = matchmakers.get(ctx.guild.id)
+    if matchmaker is None:
+        matchmaker = matchmakers[ctx.guild.id] = Matchmaker(tracer=tracer)
+    # Queued by member id, so renaming doesn't lose their place. The channel they queued in is kept
+    # to announce their group there.
+    matches = matchmaker.enqueue(player, data=ctx.channel, key=ctx.author.id)
+    if not matches:
+        await ctx.send(f"{player.name} is looking for a group. {len(matchmaker)} waiting.")
+    await announceMatches(ctx.channel, matches)
+
+# Announces the groups the queue formed, mentioning everyone in them
+async def announceMatches(channel, matches):
+    for match in matches:
+        frame = groupFrames(match.group, 0)[-1]
+        await channel.send(" ".join(f"<@{entry.key}>" for entry in match.entries),
+                           embed=toEmbed(replace(frame, title="Group found")))
+
+# !leave
+# Leaves the looking for group queue
+@bot.command()
+@commands.guild_only()
+async def leave(ctx):
+    matchmaker = matchmakers.get(ctx.guild.id)
+    entry = matchmaker.dequeue(ctx.author.id) if matchmaker is not None else None
+    if entry is None:
+        await ctx.send("You're not in the queue.")
+        return
+    await ctx.send(f"{entry.player.name} left the queue. {len(matchmaker)} waiting.")
 
 # !oldwheel
 # Generates a series of embed messages that shows groups of players split
@@ -78,105 +250,294 @@ async def testcase(ctx):
 
 
 # Gathers the player info from the discord and returns a list of WoWPlayer objects.
+# The member's WoWPlayer, or None if they are a bot or have no WoW roles
+def memberPlayer(member) -> Optional[WoWPlayer]:
+    if member.bot or len(member.roles) <= 1:
+        return None
+    roles = [role.name for role in member.roles]
+    player = WoWPlayer.create(name=WoWName(member), roles=roles)
+    tracer.debug('player_created', lambda: f'Creating WoWPlayer for {player.name}, roles are {roles}',
+                 player=player)
+    if not player.hasRoles():
+        tracer.info('player_skipped', lambda: f' - No valid roles found for {player}, skipping.', player=player)
+        return None
+    return player
+
 def getPlayerList(members) -> list[WoWPlayer]:
-    players = []
-    for member in members:
-        if(len(member.roles) > 1):
-            print(f'Creating WoWPlayer for {WoWName(member)}, roles are {[role.name for role in member.roles]}')
-            player = WoWPlayer.create(name=WoWName(member), roles=[role.name for role in member.roles])
-            if(player.hasRoles()):
-                players.append(player)
-            else:
-                print(f' - No valid roles found for {player}, skipping.')
-    return players
+    return [player for player in map(memberPlayer, members) if player is not None]
+
+# Whether the member is one of the channel's members right now
+def inChannel(member, channelId) -> bool:
+    channel = member.guild.get_channel(channelId)
+    if channel is None:
+        return False
+    if isinstance(channel, (discord.VoiceChannel, discord.StageChannel)):
+        return member.voice is not None and member.voice.channel is not None and member.voice.channel.id == channelId
+    return channel.permissions_for(member).read_messages
+
+@bot.event
+async def on_ready():
+    # Anything could have changed while disconnected
+    rosters.clear()
+
+@bot.event
+async def on_member_join(member):
+    rosters.memberUpdated(member, lambda channelId: inChannel(member, channelId))
+
+@bot.event
+async def on_member_update(before, after):
+    rosters.memberUpdated(after, lambda channelId: inChannel(after, channelId))
+    # A queued member who changed roles or nickname is queued again as they are now, keeping their place
+    matchmaker = matchmakers.get(after.guild.id)
+    entry = matchmaker.entry(after.id) if matchmaker is not None else None
+    if entry is None:
+        return
+    player = memberPlayer(after)
+    if player is None:
+        matchmaker.dequeue(after.id)
+        return
+    await announceMatches(entry.data, matchmaker.enqueue(player, data=entry.data, key=after.id))
+
+@bot.event
+async def on_member_remove(member):
+    rosters.memberRemoved(member)
+    if member.guild.id in matchmakers:
+        matchmakers[member.guild.id].dequeue(member.id)
+
+@bot.event
+async def on_voice_state_update(member, before, after):
+    rosters.memberMoved(member, before.channel.id if before.channel else None,
+                        after.channel.id if after.channel else None)
+    if WARM_START and before.channel != after.channel:
+        for channel in (before.channel, after.channel):
+            if channel is not None:
+                warmUp(channel)
+
+# Starts precomputing the groups for a voice channel's wheel. Only channels
+# that ran a wheel before are warmed, without creating anything for the
+# others or counting as a use of the session.
+def warmUp(channel):
+    roster = rosters.roster(channel.id)
+    session = sessions.peek(channel.guild.id, channel.id)
+    if roster is None or session is None:
+        return
+    warmStarter.schedule(session.key, session.engine, roster)
+
+# Permission changes can change who sees a channel, so its roster is rebuilt on the next wheel
+@bot.event
+async def on_guild_channel_update(before, after):
+    rosters.forget(after.id)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    rosters.forget(channel.id)
+
+# Renamed roles change every player with them, so the guild's rosters are rebuilt on the next wheel
+@bot.event
+async def on_guild_role_update(before, after):
+    for channelId in rosters.tracked():
+        if after.guild.get_channel(channelId) is not None:
+            rosters.forget(channelId)
 
 
 async def printPlayerList(ctx):
     channel = ctx.channel
-    global lastPlayerList
-    await channel.send(
-        "players = [{}]".format(
-            ", ".join(player.toTestString() for player in lastPlayerList)
+    # Waits for a wheel running in this channel to finish, so its output doesn't get mixed in
+    async with sessions.acquire(*sessionKey(ctx)) as session:
+        await channel.send(
+            "players = [{}]".format(
+                ", ".join(player.toTestString() for player in session.players)
+            )
         )
-    )
-    await channel.send(
-        "Groups:\n\n{}".format(
-            "\n\n".join(group.toTestString() for group in lastGroups)
+        await channel.send(
+            "Groups:\n\n{}".format(
+                "\n\n".join(group.toTestString() for group in session.groups)
+            )
         )
-    )
 
 
-async def coreWheel(ctx, debugValue: bool = None):
-    global debug
-    debug = False if debugValue is None else debugValue
+# The channel whose members play in the wheel
+def wheelChannel(ctx, debug: bool):
+    if debug:
+        # Testing Code
+        return discord.utils.get(ctx.guild.channels, name='path-of-exile')
+    return ctx.channel
+
+
+# Who joined and who left between two lists of players. Someone whose roles
+# changed leaves their seat and joins again.
+def rosterChanges(before, now):
+    old = {player.name: player for player in before}
+    new = {player.name: player for player in now}
+    removed = [p for p in before if p.name not in new or new[p.name].roleMask != p.roleMask]
+    added = [p for p in now if p.name not in old or old[p.name].roleMask != p.roleMask]
+    return added, removed
+
+
+async def fixWheel(ctx, session):
+    if not session.groups:
+        await ctx.send("There's no wheel to fix in this channel yet, use !wheel first.")
+        return
+
+    playerChannel = wheelChannel(ctx, session.debug)
+    roster = rosters.get(playerChannel.id, lambda: playerChannel.members)
+    added, removed = rosterChanges(session.players, roster.players)
+    if not added and not removed:
+        await ctx.send("Nobody joined or left since the last wheel.")
+        return
+
+    result = session.engine.repair(added, removed)
+    session.players = roster.players
+    tracer.info('wheel_fixed', lambda: f"Fixed groups {[i + 1 for i in result.changed]} with {result.moves} moves, "
+                                       f"{len(added)} joined, {len(removed)} left",
+                changed=result.changed, moves=result.moves)
+    await showChanges(ctx, session, result, animate=False)
+
+
+async def planWheel(ctx, session, rounds: int):
+    if not 1 <= rounds <= MAX_ROUNDS:
+        await ctx.send(f"Pick from 1 to {MAX_ROUNDS} rounds, like !wheel plan 4")
+        return
+    playerChannel = wheelChannel(ctx, session.debug)
+    players = rosters.get(playerChannel.id, lambda: playerChannel.members).players
+    if session.rotation is not None:
+        session.rotation.cancel()
+    session.rotation = asyncio.create_task(planOffloaded(session.engine, players, rounds, executor))
+    await ctx.send(f"Planning {rounds} rounds for {len(players)} players, use !wheel next to reveal each one.")
+
+
+async def nextWheel(ctx, session):
+    if session.rotation is None:
+        await ctx.send("There are no rounds planned in this channel, use !wheel plan 4 first.")
+        return
+    try:
+        async with ctx.channel.typing():
+            rotation = await session.rotation
+    except Exception as e:
+        tracer.warning('rotation_failed', lambda: f"Planning the rounds failed: {e!r}", error=e)
+        session.rotation = None
+        await ctx.send("Planning the rounds failed, use !wheel plan again or just !wheel.")
+        return
+    groups = rotation.next()
+    if groups is None:
+        session.rotation = None
+        await ctx.send("That was the last planned round, use !wheel plan for more.")
+        return
+
+    # The round was planned for the players there back then, fix it for anyone who joined or left since
+    playerChannel = wheelChannel(ctx, session.debug)
+    roster = rosters.get(playerChannel.id, lambda: playerChannel.members)
+    added, removed = rosterChanges(rotation.players, roster.players)
+    if added or removed:
+        groups = repairGroups(groups, added, removed, history=session.engine.history).groups
+    session.players = roster.players
+
+    batchSize = groupsPerMessage(WHEEL_OUTPUT)
+    async with ctx.channel.typing():
+        session.messages = await revealGroups(groups, frameSender(ctx), editFrames, limiter=session.limiter,
+                                              totalTime=REVEAL_TIME, batchSize=batchSize)
+        session.batchSize = batchSize
+    await ctx.send(f"Round {rotation.played} of {len(rotation)}.")
+    session.engine.commit(groups)
+    await saveHistory(session.key[0])
+
+
+async def rerollWheel(ctx, session, numbers):
+    groups = session.groups
+    if not groups:
+        await ctx.send("There's no wheel to reroll in this channel yet, use !wheel first.")
+        return
+    if not numbers:
+        await ctx.send("Which groups? Put their numbers after the command, like !reroll 2")
+        return
+    indices = sorted({n - 1 for n in numbers})
+    missing = [i + 1 for i in indices if not 0 <= i < len(groups)]
+    if missing:
+        await ctx.send(f"There's no group {missing[0]}, pick from 1 to {len(groups)}.")
+        return
+    if len(indices) == 1 and len(groups) > 1:
+        # A group on its own would only get its own players back
+        partner = session.engine.rng.choice([i for i in range(len(groups)) if i != indices[0]])
+        await ctx.send(f"Mixing group {indices[0] + 1} with group {partner + 1}.")
+        indices.append(partner)
+
+    result = session.engine.reroll(indices)
+    tracer.info('wheel_rerolled', lambda: f"Rerolled groups {[i + 1 for i in indices]}, {result.moves} players moved",
+                indices=indices, moves=result.moves)
+    await showChanges(ctx, session, result, animate=not session.debug)
+
+
+# Edits the embeds of the groups that changed, leaving the rest of the wheel's messages alone
+async def showChanges(ctx, session, result, animate: bool):
+    reveal = revealChanges(result.groups, result.changed, session.messages, frameSender(ctx), editFrames,
+                           delete=lambda message: message.delete(), limiter=session.limiter, totalTime=REVEAL_TIME,
+                           animate=animate, batchSize=session.batchSize)
+    if animate:
+        async with ctx.channel.typing():
+            session.messages = await reveal
+    else:
+        session.messages = await reveal
+
+
+async def coreWheel(ctx, debugValue: bool = None, output: str = None):
+    async with sessions.acquire(*sessionKey(ctx)) as session:
+        session.debug = False if debugValue is None else debugValue
+        await runWheel(ctx, session, WHEEL_OUTPUT if output is None else output)
+
+
+async def runWheel(ctx, session, output: str = BATCH):
+    debug = session.debug
     channel = ctx.channel
 
-    # Get the members of the channel we want to use to fill the roles
+    # Get the players of the channel we want to use to fill the roles, kept up to date by the member events
+    playerChannel = wheelChannel(ctx, debug)
+    roster = rosters.get(playerChannel.id, lambda: playerChannel.members)
+    players = roster.players
+    session.players = players
+    engine = session.engine
+    send = frameSender(ctx)
+    batchSize = groupsPerMessage(output)
     if debug:
-        # Testing Code
-        testChannel = discord.utils.get(ctx.guild.channels, name='path-of-exile')
-        members = [member for member in testChannel.members if member.bot == False]
+        groups = engine.solve(players, mode=GREEDY, tracer=debugTracer())
+        engine.remember(groups)
+        session.messages = await revealGroups(groups, send, editFrames, limiter=session.limiter, animate=False,
+                                              batchSize=batchSize)
+        session.batchSize = batchSize
+        return
+
+    # Groups precomputed while everyone gathered, if nothing changed since
+    result = warmStarter.take(session.key, engine, roster)
+    if result is not None:
+        groups, stats = result.groups, result.stats
+        source = groups
     else:
-        members = [member for member in channel.members if member.bot == False]
-
-    players = getPlayerList(members)
-    global lastPlayerList
-    lastPlayerList.clear()
-    lastPlayerList = players
-    global lastGroups
-    lastGroups.clear()
-    groups = create_mythic_plus_groups(players, debug=debug)
-    lastGroups = groups
-
-    for i, group in enumerate(groups, 1):
-        # Print out the group in an embed to keep it tidy
-        embed = discord.Embed()
-        embed.title = f"Group {i}"
-
-        # Get player names or placeholders
-        tank_name = group.tank.name if group.tank else PLACEHOLDER_CHAR
-        healer_name = group.healer.name if group.healer else PLACEHOLDER_CHAR
-        dps1_name = group.dps[0].name if len(group.dps) > 0 else PLACEHOLDER_CHAR
-        dps2_name = group.dps[1].name if len(group.dps) > 1 else PLACEHOLDER_CHAR
-        dps3_name = group.dps[2].name if len(group.dps) > 2 else PLACEHOLDER_CHAR
-
-        # Find players with utilities
-        brez_player = next(
-            (p.name for p in [group.tank, group.healer] + group.dps if p and p.hasBrez),
-            "None",
-        )
-        lust_player = next(
-            (p.name for p in [group.tank, group.healer] + group.dps if p and p.hasLust),
-            "None",
-        )
+        # Otherwise start revealing the first groups while the solver is still building the rest.
+        # The engine's own ANYTIME mode only has the groups once it's done, so this uses a streaming mode.
+        groups, stats = [], {}
+
+        async def streamGroups():
+            async for group in streamOffloaded(engine, players, executor, WHEEL_TIMEOUT, stats=stats,
+                                               mode=WHEEL_STREAM_MODE):
+                groups.append(group)
+                yield group
+        source = streamGroups()
 
-        if debug:
-            embed.add_field(name='Tank', value=f'{tank_name}')\
-                .add_field(name='Healer', value=f'{healer_name}')\
-                .add_field(name='DPS', value=f'{dps1_name}, {dps2_name}, {dps3_name}')\
-                .add_field(name='Battle Res', value=f'{brez_player}', inline=True)\
-            .add_field(name='Bloodlust', value=f'{lust_player}', inline=True)
-            embedMessage = await ctx.send(embed = embed)
-        else:
-            embed.add_field(name='Tank', value=f'{dashed(tank_name)}')\
-                .add_field(name='Healer', value=f'{dashed(healer_name)}')\
-                .add_field(name='DPS', value=f'{dashed(dps1_name)}, {dashed(dps2_name)}, {dashed(dps3_name)}')\
-                .add_field(name='Battle Res', value=f'{dashed(brez_player)}', inline=True)\
-                .add_field(name='Bloodlust', value=f'{dashed(lust_player)}', inline=True)
-
-            embedMessage = await ctx.send(embed = embed)
-            await showShortTyping(channel)
-            embedMessage = await embedMessage.edit(embed = embed.set_field_at(index=0, name='Tank', value=f'{tank_name}'))
-            await showShortTyping(channel)
-            embedMessage = await embedMessage.edit(embed = embed.set_field_at(index=1, name='Healer', value=f'{healer_name}'))
-            await showShortTyping(channel)
-            embedMessage = await embedMessage.edit(embed = embed.set_field_at(index=2, name='DPS', value=f'{dps1_name}, {dashed(dps2_name)}, {dashed(dps3_name)}'))
-            await showShortTyping(channel)
-            embedMessage = await embedMessage.edit(embed = embed.set_field_at(index=2, name='DPS', value=f'{dps1_name}, {dps2_name}, {dashed(dps3_name)}'))
-            await showShortTyping(channel)
-            embedMessage = await embedMessage.edit(embed = embed.set_field_at(index=2, name='DPS', value=f'{dps1_name}, {dps2_name}, {dps3_name}'))
-            embedMessage = await embedMessage.edit(embed = embed.set_field_at(index=3, name='Battle Res', value=f'{brez_player}'))
-            embedMessage = await embedMessage.edit(embed = embed.set_field_at(index=4, name='Bloodlust', value=f'{lust_player}'))
+    # Reveal every group at once, within the channel's rate limit
+    async with channel.typing():
+        # Groups have 5 players, give or take the remainder
+        session.messages = await revealGroups(source, send, editFrames, limiter=session.limiter, totalTime=REVEAL_TIME,
+                                              batchSize=batchSize, expected=-(-len(players) // 5))
+        session.batchSize = batchSize
 
+    if 'search' in stats:
+        search = stats['search']
+        tracer.info('wheel_search', lambda: f'Wheel search: {search.iterations} iterations, '
+                                            f'score {search.initialScore} -> {search.score}',
+                    iterations=search.iterations, initialScore=search.initialScore, score=search.score)
+    if 'phases' in stats:
+        tracer.info('wheel_phases', lambda: f"Wheel phases:\n{formatPhases(stats['phases'])}",
+                    phases=stats['phases'])
+    engine.commit(groups)
+    await saveHistory(session.key[0])
 
 bot.run(BOT_TOKEN)
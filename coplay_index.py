@@ -0,0 +1,34 @@
+from typing import Dict, Iterable, Set
+from models import WoWPlayer, WoWGroup
+
+
+# Maps each player to the set of players they were grouped with.
+# Built once per wheel from the previous groups, so checking whether a
+# candidate already played with someone in the current group is a set lookup
+# instead of a walk over every previous group.
+class CoPlayIndex:
+    def __init__(self, groups: Iterable[WoWGroup] = ()):
+        self._partners: Dict[WoWPlayer, Set[WoWPlayer]] = {}
+        for group in groups:
+            self.addGroup(group)
+
+    def __bool__(self) -> bool:
+        return bool(self._partners)
+
+    def addGroup(self, group: WoWGroup):
+        members = group.players
+        for player in members:
+            self._partners.setdefault(player, set()).update(p for p in members if p != player)
+
+    def partnersOf(self, player: WoWPlayer) -> Set[WoWPlayer]:
+        return self._partners.get(player, set())
+
+    # Everyone that any of the given players has already been grouped with
+    def partnersOfAll(self, players: Iterable[WoWPlayer]) -> Set[WoWPlayer]:
+        partners = set()
+        for player in players:
+            partners |= self._partners.get(player, set())
+        return partners
+
+    def playedTogether(self, a: WoWPlayer, b: WoWPlayer) -> bool:
+        return b in self._partners.get(a, ())
@@ -0,0 +1,448 @@
+from typing import Iterable, Iterator, List, Optional
+import random
+import time
+from models import Role, WoWPlayer, WoWGroup
+from feasibility import assignRoles
+from role_pool import RolePool
+from coplay_index import CoPlayIndex
+from pairing_history import PairingHistory
+from solver import optimizeGroups
+from exact_solver import exactGroups
+from local_search import DEFAULT_DEADLINE, improveGroups
+from tracing import Tracer
+from phase_timer import NullPhaseTimer, PhaseTimer
+from repair import RepairResult, SlotIndex, repairGroups
+
+# How many candidates to rank before settling for the least recently paired
+# one. Role pools are shuffled, so this is a random sample of the pool.
+NOVELTY_WINDOW = 32
+
+# Ways to build the groups
+GREEDY = 'greedy'    # Fill the groups in passes, one role or utility at a time
+OPTIMAL = 'optimal'  # Start from the greedy groups, then improve them together seat by seat (see solver.py)
+EXACT = 'exact'      # Search for the best possible groups on small rosters, greedy otherwise (see exact_solver.py)
+ANYTIME = 'anytime'  # Improve the greedy groups with swaps until the deadline runs out (see local_search.py)
+MODES = (GREEDY, OPTIMAL, EXACT, ANYTIME)
+# Modes that finish each full group before starting the next, so iterGroups can yield them one at a time
+STREAMING_MODES = (GREEDY, EXACT)
+
+
+# Builds the groups for a wheel. Pure: it only reads its arguments and changes nothing outside itself.
+#
+# lastGroups are the groups of the previous wheel, whose players are kept apart if possible.
+# history is only read, to prefer players who haven't played together much.
+# deadline is the time budget in seconds for the ANYTIME mode. If a stats dict is passed in, it gets
+# details about the run, like stats['search'] with the SearchReport of the ANYTIME mode and
+# stats['phases'] with the time and calls spent in each phase and helper (see phase_timer.py).
+# rng is used for every shuffle, pass a seeded random.Random to get the same groups again.
+# Decisions are recorded as events on the tracer.
+def buildGroups(players: List[WoWPlayer], lastGroups: List[WoWGroup], history: PairingHistory = None,
+                mode: str = GREEDY, deadline: float = DEFAULT_DEADLINE, stats: dict = None, rng=random,
+                tracer: Tracer = None) -> List[WoWGroup]:
+    return list(iterGroups(players, lastGroups, history=history, mode=mode, deadline=deadline, stats=stats, rng=rng,
+                           tracer=tracer))
+
+# Builds the same groups as buildGroups, yielding each one as soon as it is final.
+#
+# In GREEDY and EXACT mode nothing moves players between full groups once
+# they're filled, so each full group is yielded as soon as its DPS are
+# picked. OPTIMAL and ANYTIME swap players between the full groups at the
+# end, so those are yielded together once that's done. Remainder groups are
+# yielded as each one is formed. Only the STREAMING_MODES really stream
+# then, in the other modes every full group comes at once after the solve.
+# The phase timings count any time the caller
+# spends between groups towards the phase that yielded them.
+def iterGroups(players: List[WoWPlayer], lastGroups: List[WoWGroup], history: PairingHistory = None,
+               mode: str = GREEDY, deadline: float = DEFAULT_DEADLINE, stats: dict = None, rng=random,
+               tracer: Tracer = None) -> Iterator[WoWGroup]:
+    if tracer is None:
+        tracer = Tracer()
+    startTime = time.perf_counter()
+    if mode not in MODES:
+        raise ValueError(f"Unknown group creation mode: {mode}")
+    # Only time the phases when someone will read the timings
+    timer = PhaseTimer() if stats is not None else NullPhaseTimer()
+
+    groups: List[WoWGroup] = []
+
+    players = players.copy()
+    usedPlayers = set()
+
+    # Who played with whom in the last wheel, built once for the novelty checks
+    coplay = CoPlayIndex(lastGroups)
+
+    # Decide who plays which role so the most complete groups can be formed.
+    # Everyone left over (the bench) ends up in the remainder groups.
+    assignment = assignRoles(players, rng=rng)
+    maximumPossibleGroups = assignment.groups
+
+    # Index every player by role, offspec and utility
+    pool = RolePool(players, rng=rng, assignment=assignment)
+    tracer.info('pool_built', lambda: f"Available tanks: {len(pool.tanks)}\n"
+                                      f"Main tank: {pool.main_tanks} --- Offtank: {pool.off_tanks}\n"
+                                      f"Available healers: {len(pool.healers)}\n"
+                                      f"Main heals: {pool.main_healers} --- Offheals: {pool.off_healers}\n"
+                                      f"Available DPS: {len(pool.dps)}\n"
+                                      f"Main DPS: {pool.main_dps} --- Off DPS: {pool.off_dps}\n"
+                                      f"Players with battle res: {pool.brez}\n"
+                                      f"Players with bloodlust: {pool.lust}",
+                tanks=len(pool.tanks), healers=len(pool.healers), dps=len(pool.dps), brez=len(pool.brez),
+                lust=len(pool.lust), groups=maximumPossibleGroups)
+    timer.lap('pools')
+
+    # Helper functions
+    def removePlayer(player: WoWPlayer):
+        if player is None:
+            return
+        usedPlayers.add(player)
+        pool.remove(player)
+
+    def grabNextAvailablePlayer(role_list: Iterable[WoWPlayer], currentGroup: WoWGroup) -> WoWPlayer:
+        # Attempt to grab someone that wasn't previously in a group with the current players.
+        # Candidates are ranked by whether they played with the group in the last wheel, then
+        # by how much they have played with the group over the whole pairing history.
+        members = currentGroup.players
+        playedWith = coplay.partnersOfAll(members) if coplay else set()
+
+        bestPlayer = None
+        bestRank = None
+        candidatesChecked = 0
+        for player in role_list:
+            if player in usedPlayers:
+                continue
+            rank = (player in playedWith, history.score(player, members) if history else 0.0)
+            if not rank[0] and not rank[1]:
+                # Never played with anyone here, can't do better than that
+                bestPlayer = player
+                break
+            tracer.debug('novelty_filter', lambda: f"Considering {player}, they've played with {members} before",
+                         player=player, rank=rank)
+            if bestRank is None or rank < bestRank:
+                bestPlayer, bestRank = player, rank
+            candidatesChecked += 1
+            if candidatesChecked >= NOVELTY_WINDOW:
+                break
+
+        removePlayer(bestPlayer)
+        return bestPlayer
+
+    removePlayer = timer.timed('removePlayer', removePlayer)
+    grabNextAvailablePlayer = timer.timed('grabNextAvailablePlayer', grabNextAvailablePlayer)
+
+    #
+    # Start forming full groups
+    #
+
+    # Small rosters can be solved exactly instead, if that finishes in time
+    solvedGroups = None
+    if mode == EXACT:
+        solvedGroups = exactGroups(players, maximumPossibleGroups, coplay=coplay, history=history)
+        if solvedGroups is None:
+            tracer.info('exact_fallback', "Roster too big or exact search took too long, falling back to greedy groups")
+        else:
+            tracer.info('exact_solved', lambda: f"Exact groups: {solvedGroups}", groups=len(solvedGroups))
+            for group in solvedGroups:
+                for player in group.players:
+                    removePlayer(player)
+        timer.lap('exact')
+
+    # When the groups were already solved there is nothing left for the greedy passes to fill
+    groups = [] if solvedGroups is not None else [(WoWGroup()) for _ in range(maximumPossibleGroups)]
+
+    # Whether the full groups are final as soon as they are filled
+    final = mode in STREAMING_MODES
+
+    # Fill out each full group in stages, parallelized
+    # Grab a tank
+    for currentGroup in groups:
+        currentGroup.tank = grabNextAvailablePlayer(pool.tanks, currentGroup)
+        tracer.debug('player_picked', lambda: f"Selected tank: {currentGroup.tank}", role='tank', player=currentGroup.tank)
+    timer.lap('tanks')
+
+    #
+    # Fill out utility spots
+    #
+
+    # Fill bloodlust spot next because no tanks have bloodlust
+    # Will grab either a healer or a dps
+    for currentGroup in groups:
+        if not currentGroup.has_lust:
+            lust_player = grabNextAvailablePlayer((p for p in pool.lust if p not in pool.tanks), currentGroup)
+
+            if lust_player is not None:
+                if assignment.roleOf(lust_player) == Role.HEALER:
+                    currentGroup.healer = lust_player
+                    seat = 'healer' if lust_player.healerMain else 'offhealer'
+                else:
+                    currentGroup.dps.append(lust_player)
+                    seat = 'dps'
+                tracer.debug('player_picked', lambda: f"{currentGroup.tank.name}'s group - Selected lust player - {seat}: {lust_player}",
+                             role='lust', player=lust_player)
+            else:
+                tracer.debug('utility_missing', lambda: f"{currentGroup.tank.name}'s group - No more lust players available",
+                             utility='lust')
+        else:
+            tracer.debug('utility_covered', lambda: f"{currentGroup.tank.name}'s group - Already have a lust", utility='lust')
+    timer.lap('lust')
+
+    # Now grab a brez if we don't have one
+    # Will grab either a healer or a dps
+    for currentGroup in groups:
+        if not currentGroup.has_brez:
+            if currentGroup.healer is not None:
+                # We have a healer already, so grab a dps brez
+                brez_player = grabNextAvailablePlayer((p for p in pool.brez if p not in pool.tanks and p not in pool.healers), currentGroup)
+            else:
+                # We don't have a healer, so grab any brez
+                brez_player = grabNextAvailablePlayer((p for p in pool.brez if p not in pool.tanks), currentGroup)
+
+            if brez_player is not None:
+                if assignment.roleOf(brez_player) == Role.HEALER:
+                    currentGroup.healer = brez_player
+                    seat = 'healer' if brez_player.healerMain else 'offhealer'
+                else:
+                    currentGroup.dps.append(brez_player)
+                    seat = 'dps'
+                tracer.debug('player_picked', lambda: f"{currentGroup.tank.name}'s group - Selected brez player - {seat}: {brez_player}",
+                             role='brez', player=brez_player)
+            else:
+                tracer.debug('utility_missing', lambda: f"{currentGroup.tank.name}'s group - No more brez players available",
+                             utility='brez')
+        else:
+            tracer.debug('utility_covered', lambda: f"{currentGroup.tank.name}'s group - Already have a brez", utility='brez')
+    timer.lap('brez')
+
+    # If we still don't have a healer, grab one now
+    for currentGroup in groups:
+        if currentGroup.healer is None:
+            mainHealer = grabNextAvailablePlayer(pool.main_healers, currentGroup)
+            if mainHealer is not None:
+                currentGroup.healer = mainHealer
+                tracer.debug('player_picked', lambda: f"{currentGroup.tank.name}'s group - Selected main healer: {currentGroup.healer}",
+                             role='healer', player=mainHealer)
+            else:
+                offHealer = grabNextAvailablePlayer(pool.healers, currentGroup)
+                if offHealer is not None:
+                    currentGroup.healer = offHealer
+                    tracer.debug('player_picked', lambda: f"{currentGroup.tank.name}'s group - Selected offhealer: {currentGroup.healer}",
+                                 role='healer', player=offHealer)
+                else:
+                    tracer.debug('role_unfilled', lambda: f"{currentGroup.tank.name}'s group - No more healers available",
+                                 role='healer')
+            tracer.debug('group_state', lambda: f"{currentGroup.tank.name}'s group - After healer selection - "
+                                               f"Have brez: {currentGroup.has_brez}, have lust: {currentGroup.has_lust}")
+        else:
+            tracer.debug('role_covered', lambda: f"{currentGroup.tank.name}'s group - Healer already selected: {currentGroup.healer}",
+                         role='healer')
+    timer.lap('healers')
+
+    #
+    # Now fill out dps spots
+    #
+
+    # Try to grab a ranged dps if we don't have one
+    for currentGroup in groups:
+        if not currentGroup.has_ranged:
+            ranged_dps = grabNextAvailablePlayer((p for p in pool.dps if p.ranged), currentGroup)
+            if ranged_dps is not None:
+                currentGroup.dps.append(ranged_dps)
+                tracer.debug('player_picked', lambda: f"{currentGroup.tank.name}'s group - Added ranged DPS: {ranged_dps}",
+                             role='ranged', player=ranged_dps)
+    timer.lap('ranged')
+
+    # Fill the rest of the dps slots with anyone left
+    for currentGroup in groups:
+        while len(currentGroup.dps) < 3:
+            dps_player = grabNextAvailablePlayer(pool.dps, currentGroup)
+            if dps_player is None:
+                break
+            currentGroup.dps.append(dps_player)
+            tracer.debug('player_picked', lambda: f"{currentGroup.tank.name}'s group - Selected DPS: {dps_player}",
+                         role='dps', player=dps_player)
+        tracer.info('group_formed', lambda: f"Formed group: {currentGroup}", group=currentGroup)
+        if final:
+            yield currentGroup
+    timer.lap('dps')
+
+    if solvedGroups is not None:
+        groups = solvedGroups
+        yield from groups
+
+    if mode == OPTIMAL:
+        groups = optimizeGroups(groups, coplay=coplay, history=history)
+        tracer.info('groups_optimized', lambda: f"Optimized groups: {groups}")
+        timer.lap('optimize')
+    elif mode == ANYTIME:
+        groups, report = improveGroups(groups, startTime + deadline, coplay=coplay, history=history, rng=rng)
+        tracer.info('groups_improved', lambda: f"Improved groups from {report.initialScore} to {report.score} "
+                                               f"in {report.iterations} iterations: {groups}",
+                    initialScore=report.initialScore, score=report.score, iterations=report.iterations)
+        if stats is not None:
+            stats['search'] = report
+        timer.lap('search')
+    if not final:
+        yield from groups
+
+    # We've filled out all the full groups we can, now deal with any remainder players
+    while len(usedPlayers) < len(players):
+        tracer.info('remainder_started',
+                    lambda: f'Making a remainder group with these players: {[p.name for p in players if p not in usedPlayers]}')
+        remainderGroup = WoWGroup()
+        while len(usedPlayers) < len(players):
+            player = grabNextAvailablePlayer((p for p in players if p not in usedPlayers), remainderGroup)
+            if player is not None:
+                if remainderGroup.tank is None and (player.tankMain or player.offtank):
+                    remainderGroup.tank = player
+                    tracer.debug('player_picked', lambda: f"Remainder group - Selected tank: {player}",
+                                 role='tank', player=player, remainder=True)
+                    continue
+                elif remainderGroup.healer is None and (player.healerMain or player.offhealer):
+                    remainderGroup.healer = player
+                    tracer.debug('player_picked', lambda: f"Remainder group - Selected healer: {player}",
+                                 role='healer', player=player, remainder=True)
+                    continue
+                elif len(remainderGroup.dps) < 3 and (player.dpsMain or player.offdps):
+                    remainderGroup.dps.append(player)
+                    tracer.debug('player_picked', lambda: f"Remainder group - Selected DPS: {player}",
+                                 role='dps', player=player, remainder=True)
+                    continue
+                else:
+                    # Everything is full, make another group
+                    usedPlayers.remove(player)
+                    tracer.debug('player_unplaced', lambda: f"Remainder group - Player did not fit any role: {player}",
+                                 player=player)
+                    break
+            else:
+                tracer.debug('remainder_exhausted', "No more players to add to remainder group")
+                break
+        tracer.info('remainder_formed', lambda: f"Formed remainder group: {remainderGroup}\n"
+                                                f"usedPlayers: {len(usedPlayers)}, total players: {len(players)}",
+                    group=remainderGroup)
+        groups.append(remainderGroup)
+        yield remainderGroup
+    timer.lap('remainder')
+
+    if stats is not None:
+        stats['phases'] = timer.phases
+
+# Builds the groups for one wheel after another, remembering the last groups
+# so players get mixed up from one wheel to the next.
+#
+# Everything the engine needs, its mode, deadline, random generator, pairing
+# history, tracer and the last groups, lives on the engine itself rather than
+# in module state. Independent engines can run side by side, in threads or
+# in a process pool, one per guild or channel.
+#
+# solve() is pure and leaves the engine alone, so it is safe to call for
+# trial runs. remember() makes a set of groups the last groups, and commit()
+# also records them in the pairing history once they are the groups played.
+# The version goes up whenever the last groups change, so groups solved
+# earlier can tell they're out of date.
+class GroupEngine:
+    def __init__(self, mode: str = GREEDY, deadline: float = DEFAULT_DEADLINE, history: PairingHistory = None,
+                 rng=None, seed: Optional[int] = None, tracer: Tracer = None,
+                 lastGroups: List[WoWGroup] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown group creation mode: {mode}")
+        self.mode = mode
+        self.deadline = deadline
+        self.history = history
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.tracer = tracer if tracer is not None else Tracer()
+        self.lastGroups: List[WoWGroup] = list(lastGroups) if lastGroups else []
+        self.version = 0
+        # Open seats of the last groups, kept from one repair to the next
+        self._slots: Optional[SlotIndex] = None
+        self._slotsVersion = -1
+
+    # Builds groups without changing the engine. Anything passed in overrides the engine's own settings.
+    def solve(self, players: List[WoWPlayer], stats: dict = None, mode: str = None, deadline: float = None,
+              history: PairingHistory = None, rng=None, tracer: Tracer = None) -> List[WoWGroup]:
+        return buildGroups(
+            players, self.lastGroups,
+            history=history if history is not None else self.history,
+            mode=mode if mode is not None else self.mode,
+            deadline=deadline if deadline is not None else self.deadline,
+            stats=stats,
+            rng=rng if rng is not None else self.rng,
+            tracer=tracer if tracer is not None else self.tracer,
+        )
+
+    # Like solve, but yields each group as soon as it is final (see iterGroups)
+    def iterSolve(self, players: List[WoWPlayer], stats: dict = None, mode: str = None, deadline: float = None,
+                  history: PairingHistory = None, rng=None, tracer: Tracer = None) -> Iterator[WoWGroup]:
+        return iterGroups(
+            players, list(self.lastGroups),
+            history=history if history is not None else self.history,
+            mode=mode if mode is not None else self.mode,
+            deadline=deadline if deadline is not None else self.deadline,
+            stats=stats,
+            rng=rng if rng is not None else self.rng,
+            tracer=tracer if tracer is not None else self.tracer,
+        )
+
+    def remember(self, groups: List[WoWGroup]):
+        self.lastGroups = list(groups)
+        self.version += 1
+
+    def commit(self, groups: List[WoWGroup]):
+        self.remember(groups)
+        if self.history is not None:
+            self.history.recordSession(groups)
+
+    # Solves and remembers the groups, but leaves recording them in the history to the caller
+    def create(self, players: List[WoWPlayer], stats: dict = None, **overrides) -> List[WoWGroup]:
+        groups = self.solve(players, stats=stats, **overrides)
+        self.remember(groups)
+        return groups
+
+    # Fixes the last groups after players joined or left, moving as few players
+    # as possible (see repair.py), and remembers the fixed groups
+    def repair(self, added: Iterable[WoWPlayer] = (), removed: Iterable[WoWPlayer] = ()) -> RepairResult:
+        if self._slots is None or self._slotsVersion != self.version:
+            self._slots = SlotIndex(self.lastGroups)
+        result = repairGroups(self.lastGroups, added, removed, history=self.history, index=self._slots)
+        self.remember(result.groups)
+        self._slotsVersion = self.version
+        return result
+
+    # Solves just the players of these groups again, under the same rules, and
+    # remembers the result. Everyone else stays where they are. The old groups
+    # count as the last groups for the novelty rules, so the players get mixed
+    # up instead of landing back together. The new groups take the old ones'
+    # places, any extra group goes at the end.
+    def reroll(self, indices: Iterable[int], stats: dict = None) -> RepairResult:
+        indices = sorted(set(indices))
+        if not indices:
+            return RepairResult(groups=list(self.lastGroups))
+        missing = [i for i in indices if not 0 <= i < len(self.lastGroups)]
+        if missing:
+            raise IndexError(f"There's no group {missing[0] + 1} to reroll")
+        old = [self.lastGroups[i] for i in indices]
+        oldMates = {player: frozenset(group.players) for group in old for player in group.players}
+        players = [player for group in old for player in group.players]
+        new = buildGroups(players, old, history=self.history, mode=self.mode, deadline=self.deadline, stats=stats,
+                          rng=self.rng, tracer=self.tracer)
+
+        groups = list(self.lastGroups)
+        changed = []
+        for n, group in enumerate(new):
+            if n < len(indices):
+                groups[indices[n]] = group
+                changed.append(indices[n])
+            else:
+                groups.append(group)
+                changed.append(len(groups) - 1)
+        if len(new) < len(indices):
+            # Fewer groups than before, so the groups after the first one dropped move up
+            for i in reversed(indices[len(new):]):
+                del groups[i]
+            changed = sorted(set(i for i in changed if i < len(groups)) | set(range(indices[len(new)], len(groups))))
+        moves = sum(1 for group in new for player in group.players if oldMates[player] != frozenset(group.players))
+
+        self.remember(groups)
+        return RepairResult(groups=groups, changed=changed, moves=moves)
+
+    def clear(self):
+        self.lastGroups = []
+        self.version += 1
@@ -0,0 +1,301 @@
+from typing import Dict, List, Optional, Tuple
+import time
+from models import Role, WoWPlayer, WoWGroup
+from scoring import DEFAULT_WEIGHTS, ScoreWeights, pairCost as scorePair
+
+# Above this many players the search space is too big to be worth trying. Three groups of realistic
+# rosters finish well within EXACT_TIME_LIMIT; at 20 players proving the best answer takes seconds.
+EXACT_MAX_PLAYERS = 15
+
+# Give up and let the caller fall back to the greedy groups after this long
+EXACT_TIME_LIMIT = 0.25
+
+# How many groups the search looks at between two checks of the clock
+CLOCK_INTERVAL = 256
+
+NEGATIVE_INFINITY = float('-inf')
+
+# A group as the indexes of its tank, healer and three DPS
+Pick = Tuple[int, int, int, int, int]
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+# Finds the provably best set of complete groups for a small roster.
+#
+# The groups are built one seat at a time, tank, healer, then the three DPS,
+# and scored exactly like the other engines score them. The search is a
+# branch and bound over those seats:
+#  - Groups are interchangeable, so they are always built in increasing
+#    order of their tank, which removes every reordering of the same answer.
+#  - Players with the same roles and the same pair cost with everyone else
+#    are interchangeable too, so they are always seated lowest index first.
+#    Which of them is left then only depends on how many are, so they count
+#    as one entry in the memo key instead of one per player.
+#  - Before each seat, the score of the groups so far is added to an upper
+#    bound on the rest: every group left complete, with battle res, bloodlust
+#    and ranged as often as the players left bring them, minus an offspec
+#    for every open seat there aren't enough main specs for, minus the
+#    cheapest pairs the seated players and the groups after them could
+#    still get. The branch is dropped if that can't beat the best answer
+#    found so far.
+#  - Every seat tries its candidates best first, by the offspec, pair costs
+#    and utilities they bring to the group so far, so a good answer turns
+#    up early and the bound cuts off more of the rest.
+#  - The best answer for what is left is memoized, keyed by the bitmask of
+#    players still available, the groups still to form and the last tank.
+#    A branch cut short by the bound only proves an upper bound on what it
+#    could have scored, which is memoized as such.
+#  - A group is only finished if the players left could still fill the rest.
+#
+# Returns None when the roster is too big or the time limit runs out, so
+# the caller can fall back to the greedy engine.
+def exactGroups(players: List[WoWPlayer], groupCount: int, weights: ScoreWeights = DEFAULT_WEIGHTS, coplay=None,
+                history=None, maxPlayers: int = EXACT_MAX_PLAYERS,
+                timeLimit: float = EXACT_TIME_LIMIT) -> Optional[List[WoWGroup]]:
+    if len(players) > maxPlayers:
+        return None
+    if groupCount <= 0:
+        return []
+
+    deadline = time.perf_counter() + timeLimit
+    count = len(players)
+    masks = [p.roleMask for p in players]
+    tanks = [i for i, p in enumerate(players) if p.tankMain or p.offtank]
+    healers = [i for i, p in enumerate(players) if p.healerMain or p.offhealer]
+    dps = [i for i, p in enumerate(players) if p.dpsMain or p.offdps]
+
+    # Everything groupScore looks at, precomputed per player and per pair so a group can be scored
+    # with a few int operations
+    tankOffspec = [0.0 if p.tankMain else weights.offspec for p in players]
+    healerOffspec = [0.0 if p.healerMain else weights.offspec for p in players]
+    dpsOffspec = [0.0 if p.dpsMain else weights.offspec for p in players]
+    pairCost = [[0.0] * count for _ in players]
+    for i in range(count):
+        for j in range(i):
+            pairCost[i][j] = pairCost[j][i] = weights.novelty * scorePair(players[i], players[j], coplay, history)
+
+    brez, lust, ranged = int(Role.BREZ), int(Role.LUST), int(Role.RANGED)
+
+    def utilityScore(mask: int) -> float:
+        return weights.complete + \
+            (weights.brez if mask & brez else 0.0) + \
+            (weights.lust if mask & lust else 0.0) + \
+            (weights.ranged if mask & ranged else 0.0)
+
+    # What player i's battle res, bloodlust and ranged add to a group that already has `roles`
+    def gain(roles: int, i: int) -> float:
+        added = masks[i] & ~roles
+        return (weights.brez if added & brez else 0.0) + \
+            (weights.lust if added & lust else 0.0) + \
+            (weights.ranged if added & ranged else 0.0)
+
+    def bits(indexes) -> int:
+        return sum(1 << i for i in indexes)
+
+    tankMask, healerMask, dpsMask = bits(tanks), bits(healers), bits(dps)
+    mainTankMask = bits(i for i, p in enumerate(players) if p.tankMain)
+    mainHealerMask = bits(i for i, p in enumerate(players) if p.healerMain)
+    mainDpsMask = bits(i for i, p in enumerate(players) if p.dpsMain)
+    brezMask = bits(i for i in range(count) if masks[i] & brez)
+    lustMask = bits(i for i in range(count) if masks[i] & lust)
+    rangedMask = bits(i for i in range(count) if masks[i] & ranged)
+
+    # before[i] holds the players interchangeable with player i that come before them
+    before = [0] * count
+    for i in range(count):
+        for j in range(i):
+            if masks[i] == masks[j] and all(pairCost[i][x] == pairCost[j][x] for x in range(count) if x != i and x != j):
+                before[i] |= 1 << j
+
+    # Every player's pair costs with the others, cheapest first
+    partners = [sorted((pairCost[i][j], j) for j in range(count) if j != i) for i in range(count)]
+
+    # The sum of player i's `mates` cheapest pair costs with the remaining players
+    def cheapestMates(i: int, remaining: int, mates: int) -> float:
+        total = 0.0
+        for cost, j in partners[i]:
+            if mates == 0:
+                break
+            if remaining >> j & 1:
+                total += cost
+                mates -= 1
+        return total
+
+    # The cheapest any five players including player i can be together, searched cheapest mates first
+    def cheapestGroup(i: int) -> float:
+        order = [j for _, j in partners[i]]
+        cheapest = float('inf')
+
+        def extend(members: List[int], start: int, cost: float):
+            nonlocal cheapest
+            if len(members) == 5:
+                cheapest = cost
+                return
+            for n in range(start, len(order)):
+                j = order[n]
+                added = cost + sum(pairCost[j][m] for m in members)
+                if added < cheapest:
+                    extend(members + [j], n + 1, added)
+
+        extend([i], 0, 0.0)
+        return cheapest
+
+    # Every group's pairs cost at least as much as the cheapest five players any of its members
+    # could be in, so each player is charged a fifth of that. It's worked out once for the whole
+    # roster, and only gets more true as players are taken.
+    shares = [cheapestGroup(i) / 5 for i in range(count)]
+    byShare = sorted(range(count), key=lambda i: shares[i])
+
+    # The least the pairs in `groups` more groups from the remaining players can cost:
+    # the smallest shares of as many of them as the groups have seats
+    def pairBound(remaining: int, groups: int) -> float:
+        seats = 5 * groups
+        bound = 0.0
+        for i in byShare:
+            if seats == 0:
+                break
+            if remaining >> i & 1:
+                bound += shares[i]
+                seats -= 1
+        return bound
+
+    # The most the groups still open can score: `groups` groups, the first of which may already have
+    # `seated` players with `roles`, filled from `remaining`, with tankSeats, healerSeats and dpsSeats open.
+    # Every group complete, with battle res, bloodlust and ranged as often as the players left can bring
+    # them, an offspec for every open seat there aren't enough main specs for, and the cheapest pairs.
+    def upperBound(remaining: int, groups: int, seated: Tuple[int, ...], roles: int, tankSeats: int,
+                   healerSeats: int, dpsSeats: int) -> float:
+        bound = groups * weights.complete + \
+            weights.brez * min(groups, bool(roles & brez) + (remaining & brezMask).bit_count()) + \
+            weights.lust * min(groups, bool(roles & lust) + (remaining & lustMask).bit_count()) + \
+            weights.ranged * min(groups, bool(roles & ranged) + (remaining & rangedMask).bit_count()) - \
+            weights.offspec * (max(0, tankSeats - (remaining & mainTankMask).bit_count()) +
+                               max(0, healerSeats - (remaining & mainHealerMask).bit_count()) +
+                               max(0, dpsSeats - (remaining & mainDpsMask).bit_count()))
+        # The players already seated still get the rest of their group as mates
+        for i in seated:
+            bound -= cheapestMates(i, remaining, 5 - len(seated))
+        later = groups - 1 if seated else groups
+        return bound - pairBound(remaining, later) if later else bound
+
+    # Whether groupsLeft more groups could still be filled at all, ignoring how good they'd be.
+    # For every set of roles, the players able to play one of them must cover all of their slots
+    # (Hall's condition), which is exact for filling tank, healer and DPS slots.
+    def canFill(remaining: int, groupsLeft: int, lastTank: int) -> bool:
+        tanksLeft = remaining & tankMask & ~((1 << (lastTank + 1)) - 1)
+        healersLeft = remaining & healerMask
+        dpsLeft = remaining & dpsMask
+        return tanksLeft.bit_count() >= groupsLeft and \
+            healersLeft.bit_count() >= groupsLeft and \
+            dpsLeft.bit_count() >= 3 * groupsLeft and \
+            (tanksLeft | healersLeft).bit_count() >= 2 * groupsLeft and \
+            (tanksLeft | dpsLeft).bit_count() >= 4 * groupsLeft and \
+            (healersLeft | dpsLeft).bit_count() >= 4 * groupsLeft and \
+            (tanksLeft | healersLeft | dpsLeft).bit_count() >= 5 * groupsLeft
+
+    # Whether the player is free and every player interchangeable with them that comes before them is taken
+    def canSeat(remaining: int, i: int) -> bool:
+        return remaining >> i & 1 and not before[i] & remaining
+
+    # (score, picks, exact) for every subproblem searched so far. When exact is False the
+    # score is only an upper bound and picks is None.
+    memo: Dict[Tuple[int, int, int], Tuple[float, Optional[Tuple[Pick, ...]], bool]] = {}
+    groupsSeen = 0
+
+    # The best groupsLeft groups from the remaining players, with tanks after lastTank.
+    # Only has to be right when it can score more than alpha; otherwise it returns an upper bound <= alpha.
+    def best(remaining: int, groupsLeft: int, lastTank: int, alpha: float) -> Tuple[float, Optional[Tuple[Pick, ...]]]:
+        nonlocal groupsSeen
+        key = (remaining, groupsLeft, lastTank)
+        known = memo.get(key)
+        if known is not None and (known[2] or known[0] <= alpha):
+            return known[0], known[1]
+
+        bestScore, bestPicks = NEGATIVE_INFINITY, None
+        later = groupsLeft - 1
+
+        # Seats are tried best first, so good answers turn up early and cut off more of the rest
+        for tank in sorted((t for t in tanks if t > lastTank and canSeat(remaining, t)),
+                           key=lambda t: (tankOffspec[t] - gain(0, t), t)):
+            afterTank = remaining & ~(1 << tank)
+            tankScore = -tankOffspec[tank]
+            tankRoles = masks[tank]
+            floor = max(alpha, bestScore)
+            if tankScore + upperBound(afterTank, groupsLeft, (tank,), tankRoles, later, groupsLeft, 3 * groupsLeft) <= floor:
+                continue
+
+            for healer in sorted((h for h in healers if canSeat(afterTank, h)),
+                                 key=lambda h: (healerOffspec[h] + pairCost[tank][h] - gain(tankRoles, h), h)):
+                afterHealer = afterTank & ~(1 << healer)
+                healerScore = tankScore - healerOffspec[healer] - pairCost[tank][healer]
+                healerRoles = tankRoles | masks[healer]
+                floor = max(alpha, bestScore)
+                if healerScore + upperBound(afterHealer, groupsLeft, (tank, healer), healerRoles, later, later, 3 * groupsLeft) <= floor:
+                    continue
+
+                # The three DPS are picked in this order, so each set of them is only tried once
+                options = sorted((d for d in dps if afterHealer >> d & 1),
+                                 key=lambda d: (dpsOffspec[d] + pairCost[tank][d] + pairCost[healer][d]
+                                                - gain(healerRoles, d), d))
+                for n, a in enumerate(options):
+                    if not canSeat(afterHealer, a):
+                        continue
+                    afterA = afterHealer & ~(1 << a)
+                    scoreA = healerScore - dpsOffspec[a] - pairCost[tank][a] - pairCost[healer][a]
+                    rolesA = healerRoles | masks[a]
+                    floor = max(alpha, bestScore)
+                    if scoreA + upperBound(afterA, groupsLeft, (tank, healer, a), rolesA, later, later, 3 * groupsLeft - 1) <= floor:
+                        continue
+
+                    for m in range(n + 1, len(options)):
+                        b = options[m]
+                        if not canSeat(afterA, b):
+                            continue
+                        afterB = afterA & ~(1 << b)
+                        scoreB = scoreA - dpsOffspec[b] - pairCost[tank][b] - pairCost[healer][b] - pairCost[a][b]
+                        rolesB = rolesA | masks[b]
+                        floor = max(alpha, bestScore)
+                        if scoreB + upperBound(afterB, groupsLeft, (tank, healer, a, b), rolesB, later, later, 3 * groupsLeft - 2) <= floor:
+                            continue
+
+                        for c in options[m + 1:]:
+                            if not canSeat(afterB, c):
+                                continue
+                            groupsSeen += 1
+                            if groupsSeen % CLOCK_INTERVAL == 0 and time.perf_counter() > deadline:
+                                raise SearchTimeout()
+                            rest = afterB & ~(1 << c)
+                            groupScore = scoreB - dpsOffspec[c] - pairCost[tank][c] - pairCost[healer][c] \
+                                - pairCost[a][c] - pairCost[b][c] + utilityScore(rolesB | masks[c])
+                            pick = (tank, healer, a, b, c)
+                            if later == 0:
+                                if groupScore > bestScore:
+                                    bestScore, bestPicks = groupScore, (pick,)
+                                continue
+                            floor = max(alpha, bestScore)
+                            if groupScore + upperBound(rest, later, (), 0, later, later, 3 * later) <= floor:
+                                continue
+                            if not canFill(rest, later, tank):
+                                continue
+                            restScore, restPicks = best(rest, later, tank, floor - groupScore)
+                            if restPicks is not None and groupScore + restScore > bestScore:
+                                bestScore, bestPicks = groupScore + restScore, (pick,) + restPicks
+
+        if bestScore > alpha:
+            memo[key] = (bestScore, bestPicks, True)
+            return bestScore, bestPicks
+        # Everything left was cut off by the bound, so all that's known is that it can't beat alpha
+        memo[key] = (alpha, None, False)
+        return alpha, None
+
+    try:
+        score, picks = best((1 << count) - 1, groupCount, -1, NEGATIVE_INFINITY)
+    except SearchTimeout:
+        return None
+    if picks is None or len(picks) != groupCount:
+        return None
+    return [WoWGroup(tank=players[tank], healer=players[healer], dps=[players[a], players[b], players[c]])
+            for tank, healer, a, b, c in picks]
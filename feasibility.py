@@ -0,0 +1,218 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import random
+from models import OFFSPEC_COST, ROLE_SLOTS, Role, WoWPlayer
+
+INFINITE = float('inf')
+
+# Role slots are numbered in tank, healer, dps order
+TANK_SLOT, HEALER_SLOT, DPS_SLOT = 0, 1, 2
+# (main flag, offspec flag) of every role slot, as plain ints, which are much faster to mask with than Role
+INT_SLOTS = [(int(main), int(off)) for main, off in ROLE_SLOTS.values()]
+
+# How many of each role slot a complete group needs
+SLOTS_PER_GROUP = (1, 1, 3)
+
+# Every nonempty set of role slots, as the slot numbers in it
+SLOT_SETS = [tuple(slot for slot in range(len(ROLE_SLOTS)) if bits >> slot & 1)
+             for bits in range(1, 1 << len(ROLE_SLOTS))]
+
+UTILITY = int(Role.BREZ | Role.LUST)
+
+
+# Min cost flow with successive shortest paths (SPFA).
+# Only used on small graphs here, so simplicity beats a faster algorithm.
+class MinCostFlow:
+    def __init__(self, nodes: int):
+        self.nodes = nodes
+        self.graph: List[List[int]] = [[] for _ in range(nodes)]
+        # Parallel edge arrays, edge e and its residual e ^ 1 are stored next to each other
+        self.to: List[int] = []
+        self.capacity: List[float] = []
+        self.cost: List[float] = []
+
+    def addEdge(self, u: int, v: int, capacity: float, cost: float = 0) -> int:
+        edge = len(self.to)
+        self.graph[u].append(edge)
+        self.to.append(v)
+        self.capacity.append(capacity)
+        self.cost.append(cost)
+        self.graph[v].append(edge + 1)
+        self.to.append(u)
+        self.capacity.append(0)
+        self.cost.append(-cost)
+        return edge
+
+    # The flow currently going through an edge returned by addEdge
+    def flowOn(self, edge: int) -> float:
+        return self.capacity[edge ^ 1]
+
+    # Pushes up to maxFlow units from source to sink, cheapest paths first.
+    # Returns (flow, cost).
+    def solve(self, source: int, sink: int, maxFlow: float = INFINITE) -> Tuple[float, float]:
+        totalFlow = 0
+        totalCost = 0
+        while totalFlow < maxFlow:
+            distance = [INFINITE] * self.nodes
+            previousEdge = [-1] * self.nodes
+            inQueue = [False] * self.nodes
+            distance[source] = 0
+            queue = deque([source])
+            while queue:
+                u = queue.popleft()
+                inQueue[u] = False
+                for edge in self.graph[u]:
+                    if self.capacity[edge] > 0:
+                        v = self.to[edge]
+                        candidate = distance[u] + self.cost[edge]
+                        if candidate < distance[v]:
+                            distance[v] = candidate
+                            previousEdge[v] = edge
+                            if not inQueue[v]:
+                                inQueue[v] = True
+                                queue.append(v)
+            if distance[sink] == INFINITE:
+                break
+
+            # Find the bottleneck along the path, then push flow through it
+            push = maxFlow - totalFlow
+            v = sink
+            while v != source:
+                edge = previousEdge[v]
+                push = min(push, self.capacity[edge])
+                v = self.to[edge ^ 1]
+            v = sink
+            while v != source:
+                edge = previousEdge[v]
+                self.capacity[edge] -= push
+                self.capacity[edge ^ 1] += push
+                v = self.to[edge ^ 1]
+            totalFlow += push
+            totalCost += push * distance[sink]
+        return totalFlow, totalCost
+
+
+# Which role slots a player can fill, and what it costs: nothing on a main
+# spec and OFFSPEC_COST on an offspec, so among all role assignments that
+# give the most complete groups, the one with the fewest offspecs wins.
+# Players with the same signature are interchangeable as far as the flow is
+# concerned, so the network has one node per signature instead of per player.
+def slotCosts(player: WoWPlayer) -> Tuple[Optional[int], ...]:
+    mask = player.roleMask
+    costs = []
+    for main, off in INT_SLOTS:
+        if mask & main:
+            costs.append(0)
+        elif mask & off:
+            costs.append(OFFSPEC_COST)
+        else:
+            costs.append(None)
+    return tuple(costs)
+
+
+def _signatures(players: List[WoWPlayer]) -> Dict[Tuple[Optional[int], ...], List[WoWPlayer]]:
+    classes: Dict[Tuple[Optional[int], ...], List[WoWPlayer]] = {}
+    # Most players share their role mask with someone, so each mask is only looked at once
+    byMask: Dict[int, List[WoWPlayer]] = {}
+    for player in players:
+        members = byMask.get(player.roleMask)
+        if members is None:
+            members = byMask[player.roleMask] = classes.setdefault(slotCosts(player), [])
+        members.append(player)
+    return classes
+
+
+# Builds the players x role slots network for a number of groups.
+# source -> signature (one unit per player) -> role slot (cost of playing it) -> sink (slots for all groups)
+def _buildNetwork(classes, groups: int):
+    network = MinCostFlow(len(classes) + len(ROLE_SLOTS) + 2)
+    source = 0
+    sink = network.nodes - 1
+    firstSlot = len(classes) + 1
+    edges = []
+    for n, (costs, members) in enumerate(classes.items(), 1):
+        network.addEdge(source, n, len(members))
+        for slot, cost in enumerate(costs):
+            if cost is not None:
+                edges.append((members, slot, network.addEdge(n, firstSlot + slot, len(members), cost)))
+    for slot, perGroup in enumerate(SLOTS_PER_GROUP):
+        network.addEdge(firstSlot + slot, sink, perGroup * groups)
+    return network, source, sink, edges
+
+
+def _maxGroups(classes) -> int:
+    groups = INFINITE
+    for slots in SLOT_SETS:
+        able = sum(len(members) for costs, members in classes.items() if any(costs[s] is not None for s in slots))
+        groups = min(groups, able // sum(SLOTS_PER_GROUP[s] for s in slots))
+    return int(groups)
+
+
+# The true maximum number of complete tank/healer/3 DPS groups.
+# Players who can play several roles are only ever counted once, unlike
+# min(tanks, healers, dps // 3).
+#
+# The slots for g groups can be filled exactly when, for every set of roles,
+# the players able to play one of them are at least as many as the set's
+# slots (Hall's condition, which is exact for this kind of network). So the
+# maximum is the smallest of those seven ratios, with no flow to solve.
+def maxCompleteGroups(players: List[WoWPlayer]) -> int:
+    return _maxGroups(_signatures(players))
+
+
+@dataclass
+class RoleAssignment:
+    groups: int = 0
+    tanks: List[WoWPlayer] = field(default_factory=list)
+    healers: List[WoWPlayer] = field(default_factory=list)
+    dps: List[WoWPlayer] = field(default_factory=list)
+    # Players not needed for any complete group
+    bench: List[WoWPlayer] = field(default_factory=list)
+    _roles: Optional[Dict[WoWPlayer, Role]] = field(default=None, repr=False, compare=False)
+
+    @property
+    def offspecs(self) -> int:
+        return sum(1 for p in self.tanks if not p.tankMain) + \
+            sum(1 for p in self.healers if not p.healerMain) + \
+            sum(1 for p in self.dps if not p.dpsMain)
+
+    # The role slot the player was assigned to, None for the bench
+    def roleOf(self, player: WoWPlayer) -> Optional[Role]:
+        if self._roles is None:
+            self._roles = {}
+            for role, assigned in ((Role.TANK, self.tanks), (Role.HEALER, self.healers), (Role.DPS, self.dps)):
+                self._roles.update(dict.fromkeys(assigned, role))
+        return self._roles.get(player)
+
+
+# Decides who plays what so the most complete groups can be formed, using
+# as few offspecs as possible. Players are picked from each signature in
+# random order, so equivalent players take turns being benched, but brez and
+# lust players are never benched in favour of someone without a utility.
+def assignRoles(players: List[WoWPlayer], rng=random) -> RoleAssignment:
+    classes = _signatures(players)
+    groups = _maxGroups(classes)
+    assignment = RoleAssignment(groups=groups)
+    if groups == 0:
+        assignment.bench = list(players)
+        return assignment
+
+    network, source, sink, edges = _buildNetwork(classes, groups)
+    network.solve(source, sink)
+
+    # Within a signature, players with a utility are assigned before anyone gets benched
+    remaining = {
+        id(members): sorted(rng.sample(members, len(members)), key=lambda p: not p.roleMask & UTILITY)
+        for members in classes.values()
+    }
+    slotLists = (assignment.tanks, assignment.healers, assignment.dps)
+    for members, slot, edge in edges:
+        taken = int(network.flowOn(edge))
+        if taken:
+            shuffled = remaining[id(members)]
+            slotLists[slot].extend(shuffled[:taken])
+            del shuffled[:taken]
+    assignedPlayers = set(assignment.tanks) | set(assignment.healers) | set(assignment.dps)
+    assignment.bench = [p for p in players if p not in assignedPlayers]
+    return assignment
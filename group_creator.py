@@ -1,197 +1,129 @@
 from typing import List
-import random
 from models import WoWPlayer, WoWGroup
+from role_pool import PlayerPool, RolePool
+from feasibility import assignRoles
+from tracing import Tracer, debugTracer, defaultTracer
 
-DEBUG = False
 
-
-def log(s):
-    if DEBUG:
-        print(s)
-
-
-def create_mythic_plus_groups(players: List[WoWPlayer], debug=False) -> List[WoWGroup]:
-    global DEBUG
-    DEBUG = debug
+def create_mythic_plus_groups(players: List[WoWPlayer], debug=False, tracer: Tracer = None) -> List[WoWGroup]:
+    if tracer is None:
+        tracer = debugTracer() if debug else defaultTracer
 
     # Create a copy of the players list and track used players
     players = players.copy()
     used_players = set()
     groups = []
 
-    # Keep track of utility players for even distribution
-    brez_players = [p for p in players if p.hasBrez]
-    lust_players = [p for p in players if p.hasLust]
-    # Ensure utility players are at the front of the DPS lists for better distribution
-    main_dps = [p for p in players if p.dpsMain and (p.hasBrez or p.hasLust)] + \
-               [p for p in players if p.dpsMain and not p.hasBrez and not p.hasLust]
-    log(f"Players with battle res: {brez_players}")
-    log(f"Players with bloodlust: {lust_players}")
-
-    # Sort players into role pools
-    # First, sort players by utilities to ensure even distribution
-    utility_dps = [p for p in players if p.dpsMain and (p.hasBrez or p.hasLust)]
-    regular_dps = [p for p in players if p.dpsMain and not p.hasBrez and not p.hasLust]
-
-    main_tanks = [p for p in players if p.tankMain]
-    off_tanks = [p for p in players if p.offtank and not p.tankMain]
-    random.shuffle(main_tanks)
-    random.shuffle(off_tanks)
-    available_tanks = main_tanks + off_tanks
-    log(f"Available tanks (main + off): {len(available_tanks)}")
-
-    main_healers = [p for p in players if p.healerMain]
-    off_healers = [p for p in players if p.offhealer and not p.healerMain]
-    random.shuffle(main_healers)
-    random.shuffle(off_healers)
-    available_healers = main_healers + off_healers
-    log(f"Available healers (main + off): {len(available_healers)}")
-
-    # Prioritize utility DPS first, then regular DPS
-    random.shuffle(utility_dps)
-    random.shuffle(regular_dps)
-    main_dps = utility_dps + regular_dps
-
-    off_dps = [p for p in players if p.offdps and not p.dpsMain]
-    random.shuffle(off_dps)
-    available_dps = main_dps + off_dps
-    log(f"Available DPS (main + off): {len(available_dps)}")
+    # Decide who plays which role so the most complete groups can be formed
+    assignment = assignRoles(players)
+
+    # Index every player by their assigned role, offspec and utility.
+    # Utility DPS are at the front of the main DPS pool for better distribution
+    pool = RolePool(players, utilityDpsFirst=True, assignment=assignment)
+    tracer.info('pool_built', lambda: f"Players with battle res: {pool.brez}\n"
+                                      f"Players with bloodlust: {pool.lust}\n"
+                                      f"Available tanks (main + off): {len(pool.tanks)}\n"
+                                      f"Available healers (main + off): {len(pool.healers)}\n"
+                                      f"Available DPS (main + off): {len(pool.dps)}",
+                tanks=len(pool.tanks), healers=len(pool.healers), dps=len(pool.dps), brez=len(pool.brez),
+                lust=len(pool.lust))
+
+    # The DPS with each utility, in the same order as the DPS pool, so picking one doesn't scan every DPS
+    brez_dps = PlayerPool(p for p in pool.dps if p.hasBrez)
+    lust_dps = PlayerPool(p for p in pool.dps if p.hasLust)
+    ranged_dps = PlayerPool(p for p in pool.dps if p.ranged)
+    # Groups formed so far with both battle res and bloodlust
+    paired_groups = 0
 
     def removePlayer(player: WoWPlayer):
         if player is None:
             return
         used_players.add(player)
-        if player in available_tanks:
-            available_tanks.remove(player)
-        if player in available_healers:
-            available_healers.remove(player)
-        if player in available_dps:
-            available_dps.remove(player)
-        if player in main_tanks:
-            main_tanks.remove(player)
-        if player in off_tanks:
-            off_tanks.remove(player)
-        if player in main_healers:
-            main_healers.remove(player)
-        if player in off_healers:
-            off_healers.remove(player)
-        if player in main_dps:
-            main_dps.remove(player)
-        if player in off_dps:
-            off_dps.remove(player)
-
-    def canFormGroup(tank: WoWPlayer, healer: WoWPlayer, remaining_dps: List[WoWPlayer]) -> bool:
-        # Check if we have enough players for a complete group
-        return tank is not None and healer is not None and len(remaining_dps) >= 3
+        pool.remove(player)
+        brez_dps.discard(player)
+        lust_dps.discard(player)
+        ranged_dps.discard(player)
 
-    def getNextAvailablePlayer(role_list: List[WoWPlayer]) -> WoWPlayer:
-        return next((p for p in role_list if p not in used_players), None)
+    def canFormGroup(tank: WoWPlayer, healer: WoWPlayer) -> bool:
+        # Check if we have enough players for a complete group
+        return tank is not None and healer is not None and len(pool.dps) >= 3
 
     def get_group_utilities(group: WoWGroup) -> tuple[bool, bool]:
         # Returns a tuple of (has_brez, has_lust) for the given group
-        members = [p for p in [group.tank, group.healer, group.dps1, group.dps2, group.dps3] if p is not None]
-        has_brez = any(p.hasBrez for p in members)
-        has_lust = any(p.hasLust for p in members)
-        return has_brez, has_lust
-
-    def count_utilities_per_group():
-        # Returns lists of groups that have each utility
-        groups_with_brez = []
-        groups_with_lust = []
-        for idx, group in enumerate(groups):
-            has_brez, has_lust = get_group_utilities(group)
-            if has_brez:
-                groups_with_brez.append(idx)
-            if has_lust:
-                groups_with_lust.append(idx)
-        return groups_with_brez, groups_with_lust
-
-    def selectDPS(remaining_dps: List[WoWPlayer], current_group: WoWGroup, max_groups: int) -> WoWPlayer:
-        # Get available DPS that haven't been used yet
-        available_dps = [p for p in remaining_dps if p not in used_players]
-        if not available_dps:
+        return group.has_brez, group.has_lust
+
+    def selectDPS(current_group: WoWGroup) -> WoWPlayer:
+        # The DPS pool only holds DPS that haven't been used yet
+        if not pool.dps:
             return None
 
         # Check current group utilities
         has_brez, has_lust = get_group_utilities(current_group)
 
-        # Check utility distribution across all groups
-        groups_with_brez, groups_with_lust = count_utilities_per_group()
-
         # Count how many groups could potentially have both utilities
-        remaining_brez = len([p for p in players if p.hasBrez and p not in used_players])
-        remaining_lust = len([p for p in players if p.hasLust and p not in used_players])
-        potential_utility_groups = min(remaining_brez, remaining_lust)
+        potential_utility_groups = min(len(pool.brez), len(pool.lust))
 
         # Try to pair utilities in groups when possible
-        if potential_utility_groups > len([g for g in groups if g.has_brez and g.has_lust]):
+        if potential_utility_groups > paired_groups:
             if not has_brez and not has_lust:
                 # Try to get either utility, prioritizing brez
-                brez_dps = next((p for p in available_dps if p.hasBrez), None)
-                if brez_dps:
-                    return brez_dps
-                lust_dps = next((p for p in available_dps if p.hasLust), None)
-                if lust_dps:
-                    return lust_dps
+                brez = brez_dps.first()
+                if brez:
+                    return brez
+                lust = lust_dps.first()
+                if lust:
+                    return lust
             elif has_brez and not has_lust:
                 # If we have brez but no lust, try to get lust in same group
-                lust_dps = next((p for p in available_dps if p.hasLust), None)
-                if lust_dps:
-                    return lust_dps
+                lust = lust_dps.first()
+                if lust:
+                    return lust
             elif has_lust and not has_brez:
                 # If we have lust but no brez, try to get brez in same group
-                brez_dps = next((p for p in available_dps if p.hasBrez), None)
-                if brez_dps:
-                    return brez_dps
+                brez = brez_dps.first()
+                if brez:
+                    return brez
 
         # If we can't pair utilities or don't need to, try to get ranged if needed
         if not current_group.has_ranged:
-            ranged_dps = next((p for p in available_dps if p.ranged), None)
-            if ranged_dps:
-                return ranged_dps
+            ranged = ranged_dps.first()
+            if ranged:
+                return ranged
 
         # If all special requirements fail, just take the first available DPS
-        return available_dps[0] if available_dps else None
-
-    # Calculate maximum possible complete groups
-    # For incomplete group test, set to 0 if we can't make any complete groups
-    total_players = len(players)
-    min_role_counts = [len(available_tanks), len(available_healers), len(available_dps) // 3]
+        return pool.dps.first()
 
-    if all(count > 0 for count in min_role_counts):
-        max_by_role = min(min_role_counts)
-        max_by_total = total_players // 5  # Each complete group needs exactly 5 players
-        max_possible_groups = min(max_by_role, max_by_total)
-    else:
-        max_possible_groups = 0  # Can't make complete groups, handle as partial group case
+    # The maximum possible complete groups comes from the role assignment.
+    # It's 0 if we can't make any complete groups, which is handled as the partial group case
+    max_possible_groups = assignment.groups
 
-    log(f"Maximum possible complete groups: {max_possible_groups}")
+    tracer.info('groups_planned', lambda: f"Maximum possible complete groups: {max_possible_groups}",
+                groups=max_possible_groups)
 
     # Create complete groups first
-    while max_possible_groups > 0 and canFormGroup(getNextAvailablePlayer(available_tanks), 
-                                                 getNextAvailablePlayer(available_healers),
-                                                 [p for p in available_dps if p not in used_players]):
+    while max_possible_groups > 0 and canFormGroup(pool.tanks.first(), pool.healers.first()):
         current_group = WoWGroup()
 
         # Assign tank
-        tank = getNextAvailablePlayer(available_tanks)
+        tank = pool.tanks.first()
         current_group.tank = tank
         removePlayer(tank)
 
         # Assign healer
-        healer = getNextAvailablePlayer(available_healers)
+        healer = pool.healers.first()
         current_group.healer = healer
         removePlayer(healer)
 
         # Assign DPS
-        remaining_dps = [p for p in available_dps if p not in used_players]
-        for dps_slot in ['dps1', 'dps2', 'dps3']:
-            dps = selectDPS(remaining_dps, current_group, max_possible_groups)
+        for _ in range(3):
+            dps = selectDPS(current_group)
             if dps:
-                setattr(current_group, dps_slot, dps)
+                current_group.dps.append(dps)
                 removePlayer(dps)
 
         groups.append(current_group)
+        if current_group.has_brez and current_group.has_lust:
+            paired_groups += 1
         max_possible_groups -= 1
 
     # Handle remaining players - try to form complete groups
@@ -271,11 +203,11 @@ def create_mythic_plus_groups(players: List[WoWPlayer], debug=False) -> List[WoW
 
         # Try to fill DPS slots
         available_dps = [p for p in remaining if p not in used]
-        for i, slot in enumerate(['dps1', 'dps2', 'dps3']):
+        for i in range(3):
             if available_dps:
                 dps = find_best_dps(available_dps, group, i)
                 if dps:
-                    setattr(group, slot, dps)
+                    group.dps.append(dps)
                     used.add(dps)
                     available_dps.remove(dps)
 
@@ -292,7 +224,7 @@ def create_mythic_plus_groups(players: List[WoWPlayer], debug=False) -> List[WoW
                 remaining_brez = [p for p in remaining if p not in used and p.hasBrez]
                 if remaining_brez:
                     # Try to swap a non-utility player with a brez player
-                    for member in [group.tank, group.healer, group.dps1, group.dps2, group.dps3]:
+                    for member in group.players:
                         if member and not member.hasBrez:
                             for brez_player in remaining_brez:
                                 if (member.tankMain and brez_player.tankMain) or \
@@ -303,12 +235,8 @@ def create_mythic_plus_groups(players: List[WoWPlayer], debug=False) -> List[WoW
                                         group.tank = brez_player
                                     elif member == group.healer:
                                         group.healer = brez_player
-                                    elif member == group.dps1:
-                                        group.dps1 = brez_player
-                                    elif member == group.dps2:
-                                        group.dps2 = brez_player
-                                    elif member == group.dps3:
-                                        group.dps3 = brez_player
+                                    else:
+                                        group.dps[group.dps.index(member)] = brez_player
                                     break
             return group
 
@@ -326,7 +254,8 @@ def create_mythic_plus_groups(players: List[WoWPlayer], debug=False) -> List[WoW
         if not remaining_players:
             break
 
-        log(f"--- Handling {len(remaining_players)} remaining players ---")
+        tracer.debug('remainder_started', lambda: f"--- Handling {len(remaining_players)} remaining players ---",
+                     players=len(remaining_players))
 
         # Create a new group
         new_group = None
@@ -349,13 +278,12 @@ def create_mythic_plus_groups(players: List[WoWPlayer], debug=False) -> List[WoW
         # If we have a group, add it
         if new_group:
             # Remove used players
-            for player in [new_group.tank, new_group.healer, new_group.dps1, new_group.dps2, new_group.dps3]:
-                if player:
-                    removePlayer(player)
+            for player in new_group.players:
+                removePlayer(player)
             groups.append(new_group)
-            log(
-                f'Added {"complete" if new_group.is_complete else "partial"} group with {new_group.size} players'
-            )
+            tracer.info('group_formed',
+                        lambda: f'Added {"complete" if new_group.is_complete else "partial"} group with {new_group.size} players',
+                        group=new_group)
 
             # If we've hit our target and all groups are complete, we're done
             if max_possible_groups > 0 and len(groups) >= max_possible_groups and all(g.is_complete for g in groups):
@@ -368,16 +296,15 @@ def create_mythic_plus_groups(players: List[WoWPlayer], debug=False) -> List[WoW
                 if len(remaining_players) > 0:
                     new_group = try_complete_group(remaining_players, require_complete=False, try_incomplete=True)
                     if new_group:
-                        for player in [new_group.tank, new_group.healer, new_group.dps1, new_group.dps2, new_group.dps3]:
-                            if player:
-                                removePlayer(player)
+                        for player in new_group.players:
+                            removePlayer(player)
                         groups.append(new_group)
-                        log(f"Added extra partial group with {new_group.size} players")
+                        tracer.info('remainder_formed', lambda: f"Added extra partial group with {new_group.size} players",
+                                    group=new_group)
                 break
             elif len(remaining_players) >= 1:
                 continue
             else:
                 break
 
-    DEBUG = False
     return groups
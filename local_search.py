@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+import random
+import time
+from models import WoWGroup
+from scoring import DEFAULT_WEIGHTS, ScoreWeights, groupScore, isFull
+from solver import EPSILON, getSeat, withSeat
+
+# Default time budget for an interactive command, in seconds
+DEFAULT_DEADLINE = 0.05
+
+
+@dataclass
+class SearchReport:
+    iterations: int = 0
+    improvements: int = 0
+    initialScore: float = 0.0
+    score: float = 0.0
+    elapsed: float = 0.0
+    # True when a pass over every possible swap found nothing better, so no single swap can improve the groups
+    converged: bool = False
+
+
+# Seats that can be swapped with each other, tanks with tanks, healers with healers and DPS with DPS
+SWAPPABLE_SEATS = [
+    (('tank',), ('tank',)),
+    (('healer',), ('healer',)),
+    (('dps0', 'dps1', 'dps2'), ('dps0', 'dps1', 'dps2')),
+]
+
+# How many different swaps there are between two groups: tank, healer and 3 x 3 DPS
+SWAPS_PER_PAIR = 11
+
+
+# Improves the full groups with swaps until the deadline, then returns the best groups so far.
+#
+# Every move swaps two players of the same role between two groups, so the
+# groups always stay complete. A swap is kept when it raises the combined
+# score of the two groups. Moves are picked at random. Once as many random
+# swaps in a row as there are possible swaps find nothing better, every
+# swap is tried once in order, and the search stops early if none of them
+# helps either. Safe to call with a short deadline from the Discord event loop.
+#
+# deadline is an absolute time.perf_counter() value. Groups that aren't full
+# are left alone and kept at the end.
+def improveGroups(groups: List[WoWGroup], deadline: float, weights: ScoreWeights = DEFAULT_WEIGHTS, coplay=None,
+                  history=None, rng=random) -> Tuple[List[WoWGroup], SearchReport]:
+    start = time.perf_counter()
+    current = [g for g in groups if isFull(g)]
+    others = [g for g in groups if not isFull(g)]
+    scores = [groupScore(g, weights, coplay, history) for g in current]
+    report = SearchReport(initialScore=sum(scores), score=sum(scores))
+    if len(current) < 2:
+        report.converged = True
+        return groups, report
+
+    # Swaps the players in two seats if that raises the score, and returns whether it did
+    def trySwap(i: int, seatA: str, j: int, seatB: str) -> bool:
+        report.iterations += 1
+        playerA = getSeat(current[i], seatA)
+        playerB = getSeat(current[j], seatB)
+        newA = withSeat(current[i], seatA, playerB)
+        newB = withSeat(current[j], seatB, playerA)
+        scoreA = groupScore(newA, weights, coplay, history)
+        scoreB = groupScore(newB, weights, coplay, history)
+        if scoreA + scoreB > scores[i] + scores[j] + EPSILON:
+            current[i], current[j] = newA, newB
+            scores[i], scores[j] = scoreA, scoreB
+            report.improvements += 1
+            return True
+        return False
+
+    # Tries every swap once, returning whether any helped, or None if the deadline ran out first
+    def exhaustivePass():
+        improved = False
+        for i in range(groupCount):
+            for j in range(i + 1, groupCount):
+                for seatsA, seatsB in SWAPPABLE_SEATS:
+                    for seatA in seatsA:
+                        for seatB in seatsB:
+                            if time.perf_counter() >= deadline:
+                                return None
+                            improved = trySwap(i, seatA, j, seatB) or improved
+        return improved
+
+    groupCount = len(current)
+    possibleSwaps = groupCount * (groupCount - 1) // 2 * SWAPS_PER_PAIR
+    sinceImprovement = 0
+    while time.perf_counter() < deadline:
+        sinceImprovement += 1
+        i, j = rng.sample(range(groupCount), 2)
+        seatsA, seatsB = rng.choices(SWAPPABLE_SEATS, weights=(1, 1, 9))[0]
+        if trySwap(i, rng.choice(seatsA), j, rng.choice(seatsB)):
+            sinceImprovement = 0
+        elif sinceImprovement >= possibleSwaps:
+            # Random swaps may have missed some, so make sure before stopping
+            improved = exhaustivePass()
+            if improved is False:
+                report.converged = True
+                break
+            sinceImprovement = 0
+
+    report.score = sum(scores)
+    report.elapsed = time.perf_counter() - start
+    return current + others, report
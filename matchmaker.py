@@ -0,0 +1,245 @@
+from dataclasses import dataclass, field
+from itertools import combinations, count
+from typing import Callable, Dict, Hashable, List, Optional, Tuple, Union
+import heapq
+import time
+from models import DPS, HEALER, OFFSPEC_COST, ROLES, TANK, Role, WoWPlayer, WoWGroup
+from role_pool import seatsFor
+from tracing import Tracer
+
+# How many of the longest waiting players per role a match looks at. Keeps
+# every match attempt to a fixed amount of work however long the queue gets.
+MATCH_WINDOW = 6
+# How many of the longest waiting battle res, bloodlust and dual providers per
+# role a match looks at too, on top of the window. Five is enough to always
+# find someone who isn't one of the other four players in the group.
+PROVIDER_WINDOW = 5
+# Most groups formed for a single event
+MAX_MATCHES_PER_EVENT = 4
+
+# Utilities a player can bring that a group may need: battle res, bloodlust, or both at once
+UTILITY_CLASSES = (int(Role.BREZ), int(Role.LUST), int(Role.BREZ | Role.LUST))
+
+# Rebuild a role's heap once it holds this many more stale entries than live ones
+COMPACT_SLACK = 32
+
+
+# One player waiting in the queue. The ticket orders players by when they joined.
+@dataclass(eq=False)
+class QueueEntry:
+    ticket: int
+    player: WoWPlayer
+    joined: float
+    # Whatever the caller wants back with the match, like the Discord member
+    data: object = None
+    active: bool = True
+    # What the queue knows the player by, their name unless enqueue was given a key
+    key: Hashable = None
+
+
+# Players who can take one seat, longest waiting first.
+#
+# A binary heap by ticket, so adding a player is O(log n). Removing one just
+# marks their entry inactive in O(1); inactive entries are skipped when they
+# reach the top, and the heap is rebuilt once they outnumber the live ones.
+class RoleQueue:
+    def __init__(self):
+        # A player who changes roles keeps their ticket, so pushes are numbered to break ties
+        self._heap: List[Tuple[int, int, QueueEntry]] = []
+        self._pushes = count()
+        self._live = 0
+
+    def __len__(self) -> int:
+        return self._live
+
+    def push(self, entry: QueueEntry):
+        heapq.heappush(self._heap, (entry.ticket, next(self._pushes), entry))
+        self._live += 1
+
+    # Called after an entry in this queue was made inactive
+    def discard(self):
+        self._live -= 1
+        if len(self._heap) > 2 * self._live + COMPACT_SLACK:
+            self._heap = [item for item in self._heap if item[2].active]
+            heapq.heapify(self._heap)
+
+    # The k longest waiting players, in O(k log n) plus any stale entries dropped on the way
+    def oldest(self, k: int) -> List[QueueEntry]:
+        found = []
+        while self._heap and len(found) < k:
+            item = heapq.heappop(self._heap)
+            if item[2].active:
+                found.append(item)
+        for item in found:
+            heapq.heappush(self._heap, item)
+        return [entry for _, _, entry in found]
+
+
+@dataclass
+class Match:
+    group: WoWGroup
+    entries: List[QueueEntry] = field(default_factory=list)
+    # How long the longest waiting player in the group waited, in seconds
+    waited: float = 0.0
+
+
+# A looking for group queue that forms a group the moment one is possible.
+#
+# Players join with the roles on their WoWPlayer and wait in a queue for
+# every seat they can take, and in a second queue per seat for each utility
+# they bring. After every join the matchmaker looks for a tank, a healer and
+# three DPS among the longest waiting players for each seat, plus the
+# longest waiting battle res and bloodlust providers for each seat, with
+# battle res and bloodlust in the group, and forms the group that favours
+# the longest waits and main specs the most. Looking at the providers too
+# means a group is always found when the queue can form one, even when the
+# longest waiting players bring no utility at all.
+class Matchmaker:
+    def __init__(self, window: int = MATCH_WINDOW, requireBrez: bool = True, requireLust: bool = True,
+                 clock: Callable[[], float] = time.monotonic, tracer: Tracer = None):
+        self.window = window
+        self.requireBrez = requireBrez
+        self.requireLust = requireLust
+        self.clock = clock
+        self.tracer = tracer if tracer is not None else Tracer()
+        self.queues: Dict[str, RoleQueue] = {seat: RoleQueue() for seat in ROLES}
+        # Players who can take each seat and bring each class of utility
+        self.providers: Dict[Tuple[str, int], RoleQueue] = {(seat, utility): RoleQueue()
+                                                             for seat in ROLES for utility in UTILITY_CLASSES}
+        # Candidate groups looked at so far, to keep an eye on how much work matching takes
+        self.examined = 0
+        self._entries: Dict[Hashable, QueueEntry] = {}
+        self._tickets = count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, player: Union[WoWPlayer, Hashable]) -> bool:
+        return self._key(player) in self._entries
+
+    @staticmethod
+    def _key(player: Union[WoWPlayer, Hashable]) -> Hashable:
+        return player.name if isinstance(player, WoWPlayer) else player
+
+    def entry(self, player: Union[WoWPlayer, Hashable]) -> Optional[QueueEntry]:
+        return self._entries.get(self._key(player))
+
+    # Adds a player to the queue, or updates their roles keeping their place,
+    # and returns the groups that could be formed now. Players are known by
+    # their name, or by key if given, like a Discord member id that stays the
+    # same when they rename.
+    def enqueue(self, player: WoWPlayer, data: object = None, key: Hashable = None) -> List[Match]:
+        seats = {seat for seat, _ in seatsFor(player)}
+        if not seats:
+            raise ValueError(f"{player.name} has no role to queue as")
+        key = key if key is not None else player.name
+        old = self._entries.get(key)
+        if old is not None:
+            self._drop(old)
+        entry = QueueEntry(ticket=old.ticket if old is not None else next(self._tickets), player=player,
+                           joined=old.joined if old is not None else self.clock(), data=data, key=key)
+        self._entries[key] = entry
+        for queue in self._queuesOf(player):
+            queue.push(entry)
+        self.tracer.debug('lfg_joined', lambda: f"{player.name} joined the queue as {sorted(seats)}",
+                          player=player, seats=sorted(seats))
+        return self.match()
+
+    def dequeue(self, player: Union[WoWPlayer, Hashable]) -> Optional[QueueEntry]:
+        entry = self._entries.pop(self._key(player), None)
+        if entry is not None:
+            self._drop(entry)
+        return entry
+
+    # Every queue the player waits in
+    def _queuesOf(self, player: WoWPlayer) -> List[RoleQueue]:
+        queues = []
+        for seat in {seat for seat, _ in seatsFor(player)}:
+            queues.append(self.queues[seat])
+            queues.extend(self.providers[(seat, utility)] for utility in UTILITY_CLASSES
+                          if player.roleMask & utility == utility)
+        return queues
+
+    def _drop(self, entry: QueueEntry):
+        entry.active = False
+        for queue in self._queuesOf(entry.player):
+            queue.discard()
+
+    # Forms as many groups as are possible right now, up to MAX_MATCHES_PER_EVENT
+    def match(self) -> List[Match]:
+        matches = []
+        while len(matches) < MAX_MATCHES_PER_EVENT:
+            entries = self._findGroup()
+            if entries is None:
+                break
+            now = self.clock()
+            for entry in entries:
+                self.dequeue(entry.key)
+            tank, healer, *dps = entries
+            match = Match(group=WoWGroup(tank=tank.player, healer=healer.player, dps=[e.player for e in dps]),
+                          entries=entries, waited=max(now - entry.joined for entry in entries))
+            self.tracer.info('lfg_matched', lambda: f"Formed LFG group after {match.waited:.0f}s: {match.group}",
+                             group=match.group, waited=match.waited)
+            matches.append(match)
+        return matches
+
+    # The longest waiting players for a seat, and the longest waiting providers of each utility for it
+    def _candidates(self, seat: str, window: int) -> List[QueueEntry]:
+        found = {entry.ticket: entry for entry in self.queues[seat].oldest(window)}
+        for utility in UTILITY_CLASSES:
+            for entry in self.providers[(seat, utility)].oldest(PROVIDER_WINDOW):
+                found.setdefault(entry.ticket, entry)
+        return sorted(found.values(), key=lambda entry: entry.ticket)
+
+    # The tank, healer and DPS entries of the best group among the candidates, or None if they can't form one.
+    #
+    # Any group the queue can form can be made from the candidates: a player
+    # who brings no utility the group needs can be swapped for anyone else in
+    # the window for their seat, and one who does for one of the oldest
+    # providers of that utility, and both lists are longer than the other
+    # four players in the group.
+    def _findGroup(self) -> Optional[List[QueueEntry]]:
+        tanks = self._candidates(TANK, self.window)
+        healers = self._candidates(HEALER, self.window)
+        # Room for the three DPS even if the tank and healer come from this list too
+        dps = self._candidates(DPS, self.window + 2)
+        if not tanks or not healers or len(dps) < 3:
+            return None
+
+        # Cost of each player in a seat: their place in line, plus the offspec cost
+        candidates = sorted({entry.ticket: entry for entry in tanks + healers + dps}.values(), key=lambda e: e.ticket)
+        place = {entry.ticket: n for n, entry in enumerate(candidates)}
+
+        def cost(entry: QueueEntry, seat: str) -> int:
+            offspec = next(off for s, off in seatsFor(entry.player) if s == seat)
+            return place[entry.ticket] + (OFFSPEC_COST if offspec else 0)
+
+        dpsCosts = {entry.ticket: cost(entry, DPS) for entry in dps}
+        byCost = sorted(dps, key=lambda entry: (dpsCosts[entry.ticket], entry.ticket))
+        required = (int(Role.BREZ) if self.requireBrez else 0) | (int(Role.LUST) if self.requireLust else 0)
+
+        best = None
+        for tank in tanks:
+            for healer in healers:
+                if healer is tank:
+                    continue
+                need = required & ~(tank.player.roleMask | healer.player.roleMask)
+                rest = [entry for entry in byCost if entry is not tank and entry is not healer]
+                # The best trio only ever needs the three cheapest DPS overall and the three
+                # cheapest of each utility class, since anyone else can be swapped for one of them
+                reduced = {}
+                for utility in (0,) + UTILITY_CLASSES:
+                    for entry in [e for e in rest if e.player.roleMask & utility == utility][:3]:
+                        reduced[entry.ticket] = entry
+                base = cost(tank, TANK) + cost(healer, HEALER)
+                for trio in combinations(reduced.values(), 3):
+                    self.examined += 1
+                    roles = 0
+                    for entry in trio:
+                        roles |= entry.player.roleMask
+                    if need & ~roles:
+                        continue
+                    total = base + sum(dpsCosts[entry.ticket] for entry in trio)
+                    if best is None or total < best[0]:
+                        best = (total, [tank, healer, *sorted(trio, key=lambda entry: entry.ticket)])
+        return best[1] if best is not None else None
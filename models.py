@@ -1,5 +1,111 @@
+from array import array
 from dataclasses import dataclass, field
-from typing import List
+from enum import IntFlag
+from typing import Iterable, List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Bit flags for every role and utility a player can have.
+# A whole player fits in one int, so role queries over a roster are just
+# mask operations.
+class Role(IntFlag):
+    TANK = 1 << 0
+    HEALER = 1 << 1
+    DPS = 1 << 2
+    OFFTANK = 1 << 3
+    OFFHEALER = 1 << 4
+    OFFDPS = 1 << 5
+    RANGED = 1 << 6
+    MELEE = 1 << 7
+    BREZ = 1 << 8
+    LUST = 1 << 9
+
+
+# Discord role name -> flags it grants. Ranged and Melee imply DPS.
+ROLE_NAME_FLAGS = {
+    'Tank': Role.TANK,
+    'Healer': Role.HEALER,
+    'DPS': Role.DPS,
+    'Tank Offspec': Role.OFFTANK,
+    'Healer Offspec': Role.OFFHEALER,
+    'DPS Offspec': Role.OFFDPS,
+    'Ranged': Role.DPS | Role.RANGED,
+    'Melee': Role.DPS | Role.MELEE,
+    'Brez': Role.BREZ,
+    'Lust': Role.LUST,
+}
+
+# Flag -> Discord role name, in the order toTestString lists them
+FLAG_ROLE_NAMES = [
+    (Role.TANK, 'Tank'),
+    (Role.HEALER, 'Healer'),
+    (Role.DPS, 'DPS'),
+    (Role.OFFTANK, 'Tank Offspec'),
+    (Role.OFFHEALER, 'Healer Offspec'),
+    (Role.OFFDPS, 'DPS Offspec'),
+    (Role.RANGED, 'Ranged'),
+    (Role.MELEE, 'Melee'),
+    (Role.BREZ, 'Brez'),
+    (Role.LUST, 'Lust'),
+]
+
+# WoWPlayer field -> flag
+FIELD_FLAGS = [
+    ('tankMain', Role.TANK),
+    ('healerMain', Role.HEALER),
+    ('dpsMain', Role.DPS),
+    ('offtank', Role.OFFTANK),
+    ('offhealer', Role.OFFHEALER),
+    ('offdps', Role.OFFDPS),
+    ('ranged', Role.RANGED),
+    ('melee', Role.MELEE),
+    ('hasBrez', Role.BREZ),
+    ('hasLust', Role.LUST),
+]
+
+ANY_ROLE = Role.TANK | Role.HEALER | Role.DPS | Role.OFFTANK | Role.OFFHEALER | Role.OFFDPS
+
+# The roles a group has seats for
+TANK = 'tank'
+HEALER = 'healer'
+DPS = 'dps'
+ROLES = (TANK, HEALER, DPS)
+
+# Role -> (main spec flag, offspec flag), in the order of ROLES
+ROLE_SLOTS = {
+    TANK: (Role.TANK, Role.OFFTANK),
+    HEALER: (Role.HEALER, Role.OFFHEALER),
+    DPS: (Role.DPS, Role.OFFDPS),
+}
+
+# Every seat of a full group, in the order scoring.seatsOf lists them
+SEATS = (TANK, HEALER, 'dps0', 'dps1', 'dps2')
+
+# How much worse playing an offspec is than a main spec. The role assignment
+# counts it per player, the matchmaker as places in the queue.
+OFFSPEC_COST = 2
+
+
+# The role a seat is for
+def seatRole(seat: str) -> str:
+    return DPS if seat.startswith(DPS) else seat
+
+
+def rolesToMask(roles: Iterable[str]) -> int:
+    mask = 0
+    for role in roles:
+        mask |= ROLE_NAME_FLAGS.get(role, 0)
+    return int(mask)
+
+
+def maskToRoles(mask: int) -> List[str]:
+    # Ranged and Melee already imply DPS, but we still list DPS on its own like the Discord roles do
+    return [name for flag, name in FLAG_ROLE_NAMES if mask & flag]
+
 
 @dataclass(frozen=True, eq=False)
 class WoWPlayer:
@@ -22,6 +128,16 @@ class WoWPlayer:
     hasBrez: bool = False
     hasLust: bool = False
 
+    # All of the flags above packed into one int, see Role
+    roleMask: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        mask = 0
+        for name, flag in FIELD_FLAGS:
+            if getattr(self, name):
+                mask |= flag
+        object.__setattr__(self, 'roleMask', int(mask))
+
     def __hash__(self):
         return hash(self.name)
 
@@ -38,59 +154,17 @@ class WoWPlayer:
 
     @classmethod
     def create(cls, name: str, roles: list) -> 'WoWPlayer':
-        # Calculate all the boolean flags
-        tankMain = 'Tank' in roles
-        healerMain = 'Healer' in roles
-        dpsMain = any(role in roles for role in ['DPS', 'Ranged', 'Melee'])
-        offtank = 'Tank Offspec' in roles
-        offhealer = 'Healer Offspec' in roles
-        offdps = 'DPS Offspec' in roles
-        ranged = 'Ranged' in roles
-        melee = 'Melee' in roles
-        hasBrez = 'Brez' in roles
-        hasLust = 'Lust' in roles
-
-        # Create the instance with all flags set
-        return cls(
-            name=name,
-            tankMain=tankMain,
-            healerMain=healerMain,
-            dpsMain=dpsMain,
-            offtank=offtank,
-            offhealer=offhealer,
-            offdps=offdps,
-            ranged=ranged,
-            melee=melee,
-            hasBrez=hasBrez,
-            hasLust=hasLust,
-        )
+        return cls.fromRoleMask(name, rolesToMask(roles))
+
+    @classmethod
+    def fromRoleMask(cls, name: str, mask: int) -> 'WoWPlayer':
+        return cls(name, **{field: bool(mask & flag) for field, flag in FIELD_FLAGS})
     
     def hasRoles(self) -> bool:
-        return any([self.tankMain, self.healerMain, self.dpsMain, self.offtank, self.offhealer, self.offdps])
+        return bool(self.roleMask & ANY_ROLE)
 
     def toTestString(self) -> str:
-        roles = []
-        if self.tankMain:
-            roles.append("Tank")
-        if self.healerMain:
-            roles.append("Healer")
-        if self.dpsMain:
-            roles.append("DPS")
-        if self.offtank:
-            roles.append("Tank Offspec")
-        if self.offhealer:
-            roles.append("Healer Offspec")
-        if self.offdps:
-            roles.append("DPS Offspec")
-        if self.ranged:
-            roles.append("Ranged")
-        if self.melee:
-            roles.append("Melee")
-        if self.hasBrez:
-            roles.append("Brez")
-        if self.hasLust:
-            roles.append("Lust")
-        return f'WoWPlayer.create("{self.name}", {roles})'
+        return f'WoWPlayer.create("{self.name}", {maskToRoles(self.roleMask)})'
     
     def toUtilitiesString(self) -> str:
         utilities = []
@@ -139,3 +213,53 @@ class WoWGroup:
         dps_str = ', '.join(f'"{p.toUtilitiesString()}"' for p in self.dps) if self.dps else ''
         return f'WoWGroup(Tank={tank_str}, Healer={healer_str}, DPS={dps_str})'
     
+
+
+# A whole roster stored as parallel arrays: names and an int role mask per
+# player. Role and utility queries run over the mask array instead of
+# reading bool attributes one player at a time, and are vectorized with
+# NumPy when it is installed.
+class RosterTable:
+    def __init__(self, players: Iterable[WoWPlayer]):
+        self.players: List[WoWPlayer] = list(players)
+        self.names: List[str] = [p.name for p in self.players]
+        self.masks = array('I', (p.roleMask for p in self.players))
+
+    @classmethod
+    def fromMasks(cls, names: Iterable[str], masks: Iterable[int]) -> 'RosterTable':
+        return cls(WoWPlayer.fromRoleMask(name, mask) for name, mask in zip(names, masks))
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def __iter__(self):
+        return iter(self.players)
+
+    # A zero copy NumPy view of the masks, or None without NumPy
+    def numpyMasks(self):
+        if np is None:
+            return None
+        return np.frombuffer(self.masks, dtype=np.uint32)
+
+    # Indexes of the players that have every flag in allOf, at least one flag
+    # in anyOf (if given) and none of the flags in noneOf
+    def select(self, allOf: int = 0, anyOf: int = 0, noneOf: int = 0) -> List[int]:
+        allOf, anyOf, noneOf = int(allOf), int(anyOf), int(noneOf)
+        masks = self.numpyMasks()
+        if masks is not None:
+            hits = (masks & allOf) == allOf
+            if anyOf:
+                hits &= (masks & anyOf) != 0
+            if noneOf:
+                hits &= (masks & noneOf) == 0
+            return np.flatnonzero(hits).tolist()
+        return [
+            i for i, mask in enumerate(self.masks)
+            if mask & allOf == allOf and (not anyOf or mask & anyOf) and not mask & noneOf
+        ]
+
+    def playersWith(self, allOf: int = 0, anyOf: int = 0, noneOf: int = 0) -> List[WoWPlayer]:
+        return [self.players[i] for i in self.select(allOf, anyOf, noneOf)]
+
+    def count(self, allOf: int = 0, anyOf: int = 0, noneOf: int = 0) -> int:
+        return len(self.select(allOf, anyOf, noneOf))
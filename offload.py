@@ -0,0 +1,182 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List, Optional, Tuple
+import asyncio
+import threading
+import time
+from models import WoWPlayer, WoWGroup
+from engine import GREEDY, GroupEngine
+from pairing_history import PairingHistory
+
+# Kinds of executor the solver can run in
+THREAD = 'thread'
+PROCESS = 'process'
+EXECUTORS = (THREAD, PROCESS)
+
+# How long to wait for the solver before settling for greedy groups, in seconds
+DEFAULT_TIMEOUT = 2.0
+
+
+def makeExecutor(kind: str = THREAD, workers: Optional[int] = None) -> Executor:
+    if kind == THREAD:
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='wheel')
+    if kind == PROCESS:
+        return ProcessPoolExecutor(max_workers=workers)
+    raise ValueError(f"Unknown executor kind: {kind}")
+
+
+@dataclass
+class OffloadResult:
+    groups: List[WoWGroup]
+    stats: dict = field(default_factory=dict)
+    # True when the solver overran or failed and these are the plain greedy groups
+    fallback: bool = False
+    elapsed: float = 0.0
+
+
+# Runs in the executor, so everything it needs is passed in and it only builds an engine of its own
+def _solve(players: List[WoWPlayer], lastGroups: List[WoWGroup], history: Optional[PairingHistory], mode: str,
+           deadline: float, seed: int) -> Tuple[List[WoWGroup], dict]:
+    engine = GroupEngine(mode=mode, deadline=deadline, history=history, seed=seed, lastGroups=lastGroups)
+    stats = {}
+    groups = engine.solve(players, stats=stats)
+    return groups, stats
+
+
+# The plain greedy groups for the players, built in the executor too so the
+# event loop stays free. Only if the executor can't build them in time
+# either, because it's broken or every worker is stuck, are they built
+# right here, which takes milliseconds.
+async def _greedyGroups(engine: GroupEngine, players: List[WoWPlayer], executor: Executor,
+                        timeout: float) -> List[WoWGroup]:
+    loop = asyncio.get_running_loop()
+    history = engine.history.copy() if engine.history is not None else None
+    try:
+        future = loop.run_in_executor(executor, _solve, players, list(engine.lastGroups), history, GREEDY,
+                                      engine.deadline, engine.rng.getrandbits(64))
+        groups, _ = await asyncio.wait_for(future, timeout)
+        return groups
+    except Exception as e:
+        engine.tracer.warning('greedy_inline', lambda: f"Executor couldn't build the greedy groups, "
+                                                       f"building them here: {e!r}", error=e)
+        return engine.solve(players, mode=GREEDY)
+
+
+# Solves the engine's groups in an executor so the event loop stays free.
+#
+# The engine's settings, last groups and a snapshot of its history are sent
+# to the executor, with a seed drawn from the engine's random generator. If
+# the solver doesn't answer within the timeout, or fails, the plain greedy
+# groups are built instead, which takes milliseconds. A thread
+# that overran can't be stopped, so it finishes in the background and its
+# groups are thrown away.
+#
+# Like engine.solve, this doesn't change the engine, and a deadline or mode
+# overrides the engine's own. Cancelling the calling task cancels the wait, and the
+# solver if it hasn't started yet.
+async def solveOffloaded(engine: GroupEngine, players: List[WoWPlayer], executor: Executor,
+                         timeout: float = DEFAULT_TIMEOUT, deadline: float = None, mode: str = None) -> OffloadResult:
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    history = engine.history.copy() if engine.history is not None else None
+    try:
+        # Submitting fails right away when the pool is shut down or broken
+        future = loop.run_in_executor(executor, _solve, players, list(engine.lastGroups), history,
+                                      engine.mode if mode is None else mode,
+                                      engine.deadline if deadline is None else deadline,
+                                      engine.rng.getrandbits(64))
+        groups, stats = await asyncio.wait_for(future, timeout)
+        return OffloadResult(groups=groups, stats=stats, elapsed=time.perf_counter() - start)
+    except asyncio.TimeoutError:
+        engine.tracer.warning('solver_timeout', lambda: f"Solver took over {timeout}s, using greedy groups",
+                              timeout=timeout)
+    except Exception as e:
+        engine.tracer.warning('solver_failed', lambda: f"Solver failed, using greedy groups: {e!r}", error=e)
+
+    groups = await _greedyGroups(engine, players, executor, timeout)
+    return OffloadResult(groups=groups, fallback=True, elapsed=time.perf_counter() - start)
+
+
+# Like solveOffloaded, but yields each group as soon as the solver has it (see engine.iterGroups),
+# so the first groups can be shown while the rest are still being built.
+#
+# Only a thread pool can hand the groups back one at a time, and only in
+# one of engine.STREAMING_MODES; in OPTIMAL and ANYTIME mode, or with a
+# process pool, all the groups are solved first and then yielded. Pass a
+# streaming mode to override the engine's own.
+#
+# If the solver doesn't have every group within the timeout, or fails, the
+# players who aren't in a group yet get the plain greedy groups instead, so
+# a stuck solver never holds up the reveal. Stopping early, or cancelling,
+# tells the solver thread to stop at its next group. stats gets the
+# solver's stats once the last group is out.
+async def streamOffloaded(engine: GroupEngine, players: List[WoWPlayer], executor: Executor,
+                          timeout: float = DEFAULT_TIMEOUT, deadline: float = None,
+                          stats: dict = None, mode: str = None) -> AsyncIterator[WoWGroup]:
+    if not isinstance(executor, ThreadPoolExecutor):
+        result = await solveOffloaded(engine, players, executor, timeout, deadline=deadline, mode=mode)
+        if stats is not None:
+            stats.update(result.stats)
+        for group in result.groups:
+            yield group
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    finished = object()
+    solver = GroupEngine(mode=engine.mode if mode is None else mode,
+                         deadline=engine.deadline if deadline is None else deadline,
+                         history=engine.history.copy() if engine.history is not None else None,
+                         seed=engine.rng.getrandbits(64), lastGroups=engine.lastGroups)
+
+    def push(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # The event loop is gone, so nobody is listening anymore
+            stop.set()
+
+    # Runs in the executor
+    def run():
+        try:
+            solverStats = {}
+            for group in solver.iterSolve(players, stats=solverStats):
+                if stop.is_set():
+                    return
+                push(group)
+            if stats is not None:
+                stats.update(solverStats)
+            push(finished)
+        except Exception as e:
+            push(e)
+
+    stopAt = loop.time() + timeout
+    out = set()
+    try:
+        try:
+            # Submitting fails right away when the pool is shut down or broken
+            loop.run_in_executor(executor, run)
+            while True:
+                if queue.empty():
+                    item = await asyncio.wait_for(queue.get(), max(0.0, stopAt - loop.time()))
+                else:
+                    item = queue.get_nowait()
+                if item is finished:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                out.update(item.players)
+                yield item
+        except asyncio.TimeoutError:
+            engine.tracer.warning('solver_timeout', lambda: f"Solver took over {timeout}s, using greedy groups "
+                                                            f"for the last {len(players) - len(out)} players",
+                                  timeout=timeout)
+        except Exception as e:
+            engine.tracer.warning('solver_failed', lambda: f"Solver failed, using greedy groups: {e!r}", error=e)
+    finally:
+        stop.set()
+
+    rest = [player for player in players if player not in out]
+    for group in await _greedyGroups(engine, rest, executor, timeout):
+        yield group
@@ -0,0 +1,165 @@
+from array import array
+from typing import Dict, Iterable, List, Tuple, Union
+import base64
+import json
+import os
+from models import WoWPlayer, WoWGroup
+
+# How much of a pairing is remembered after each later session.
+# With 0.5 a pairing from last week counts half as much as one from tonight.
+DEFAULT_DECAY = 0.5
+
+# Renormalize the stored counts once the lazy decay scale gets this small
+MIN_SCALE = 1e-100
+
+PlayerKey = Union[WoWPlayer, str]
+
+
+# Remembers how often every pair of players has been grouped together, across
+# many sessions, with exponential decay per session.
+#
+# Players are keyed by a stable ID (their name, which is also what makes two
+# WoWPlayers equal) and each ID gets a fixed index the first time it is seen.
+# The counts for every pair live in a single flat lower triangular array of
+# doubles, laid out row by row so adding a new player only appends to it.
+# Looking up a pair is O(1).
+#
+# Decay is lazy: the real weight of a pair is the stored count times a global
+# scale, so decaying a whole session is one multiplication instead of a pass
+# over every pair.
+class PairingHistory:
+    def __init__(self, decay: float = DEFAULT_DECAY):
+        self.decay = decay
+        self.sessions = 0
+        self._ids: Dict[str, int] = {}
+        self._counts = array('d')
+        self._scale = 1.0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, player: PlayerKey) -> bool:
+        return self._key(player) in self._ids
+
+    @staticmethod
+    def _key(player: PlayerKey) -> str:
+        return player.name if isinstance(player, WoWPlayer) else str(player)
+
+    @staticmethod
+    def _offset(i: int, j: int) -> int:
+        if i < j:
+            i, j = j, i
+        return i * (i - 1) // 2 + j
+
+    def _index(self, player: PlayerKey) -> int:
+        key = self._key(player)
+        index = self._ids.get(key)
+        if index is None:
+            index = len(self._ids)
+            self._ids[key] = index
+            # Row `index` of the triangle holds its pairs with every earlier player
+            self._counts.extend(array('d', bytes(8 * index)))
+        return index
+
+    # How much the two players have played together, decayed by age
+    def weight(self, a: PlayerKey, b: PlayerKey) -> float:
+        i = self._ids.get(self._key(a))
+        j = self._ids.get(self._key(b))
+        if i is None or j is None or i == j:
+            return 0.0
+        return self._counts[self._offset(i, j)] * self._scale
+
+    # The total pairing weight between a candidate and a group of players
+    def score(self, player: PlayerKey, others: Iterable[PlayerKey]) -> float:
+        i = self._ids.get(self._key(player))
+        if i is None:
+            return 0.0
+        total = 0.0
+        for other in others:
+            j = self._ids.get(self._key(other))
+            if j is not None and j != i:
+                total += self._counts[self._offset(i, j)]
+        return total * self._scale
+
+    # Every pair of the given players that has played together, with its weight.
+    # Walks one row of the triangle per player, so it looks at every pair once
+    # without the cost of a weight() call for each.
+    def pairs(self, players: Iterable[PlayerKey]) -> List[Tuple[PlayerKey, PlayerKey, float]]:
+        indexed = {}
+        for player in players:
+            index = self._ids.get(self._key(player))
+            if index is not None:
+                indexed.setdefault(index, player)
+        found = []
+        earlier = []
+        for i, player in sorted(indexed.items()):
+            start = i * (i - 1) // 2
+            row = self._counts[start:start + i]
+            found.extend((other, player, row[j] * self._scale) for j, other in earlier if row[j])
+            earlier.append((i, player))
+        return found
+
+    # Ages every existing pairing by one session
+    def decaySession(self):
+        self._scale *= self.decay
+        if self._scale < MIN_SCALE:
+            scale = self._scale
+            for offset, count in enumerate(self._counts):
+                self._counts[offset] = count * scale
+            self._scale = 1.0
+
+    # Ages the history, then counts every pair in the given groups once
+    def recordSession(self, groups: Iterable[WoWGroup]):
+        self.decaySession()
+        increment = 1.0 / self._scale
+        for group in groups:
+            indexes = [self._index(p) for p in group.players]
+            for n, i in enumerate(indexes):
+                for j in indexes[:n]:
+                    if i != j:
+                        self._counts[self._offset(i, j)] += increment
+        self.sessions += 1
+
+    # A snapshot that can be read in another thread while this one keeps recording sessions
+    def copy(self) -> 'PairingHistory':
+        history = PairingHistory(decay=self.decay)
+        history.sessions = self.sessions
+        history._ids = dict(self._ids)
+        history._counts = array('d', self._counts)
+        history._scale = self._scale
+        return history
+
+    def toDict(self) -> dict:
+        counts = array('d', (count * self._scale for count in self._counts))
+        return {
+            'decay': self.decay,
+            'sessions': self.sessions,
+            'players': sorted(self._ids, key=self._ids.get),
+            'counts': base64.b64encode(counts.tobytes()).decode('ascii'),
+        }
+
+    @classmethod
+    def fromDict(cls, data: dict) -> 'PairingHistory':
+        history = cls(decay=data.get('decay', DEFAULT_DECAY))
+        history.sessions = data.get('sessions', 0)
+        players: List[str] = data.get('players', [])
+        history._ids = {name: index for index, name in enumerate(players)}
+        history._counts.frombytes(base64.b64decode(data.get('counts', '')))
+        expected = len(players) * (len(players) - 1) // 2
+        if len(history._counts) != expected:
+            raise ValueError(f"Pairing history has {len(history._counts)} counts, expected {expected}")
+        return history
+
+    def save(self, path: str):
+        tmpPath = f'{path}.tmp'
+        with open(tmpPath, 'w') as f:
+            json.dump(self.toDict(), f)
+        os.replace(tmpPath, path)
+
+    # Loads a saved history, or starts an empty one if there is none yet
+    @classmethod
+    def load(cls, path: str, decay: float = DEFAULT_DECAY) -> 'PairingHistory':
+        if not os.path.exists(path):
+            return cls(decay=decay)
+        with open(path) as f:
+            return cls.fromDict(json.load(f))
@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+from functools import wraps
+from typing import Callable, Dict
+import time
+
+
+@dataclass
+class PhaseStat:
+    calls: int = 0
+    seconds: float = 0.0
+
+
+# Wall time and call counts for the phases of a run and for its helpers.
+#
+# Phases are timed lap style: lap(name) charges everything since the previous
+# lap to that phase, so marking a phase is one line at its end. Helpers are
+# wrapped with timed(name), which counts every call and its time, including
+# time spent in other timed helpers it calls.
+class PhaseTimer:
+    def __init__(self):
+        self.phases: Dict[str, PhaseStat] = {}
+        self._last = time.perf_counter()
+
+    def record(self, name: str, seconds: float):
+        stat = self.phases.get(name)
+        if stat is None:
+            stat = self.phases[name] = PhaseStat()
+        stat.calls += 1
+        stat.seconds += seconds
+
+    def lap(self, name: str):
+        now = time.perf_counter()
+        self.record(name, now - self._last)
+        self._last = now
+
+    def timed(self, name: str, function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return wrapper
+
+
+# Used when nobody asked for timings, so the hot paths pay nothing
+class NullPhaseTimer(PhaseTimer):
+    def record(self, name: str, seconds: float):
+        pass
+
+    def lap(self, name: str):
+        pass
+
+    def timed(self, name: str, function: Callable) -> Callable:
+        return function
+
+
+# One line per phase, slowest first
+def formatPhases(phases: Dict[str, PhaseStat]) -> str:
+    ordered = sorted(phases.items(), key=lambda item: item[1].seconds, reverse=True)
+    return "\n".join(f"{name}: {stat.seconds * 1000:.2f}ms in {stat.calls} calls" for name, stat in ordered)
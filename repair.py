@@ -0,0 +1,298 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from models import DPS, HEALER, ROLES, TANK, WoWPlayer, WoWGroup
+from pairing_history import PairingHistory
+from role_pool import seatsFor
+
+
+# Who sits in which seat of the group
+def _seatsOf(group: WoWGroup) -> List[Tuple[WoWPlayer, str]]:
+    seats = [(group.tank, TANK), (group.healer, HEALER)] + [(player, DPS) for player in group.dps]
+    return [(player, seat) for player, seat in seats if player is not None]
+
+
+def openSeats(group: WoWGroup) -> List[str]:
+    seats = []
+    if group.tank is None:
+        seats.append(TANK)
+    if group.healer is None:
+        seats.append(HEALER)
+    if len(group.dps) < 3:
+        seats.append(DPS)
+    return seats
+
+
+# Which group every player is in, and which groups have an open seat for each role.
+#
+# Built once per set of groups, after which moving a player in or out only
+# touches the one group. Groups are copied the first time they change, so
+# whoever else holds the original groups never sees them change.
+class SlotIndex:
+    def __init__(self, groups: Iterable[WoWGroup]):
+        self.groups: List[WoWGroup] = list(groups)
+        self.where: Dict[WoWPlayer, int] = {}
+        self.open: Dict[str, Set[int]] = {seat: set() for seat in ROLES}
+        self._copied: Set[int] = set()
+        for i, group in enumerate(self.groups):
+            for player in group.players:
+                self.where[player] = i
+            self._refresh(i)
+
+    def __contains__(self, player: WoWPlayer) -> bool:
+        return player in self.where
+
+    def _refresh(self, i: int):
+        seats = openSeats(self.groups[i])
+        for seat in ROLES:
+            if seat in seats:
+                self.open[seat].add(i)
+            else:
+                self.open[seat].discard(i)
+
+    def _touch(self, i: int) -> WoWGroup:
+        if i not in self._copied:
+            group = self.groups[i]
+            self.groups[i] = WoWGroup(tank=group.tank, healer=group.healer, dps=list(group.dps))
+            self._copied.add(i)
+        return self.groups[i]
+
+    # Starts a new batch of changes; groups changed after this are copied again
+    def freeze(self):
+        self._copied.clear()
+
+    # Takes a player out of their group, returning the group and the seat they left
+    def remove(self, player: WoWPlayer) -> Optional[Tuple[int, str]]:
+        i = self.where.pop(player, None)
+        if i is None:
+            return None
+        group = self._touch(i)
+        if group.tank == player:
+            group.tank, seat = None, TANK
+        elif group.healer == player:
+            group.healer, seat = None, HEALER
+        else:
+            group.dps = [p for p in group.dps if p != player]
+            seat = DPS
+        self._refresh(i)
+        return i, seat
+
+    def place(self, player: WoWPlayer, i: int, seat: str):
+        group = self._touch(i)
+        if seat == TANK:
+            group.tank = player
+        elif seat == HEALER:
+            group.healer = player
+        else:
+            group.dps.append(player)
+        self.where[player] = i
+        self._refresh(i)
+
+    def addGroup(self) -> int:
+        self.groups.append(WoWGroup())
+        i = len(self.groups) - 1
+        self._copied.add(i)
+        self._refresh(i)
+        return i
+
+    # Drops empty groups. Only groups after the first empty one are renumbered.
+    def compact(self) -> List[int]:
+        empty = [i for i, group in enumerate(self.groups) if group.size == 0]
+        if not empty:
+            return list(range(len(self.groups)))
+        renumbered = []
+        kept = []
+        for i, group in enumerate(self.groups):
+            renumbered.append(len(kept) if group.size else -1)
+            if group.size:
+                kept.append(group)
+        self.groups = kept
+        self._copied = {renumbered[i] for i in self._copied if renumbered[i] >= 0}
+        self.open = {seat: set() for seat in ROLES}
+        for i in range(empty[0], len(kept)):
+            for player in kept[i].players:
+                self.where[player] = i
+        for i in range(len(kept)):
+            self._refresh(i)
+        return renumbered
+
+
+@dataclass
+class RepairResult:
+    groups: List[WoWGroup]
+    # Indexes of the groups that changed, or moved up when a group before them was dropped
+    changed: List[int] = field(default_factory=list)
+    # Players moved in or between groups
+    moves: int = 0
+    # Players to remove that weren't in any group
+    missing: List[WoWPlayer] = field(default_factory=list)
+
+
+# How good a seat in group i is for the player, lower is better: the fullest
+# group first, so holes in real groups are filled before remainder groups,
+# then main specs, then groups missing a utility the player brings, then
+# players they've played with the least.
+def _placementRank(index: SlotIndex, i: int, player: WoWPlayer, offspec: bool, seat: str,
+                   history: Optional[PairingHistory]) -> tuple:
+    group = index.groups[i]
+    members = group.players
+    needed = ((player.hasBrez and not group.has_brez) or (player.hasLust and not group.has_lust)
+              or (seat == DPS and player.ranged and not group.has_ranged))
+    return (-len(members), offspec, not needed, history.score(player, members) if history else 0.0, i)
+
+
+def _bestSeat(index: SlotIndex, player: WoWPlayer, history: Optional[PairingHistory],
+              groups: Iterable[int] = None) -> Optional[Tuple[int, str]]:
+    best = None
+    for seat, offspec in seatsFor(player):
+        candidates = index.open[seat] if groups is None else [i for i in groups if i in index.open[seat]]
+        for i in candidates:
+            rank = _placementRank(index, i, player, offspec, seat, history)
+            if best is None or rank < best[0]:
+                best = (rank, i, seat)
+    return best[1:] if best is not None else None
+
+
+# Whether the player can take the seat, and if so whether it's an offspec for them
+def _seatCost(player: WoWPlayer, seat: str) -> Optional[bool]:
+    return next((offspec for s, offspec in seatsFor(player) if s == seat), None)
+
+
+# The way to seat the players of a full group after `leaving` swaps with
+# `joining` that moves the fewest players to another seat, then plays the
+# fewest offspecs, as (players moved, offspecs, [(player, seat)]), or None if
+# there isn't any
+def _reseat(group: WoWGroup, leaving: WoWPlayer, joining: WoWPlayer) -> Optional[Tuple[int, int, List[Tuple[WoWPlayer, str]]]]:
+    members = [player for player in group.players if player != leaving] + [joining]
+    best = None
+    for tank in members:
+        tankOffspec = _seatCost(tank, TANK)
+        if tankOffspec is None:
+            continue
+        for healer in members:
+            healerOffspec = _seatCost(healer, HEALER) if healer is not tank else None
+            if healerOffspec is None:
+                continue
+            dps = [player for player in members if player is not tank and player is not healer]
+            dpsOffspecs = [_seatCost(player, DPS) for player in dps]
+            if None in dpsOffspecs:
+                continue
+            moved = (tank != group.tank) + (healer != group.healer) + sum(1 for player in dps if player not in group.dps)
+            offspecs = tankOffspec + healerOffspec + sum(dpsOffspecs)
+            if best is None or (moved, offspecs) < best[:2]:
+                best = (moved, offspecs, [(tank, TANK), (healer, HEALER)] + [(player, DPS) for player in dps])
+    return best
+
+
+# When no smaller group has anyone for the open seat of group i, a player of a
+# complete group who can take it moves over, and someone from a smaller
+# incomplete group takes their place, with the complete group's players
+# re-seated, onto an offspec if need be, so it stays complete. The swap that
+# changes the fewest seats wins, then the one with the fewest offspecs.
+# Returns (rank, group, donor group, player, donor, seating) or None.
+def _bestSwap(index: SlotIndex, i: int, seat: str) -> Optional[tuple]:
+    size = index.groups[i].size
+    donors = [(j, player) for j in index.open[TANK] | index.open[HEALER] | index.open[DPS]
+              if j != i and index.groups[j].size < size for player in index.groups[j].players]
+    if not donors:
+        return None
+    best = None
+    for k, group in enumerate(index.groups):
+        if k == i or not group.is_complete:
+            continue
+        for player in group.players:
+            offspec = _seatCost(player, seat)
+            if offspec is None:
+                continue
+            for j, donor in donors:
+                seating = _reseat(group, player, donor)
+                if seating is None:
+                    continue
+                moved, offspecs, seats = seating
+                rank = (moved + 1, offspecs + offspec, index.groups[j].size, k, j)
+                if best is None or rank < best[0]:
+                    best = (rank, k, j, player, donor, seats)
+    return best
+
+
+# Fixes the groups after players joined or left, touching as few of them as possible.
+#
+# Players who left are taken out of their groups. Players who joined take
+# the best open seat for them, filling holes in the fullest groups first,
+# or start a new group if no seat fits. Any hole still left in a group is
+# then filled by moving one player over from a smaller, incomplete group.
+# Those steps only look at the groups with an open seat, so the work grows
+# with the number of players that changed and not with the roster. Only
+# when no such player can take the seat are the complete groups searched
+# for a swap that fills it (see _bestSwap).
+#
+# index is the SlotIndex of the groups; pass one kept from an earlier repair
+# to skip building it. It ends up indexing the repaired groups.
+def repairGroups(groups: List[WoWGroup], added: Iterable[WoWPlayer] = (), removed: Iterable[WoWPlayer] = (),
+                 history: PairingHistory = None, index: SlotIndex = None) -> RepairResult:
+    index = index if index is not None else SlotIndex(groups)
+    index.freeze()
+    changed: Set[int] = set()
+    holes: Set[int] = set()
+    missing = []
+    moves = 0
+
+    for player in removed:
+        spot = index.remove(player)
+        if spot is None:
+            missing.append(player)
+            continue
+        changed.add(spot[0])
+        holes.add(spot[0])
+
+    for player in added:
+        if player in index:
+            continue
+        spot = _bestSeat(index, player, history)
+        if spot is None:
+            index.addGroup()
+            spot = _bestSeat(index, player, history, groups=[len(index.groups) - 1])
+        if spot is None:
+            # Has no role at all
+            missing.append(player)
+            continue
+        index.place(player, *spot)
+        changed.add(spot[0])
+        moves += 1
+
+    # Fill what's left of the holes from smaller groups, the fullest group first
+    for i in sorted(holes, key=lambda i: -index.groups[i].size):
+        for seat in openSeats(index.groups[i]):
+            while i in index.open[seat]:
+                size = index.groups[i].size
+                donors = [(index.groups[j].size, j, player) for j in index.open[TANK] | index.open[HEALER] | index.open[DPS]
+                          if j != i and index.groups[j].size < size
+                          for player in index.groups[j].players if any(s == seat for s, _ in seatsFor(player))]
+                if donors:
+                    _, j, player = min(donors, key=lambda donor: (donor[0], donor[1]))
+                    index.remove(player)
+                    index.place(player, i, seat)
+                    changed.update((i, j))
+                    moves += 1
+                    continue
+                swap = _bestSwap(index, i, seat)
+                if swap is None:
+                    break
+                _, k, j, player, donor, seating = swap
+                index.remove(player)
+                index.remove(donor)
+                # Only the donor and the players changing seat are taken out and seated again
+                current = dict(_seatsOf(index.groups[k]))
+                reseated = [(member, s) for member, s in seating if current.get(member) != s]
+                for member, _ in reseated:
+                    if member in current:
+                        index.remove(member)
+                for member, s in reseated:
+                    index.place(member, k, s)
+                index.place(player, i, seat)
+                changed.update((i, j, k))
+                moves += 2
+
+    renumbered = index.compact()
+    changed = {renumbered[i] for i in changed if renumbered[i] >= 0}
+    changed.update(new for old, new in enumerate(renumbered) if new >= 0 and new != old)
+    return RepairResult(groups=list(index.groups), changed=sorted(changed), moves=moves, missing=missing)
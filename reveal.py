@@ -0,0 +1,314 @@
+from dataclasses import dataclass
+from typing import AsyncIterable, Awaitable, Callable, Iterable, List, Optional, Tuple, TypeVar, Union
+import asyncio
+import time
+from models import WoWGroup
+
+PLACEHOLDER_CHAR = ':question:'
+
+# Upper bound on how long revealing all the groups may take, in seconds
+DEFAULT_REVEAL_TIME = 10.0
+# Longest pause between two steps of the animation, like the old one second typing pauses
+MAX_STEP_DELAY = 1.0
+
+# Discord lets a channel take about 5 message sends or edits every 5 seconds
+DISCORD_RATE = 1.0
+DISCORD_BURST = 5
+
+# Most embeds Discord shows in one message
+MAX_EMBEDS = 10
+
+# How the groups are sent: a message per group, or as many groups as fit in each message
+SINGLE = 'single'
+BATCH = 'batch'
+OUTPUT_MODES = (SINGLE, BATCH)
+
+Message = TypeVar('Message')
+
+
+@dataclass(frozen=True)
+class Field:
+    name: str
+    value: str
+    inline: bool = True
+
+
+# What one group's embed shows at one step of the reveal
+@dataclass(frozen=True)
+class Frame:
+    title: str
+    fields: Tuple[Field, ...]
+
+
+def dashed(name: str) -> str:
+    return '?' * len(name)
+
+
+# Every step of one group's reveal: all names hidden, then the tank, the healer,
+# each DPS in turn and finally who has battle res and bloodlust.
+def groupFrames(group: WoWGroup, number: int) -> List[Frame]:
+    tank = group.tank.name if group.tank else PLACEHOLDER_CHAR
+    healer = group.healer.name if group.healer else PLACEHOLDER_CHAR
+    dps = [group.dps[n].name if len(group.dps) > n else PLACEHOLDER_CHAR for n in range(3)]
+    brez = next((p.name for p in group.players if p.hasBrez), "None")
+    lust = next((p.name for p in group.players if p.hasLust), "None")
+
+    def frame(shown: int) -> Frame:
+        reveal = lambda name, step: name if shown >= step else dashed(name)
+        return Frame(title=f"Group {number}", fields=(
+            Field('Tank', reveal(tank, 1)),
+            Field('Healer', reveal(healer, 2)),
+            Field('DPS', ', '.join(reveal(name, 3 + n) for n, name in enumerate(dps))),
+            Field('Battle Res', reveal(brez, 6)),
+            Field('Bloodlust', reveal(lust, 6)),
+        ))
+
+    return [frame(shown) for shown in range(7)]
+
+
+# The first frame and `steps` more, evenly spread and always ending on the fully revealed one.
+# With no steps at all only the fully revealed frame is left.
+def pickFrames(frames: List[Frame], steps: int) -> List[Frame]:
+    if steps <= 0:
+        return frames[-1:]
+    steps = min(steps, len(frames) - 1)
+    return [frames[0]] + [frames[round(n * (len(frames) - 1) / steps)] for n in range(1, steps + 1)]
+
+
+# How many edits each message can get when `messages` messages are sent and
+# the rate limit allows `budget` calls in total
+def planSteps(messages: int, budget: float, maxSteps: int) -> int:
+    if messages <= 0:
+        return 0
+    return max(0, min(maxSteps, int((budget - messages) // messages)))
+
+
+# How many groups go in each message for an output mode
+def groupsPerMessage(output: str) -> int:
+    if output == SINGLE:
+        return 1
+    if output == BATCH:
+        return MAX_EMBEDS
+    raise ValueError(f"Unknown output mode: {output}")
+
+
+# A token bucket tracking how many more calls Discord will take from a channel.
+# Tokens come back at `rate` per second, up to `capacity`.
+class TokenBucket:
+    def __init__(self, rate: float = DISCORD_RATE, capacity: float = DISCORD_BURST,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    # How many calls can be made over the next `seconds`
+    def budget(self, seconds: float) -> float:
+        self._refill()
+        return self.tokens + self.rate * seconds
+
+    # Waits until a call may be made, and counts it
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# Plays the rest of a message's plan, one step at a time
+async def _play(messages: List[Message], n: int, plan: List[List[Frame]], stepDelay: float, limiter: TokenBucket,
+                edit: Callable[[Message, List[Frame]], Awaitable[Optional[Message]]]):
+    for frames in plan[1:]:
+        await asyncio.sleep(stepDelay)
+        await limiter.acquire()
+        messages[n] = (await edit(messages[n], frames)) or messages[n]
+
+
+# One message of revealGroups. Streamed groups join it one by one while it's
+# already animating, so every group has its own frames and step.
+class _Reveal:
+    def __init__(self, batch: List[List[Frame]], closed: bool):
+        self.frames = list(batch)
+        self.shown = [0] * len(batch)
+        # Set once no more groups will join the message
+        self.closed = closed
+        self.changed = asyncio.Event()
+
+    def add(self, frames: List[Frame]):
+        self.frames.append(frames)
+        self.shown.append(0)
+        self.changed.set()
+
+    def close(self):
+        self.closed = True
+        self.changed.set()
+
+    def current(self) -> List[Frame]:
+        return [frames[n] for frames, n in zip(self.frames, self.shown)]
+
+    @property
+    def finished(self) -> bool:
+        return all(n == len(frames) - 1 for frames, n in zip(self.frames, self.shown))
+
+    def step(self):
+        self.shown = [min(n + 1, len(frames) - 1) for frames, n in zip(self.frames, self.shown)]
+
+
+# Steps a message's groups along until all of them are revealed and no more can join
+async def _animate(messages: List[Message], n: int, reveal: _Reveal, stepDelay: float, limiter: TokenBucket,
+                   edit: Callable[[Message, List[Frame]], Awaitable[Optional[Message]]]):
+    while True:
+        if reveal.finished:
+            if reveal.closed:
+                return
+            reveal.changed.clear()
+            await reveal.changed.wait()
+            continue
+        await asyncio.sleep(stepDelay)
+        reveal.step()
+        await limiter.acquire()
+        messages[n] = (await edit(messages[n], reveal.current())) or messages[n]
+
+
+# Reveals the groups, batchSize of them per message, all at the same time.
+#
+# The messages are sent in group order, then every message's animation runs
+# concurrently, with all the groups in a message revealing their seats
+# together. How many steps the animation gets depends on how many calls the
+# channel's rate limit allows in totalTime, so the whole reveal stays within
+# it however many groups there are. With many messages the animation gets
+# shorter, down to sending every group already revealed.
+#
+# groups can also be an async iterator, like offload.streamOffloaded, to
+# start revealing the first groups while the rest are still being built.
+# A message is sent as soon as its first group is in, and edited to add
+# each of the others as they come, each starting its own animation. The
+# number of groups isn't known up front then, so the animation is planned
+# for `expected`, with an edit for every group that joins a message.
+# numbers are the group numbers to show, when they aren't just 1, 2, 3...
+#
+# send(frames) posts a new message showing the frames and edit(message, frames)
+# updates one, so this works with anything that can show frames, not just Discord.
+async def revealGroups(groups: Union[List[WoWGroup], AsyncIterable[WoWGroup]],
+                       send: Callable[[List[Frame]], Awaitable[Message]],
+                       edit: Callable[[Message, List[Frame]], Awaitable[Optional[Message]]],
+                       limiter: TokenBucket = None, totalTime: float = DEFAULT_REVEAL_TIME,
+                       animate: bool = True, batchSize: int = 1, expected: int = None,
+                       numbers: List[int] = None) -> List[Message]:
+    limiter = limiter if limiter is not None else TokenBucket()
+    streamed = hasattr(groups, '__aiter__')
+    if not streamed:
+        expected = len(groups)
+    elif expected is None:
+        raise ValueError("Revealing a stream of groups needs the expected number of groups")
+    # Every group has the same number of frames
+    maxSteps = len(groupFrames(WoWGroup(), 0)) - 1
+    messageCount = -(-expected // batchSize)
+    joins = expected - messageCount if streamed else 0
+    steps = planSteps(messageCount, limiter.budget(totalTime) - joins, maxSteps) if animate else 0
+    stepDelay = min(MAX_STEP_DELAY, totalTime / (steps + 1))
+
+    def framesOf(group: WoWGroup, n: int) -> List[Frame]:
+        return pickFrames(groupFrames(group, numbers[n] if numbers is not None else n + 1), steps)
+
+    messages = []
+    reveals = []
+    animations = []
+
+    # Sends a message's first frames right away, and starts animating it
+    async def start(batch: List[List[Frame]], closed: bool):
+        reveal = _Reveal(batch, closed)
+        await limiter.acquire()
+        messages.append(await send(reveal.current()))
+        reveals.append(reveal)
+        animations.append(asyncio.create_task(_animate(messages, len(messages) - 1, reveal, stepDelay, limiter,
+                                                       edit)))
+
+    # Adds a streamed group to the last message
+    async def join(frames: List[Frame]):
+        reveal = reveals[-1]
+        reveal.add(frames)
+        await limiter.acquire()
+        messages[-1] = (await edit(messages[-1], reveal.current())) or messages[-1]
+
+    try:
+        if not streamed:
+            for first in range(0, len(groups), batchSize):
+                await start([framesOf(group, n) for n, group in enumerate(groups[first:first + batchSize], first)],
+                            closed=True)
+        else:
+            n = 0
+            async for group in groups:
+                if n % batchSize == 0:
+                    if reveals:
+                        reveals[-1].close()
+                    await start([framesOf(group, n)], closed=batchSize == 1)
+                else:
+                    await join(framesOf(group, n))
+                    if n % batchSize == batchSize - 1:
+                        reveals[-1].close()
+                n += 1
+            if reveals:
+                reveals[-1].close()
+        await asyncio.gather(*animations)
+    finally:
+        for animation in animations:
+            animation.cancel()
+    return messages
+
+
+# Reveals again just the groups that changed in messages sent by revealGroups.
+#
+# Only the messages holding a changed group are edited; in them the changed
+# groups animate while the others keep showing their final frame. Groups
+# past the end of the old messages get new messages, and old messages left
+# without any group are deleted with delete(message), if given. Returns the
+# messages now showing the groups.
+async def revealChanges(groups: List[WoWGroup], changed: Iterable[int], messages: List[Message],
+                        send: Callable[[List[Frame]], Awaitable[Message]],
+                        edit: Callable[[Message, List[Frame]], Awaitable[Optional[Message]]],
+                        delete: Callable[[Message], Awaitable[None]] = None, limiter: TokenBucket = None,
+                        totalTime: float = DEFAULT_REVEAL_TIME, animate: bool = True,
+                        batchSize: int = 1) -> List[Message]:
+    limiter = limiter if limiter is not None else TokenBucket()
+    changed = set(changed)
+    messageCount = -(-len(groups) // batchSize)
+    touched = sorted({i // batchSize for i in changed if i < len(groups)} | set(range(len(messages), messageCount)))
+    maxSteps = len(groupFrames(WoWGroup(), 0)) - 1
+    steps = planSteps(len(touched), limiter.budget(totalTime), maxSteps) if animate else 0
+    stepDelay = min(MAX_STEP_DELAY, totalTime / (steps + 1))
+
+    def framesOf(i: int) -> List[Frame]:
+        frames = pickFrames(groupFrames(groups[i], i + 1), steps)
+        return frames if i in changed else frames[-1:] * len(frames)
+
+    leftover = messages[messageCount:]
+    messages = list(messages[:messageCount]) + [None] * max(0, messageCount - len(messages))
+    animations = []
+    try:
+        for m in touched:
+            batch = [framesOf(i) for i in range(m * batchSize, min(len(groups), (m + 1) * batchSize))]
+            plan = [list(step) for step in zip(*batch)]
+            await limiter.acquire()
+            if messages[m] is None:
+                messages[m] = await send(plan[0])
+            else:
+                messages[m] = (await edit(messages[m], plan[0])) or messages[m]
+            animations.append(asyncio.create_task(_play(messages, m, plan, stepDelay, limiter, edit)))
+        if delete is not None:
+            for message in leftover:
+                await limiter.acquire()
+                await delete(message)
+        await asyncio.gather(*animations)
+    finally:
+        for animation in animations:
+            animation.cancel()
+    return messages
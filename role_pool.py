@@ -0,0 +1,138 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import random
+from models import ROLE_SLOTS, Role, RosterTable, WoWPlayer
+
+
+# ROLE_SLOTS with plain int flags, which are much faster to mask with than Role
+_INT_SLOTS = [(seat, int(main), int(off)) for seat, (main, off) in ROLE_SLOTS.items()]
+
+
+# Every role a player can take a seat as, main specs first, as (role, offspec)
+def seatsFor(player: WoWPlayer) -> List[Tuple[str, bool]]:
+    mask = player.roleMask
+    mains = [(seat, False) for seat, main, _ in _INT_SLOTS if mask & main]
+    offs = [(seat, True) for seat, main, off in _INT_SLOTS if mask & off and not mask & main]
+    return mains + offs
+
+
+# An insertion ordered set of players.
+# Backed by a dict, so membership checks and removal are O(1) while iteration
+# keeps the (shuffled) order the players were added in.
+class PlayerPool:
+    def __init__(self, players: Iterable[WoWPlayer] = ()):
+        self._players: Dict[WoWPlayer, None] = dict.fromkeys(players)
+
+    def __contains__(self, player) -> bool:
+        return player in self._players
+
+    def __iter__(self) -> Iterator[WoWPlayer]:
+        return iter(self._players)
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def __bool__(self) -> bool:
+        return bool(self._players)
+
+    def __repr__(self):
+        return repr(list(self._players))
+
+    def discard(self, player: WoWPlayer):
+        self._players.pop(player, None)
+
+    def first(self) -> Optional[WoWPlayer]:
+        return next(iter(self._players), None)
+
+
+# A read only view over several pools, iterated in order.
+# Used for "main spec first, then offspec" lists like the available tanks.
+class RoleView:
+    def __init__(self, *pools: PlayerPool):
+        self._pools = pools
+
+    def __contains__(self, player) -> bool:
+        return any(player in pool for pool in self._pools)
+
+    def __iter__(self) -> Iterator[WoWPlayer]:
+        for pool in self._pools:
+            yield from pool
+
+    def __len__(self) -> int:
+        return sum(len(pool) for pool in self._pools)
+
+    def __bool__(self) -> bool:
+        return any(self._pools)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def first(self) -> Optional[WoWPlayer]:
+        return next(iter(self), None)
+
+
+# Indexes a roster by role, offspec and utility.
+# The pools are selected from the roster's role masks (see RosterTable).
+# Every player is registered in each pool they belong to, and removing a
+# player takes them out of all of those pools at once in O(1) per pool.
+# Each pool is shuffled once up front, so iterating a pool walks the players
+# in a random order.
+class RolePool:
+    def __init__(self, players: Iterable[WoWPlayer], rng=random, utilityDpsFirst: bool = False, assignment=None):
+        self._membership: Dict[WoWPlayer, List[PlayerPool]] = {}
+
+        def shuffled(selected: List[WoWPlayer]) -> List[WoWPlayer]:
+            rng.shuffle(selected)
+            return selected
+
+        # With a RoleAssignment every player is only pooled under the role they were assigned,
+        # and benched players aren't pooled at all
+        if assignment is not None:
+            tanks = RosterTable(assignment.tanks)
+            healers = RosterTable(assignment.healers)
+            dps = RosterTable(assignment.dps)
+            table = RosterTable(assignment.tanks + assignment.healers + assignment.dps)
+        else:
+            table = players if isinstance(players, RosterTable) else RosterTable(players)
+            tanks = healers = dps = table
+
+        # Tanks
+        self.main_tanks = self._register(shuffled(tanks.playersWith(Role.TANK)))
+        self.off_tanks = self._register(shuffled(tanks.playersWith(Role.OFFTANK, noneOf=Role.TANK)))
+        self.tanks = RoleView(self.main_tanks, self.off_tanks)
+
+        # Healers
+        self.main_healers = self._register(shuffled(healers.playersWith(Role.HEALER)))
+        self.off_healers = self._register(shuffled(healers.playersWith(Role.OFFHEALER, noneOf=Role.HEALER)))
+        self.healers = RoleView(self.main_healers, self.off_healers)
+
+        # DPS
+        if utilityDpsFirst:
+            # Utility DPS go to the front of the main DPS list so they get spread out first
+            utility_dps = shuffled(dps.playersWith(Role.DPS, anyOf=Role.BREZ | Role.LUST))
+            regular_dps = shuffled(dps.playersWith(Role.DPS, noneOf=Role.BREZ | Role.LUST))
+            self.main_dps = self._register(utility_dps + regular_dps)
+        else:
+            self.main_dps = self._register(shuffled(dps.playersWith(Role.DPS)))
+        self.off_dps = self._register(shuffled(dps.playersWith(Role.OFFDPS, noneOf=Role.DPS)))
+        self.dps = RoleView(self.main_dps, self.off_dps)
+
+        # Utilities
+        self.brez = self._register(shuffled(table.playersWith(Role.BREZ)))
+        self.lust = self._register(shuffled(table.playersWith(Role.LUST)))
+
+    def _register(self, players: List[WoWPlayer]) -> PlayerPool:
+        pool = PlayerPool(players)
+        for player in players:
+            self._membership.setdefault(player, []).append(pool)
+        return pool
+
+    def __contains__(self, player) -> bool:
+        return player in self._membership
+
+    def __len__(self) -> int:
+        return len(self._membership)
+
+    # Takes the player out of every pool they are in
+    def remove(self, player: WoWPlayer):
+        for pool in self._membership.pop(player, ()):
+            pool.discard(player)
@@ -0,0 +1,143 @@
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+from models import WoWPlayer
+
+MemberId = Hashable
+ChannelId = Hashable
+
+
+# The players in one channel, kept up to date one member at a time.
+#
+# The version goes up every time the players change, so anything computed
+# from them can tell when it's out of date.
+class ChannelRoster:
+    def __init__(self, channelId: ChannelId):
+        self.channelId = channelId
+        self.version = 0
+        self._players: Dict[MemberId, WoWPlayer] = {}
+        self._list: Optional[List[WoWPlayer]] = None
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def __contains__(self, memberId: MemberId) -> bool:
+        return memberId in self._players
+
+    # The players in the order they joined. The list is shared until the roster
+    # changes, so callers mustn't modify it.
+    @property
+    def players(self) -> List[WoWPlayer]:
+        if self._list is None:
+            self._list = list(self._players.values())
+        return self._list
+
+    def _changed(self):
+        self._list = None
+        self.version += 1
+
+    # Adds or updates a member, or removes them if they aren't a player. Returns whether anything changed.
+    def put(self, memberId: MemberId, player: Optional[WoWPlayer]) -> bool:
+        if player is None:
+            return self.remove(memberId)
+        old = self._players.get(memberId)
+        # Players are equal by name, so a change of roles has to be checked separately
+        if old is not None and old.name == player.name and old.roleMask == player.roleMask:
+            return False
+        self._players[memberId] = player
+        self._changed()
+        return True
+
+    def remove(self, memberId: MemberId) -> bool:
+        if self._players.pop(memberId, None) is None:
+            return False
+        self._changed()
+        return True
+
+
+# The rosters of every channel a wheel has been run in, updated from gateway
+# events instead of rebuilt from the channel's members for every wheel.
+#
+# makePlayer turns a member into a WoWPlayer, or None when they aren't one
+# (a bot, or someone without any roles). It runs once per member event, no
+# matter how many channels the member is in. Only channels that were loaded
+# are tracked; events for other channels are ignored.
+class RosterCache:
+    def __init__(self, makePlayer: Callable[[object], Optional[WoWPlayer]],
+                 memberId: Callable[[object], MemberId] = lambda member: member.id):
+        self.makePlayer = makePlayer
+        self.memberId = memberId
+        self._rosters: Dict[ChannelId, ChannelRoster] = {}
+
+    def __len__(self) -> int:
+        return len(self._rosters)
+
+    def __contains__(self, channelId: ChannelId) -> bool:
+        return channelId in self._rosters
+
+    def tracked(self) -> List[ChannelId]:
+        return list(self._rosters)
+
+    def roster(self, channelId: ChannelId) -> Optional[ChannelRoster]:
+        return self._rosters.get(channelId)
+
+    # Builds a channel's roster from all its members, replacing any it had
+    def load(self, channelId: ChannelId, members: Iterable) -> ChannelRoster:
+        old = self._rosters.get(channelId)
+        roster = ChannelRoster(channelId)
+        # Keep counting from the old version so a reload still counts as a change
+        roster.version = old.version + 1 if old is not None else 0
+        for member in members:
+            roster.put(self.memberId(member), self.makePlayer(member))
+        self._rosters[channelId] = roster
+        return roster
+
+    # The roster for a channel, loaded from members() the first time it's needed
+    def get(self, channelId: ChannelId, members: Callable[[], Iterable]) -> ChannelRoster:
+        roster = self._rosters.get(channelId)
+        if roster is None:
+            roster = self.load(channelId, members())
+        return roster
+
+    def forget(self, channelId: ChannelId):
+        self._rosters.pop(channelId, None)
+
+    # Forgets every roster, for when events may have been missed
+    def clear(self):
+        self._rosters.clear()
+
+    def memberJoined(self, channelId: ChannelId, member):
+        roster = self._rosters.get(channelId)
+        if roster is not None:
+            roster.put(self.memberId(member), self.makePlayer(member))
+
+    def memberLeft(self, channelId: ChannelId, member):
+        roster = self._rosters.get(channelId)
+        if roster is not None:
+            roster.remove(self.memberId(member))
+
+    # A member changed, for example their roles or nickname. inChannel tells whether
+    # they belong to a tracked channel now, since a change of roles can change that too.
+    def memberUpdated(self, member, inChannel: Callable[[ChannelId], bool]):
+        memberId = self.memberId(member)
+        made, player = False, None
+        for channelId, roster in self._rosters.items():
+            if inChannel(channelId):
+                if not made:
+                    made, player = True, self.makePlayer(member)
+                roster.put(memberId, player)
+            else:
+                roster.remove(memberId)
+
+    # A member moved between voice channels, or joined or left one
+    def memberMoved(self, member, before: Optional[ChannelId], after: Optional[ChannelId]):
+        if before == after:
+            return
+        if before is not None:
+            self.memberLeft(before, member)
+        if after is not None:
+            self.memberJoined(after, member)
+
+    # A member left the server altogether
+    def memberRemoved(self, member):
+        memberId = self.memberId(member)
+        for roster in self._rosters.values():
+            roster.remove(memberId)
@@ -0,0 +1,45 @@
+import inspect
+import random
+from typing import Callable, Dict, List, Tuple
+from models import WoWPlayer
+from prebuilt_classes import *
+
+TANK_CLASSES = [TankPaladin, TankWarrior, TankDruid, TankDeathKnight, TankMonk, TankDemonHunter]
+HEALER_CLASSES = [HealerPaladin, HealerPriest, HealerShaman, HealerDruid, HealerEvoker, HealerMonk]
+DPS_CLASSES = [
+    DeathKnight, DemonHunter, BalanceDruid, FeralDruid, Evoker, Hunter, Mage,
+    Monk, Paladin, Priest, Rogue, Shaman, Warlock, Warrior,
+]
+
+# How often each main role signs up, as (tank, healer, dps) weights.
+# Balanced matches a full group, the others are the shortages a real night has.
+ROLE_MIXES: Dict[str, Tuple[float, float, float]] = {
+    'balanced': (1, 1, 3),
+    'tank_starved': (0.5, 1, 3.5),
+    'healer_starved': (1, 0.5, 3.5),
+    'dps_heavy': (0.6, 0.6, 3.8),
+}
+
+# How likely a player is to sign up for each offspec their class can play
+DEFAULT_OFFSPEC_RATE = 0.25
+
+
+# The offspec keyword arguments a class factory takes, e.g. offtank and offhealer
+def _offspecs(factory: Callable[..., WoWPlayer]) -> List[str]:
+    return [name for name in inspect.signature(factory).parameters if name.startswith('off')]
+
+
+# Makes a random roster of distinct players from the prebuilt classes.
+# Classes are picked uniformly per role, so utility and ranged DPS turn up as
+# often as they do among the real specs, and every offspec a class can play
+# is taken with the given rate.
+def generateRoster(size: int, mix: str = 'balanced', offspecRate: float = DEFAULT_OFFSPEC_RATE,
+                   rng=random) -> List[WoWPlayer]:
+    weights = ROLE_MIXES[mix]
+    players = []
+    for n in range(size):
+        classes = rng.choices((TANK_CLASSES, HEALER_CLASSES, DPS_CLASSES), weights=weights)[0]
+        factory = rng.choice(classes)
+        offspecs = {name: rng.random() < offspecRate for name in _offspecs(factory)}
+        players.append(factory(f"{factory.__name__}{n}", **offspecs))
+    return players
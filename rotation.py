@@ -0,0 +1,203 @@
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import random
+import time
+from models import ROLE_SLOTS, SEATS, Role, WoWPlayer, WoWGroup, seatRole
+from engine import GREEDY, GroupEngine, buildGroups
+from pairing_history import PairingHistory
+from scoring import SEAT_ROLES, seatsOf
+from solver import EPSILON, withSeat
+from local_search import DEFAULT_DEADLINE
+
+# Most rounds that can be planned at once
+MAX_ROUNDS = 8
+# How many passes over every swap the planner makes per round at most
+DEFAULT_SWEEPS = 10
+
+# Costs of a group in a planned round, lower is better.
+# Each pair of players who were already grouped in an earlier planned round
+REPEAT_COST = 10.0
+# Each player in an offspec seat
+ROTATION_OFFSPEC_COST = 1.0
+# Each earlier planned round a player played offspec or was the only battle res or bloodlust in their group
+DUTY_COST = 2.0
+
+Pair = Tuple[str, str]
+
+
+def _pair(a: WoWPlayer, b: WoWPlayer) -> Pair:
+    return (a.name, b.name) if a.name < b.name else (b.name, a.name)
+
+
+# Whether the player can take one of the seats of scoring.seatsOf, as a main spec or offspec
+def canSit(player: WoWPlayer, seat: int) -> bool:
+    main, off = ROLE_SLOTS[seatRole(SEATS[seat])]
+    return bool(player.roleMask & (main | off))
+
+
+# The players of a group who have a duty in it: everyone in an offspec seat,
+# and whoever is the only one bringing battle res or bloodlust
+def dutiesOf(group: WoWGroup) -> List[WoWPlayer]:
+    duties = [player for seat, player in enumerate(seatsOf(group))
+              if player is not None and not player.roleMask & SEAT_ROLES[seat]]
+    for utility in (Role.BREZ, Role.LUST):
+        providers = [player for player in group.players if player.roleMask & utility]
+        if len(providers) == 1:
+            duties.append(providers[0])
+    return duties
+
+
+# Everything earlier planned rounds left behind that the next round should avoid repeating
+@dataclass
+class PlanState:
+    pairs: Dict[Pair, int] = field(default_factory=dict)
+    duties: Dict[WoWPlayer, int] = field(default_factory=dict)
+
+    def groupCost(self, group: WoWGroup, history: Optional[PairingHistory]) -> float:
+        members = group.players
+        cost = 0.0
+        for n, player in enumerate(members):
+            for other in members[:n]:
+                cost += REPEAT_COST * self.pairs.get(_pair(player, other), 0)
+                if history is not None:
+                    cost += history.weight(player, other)
+        offspecs = sum(1 for seat, player in enumerate(seatsOf(group))
+                       if player is not None and not player.roleMask & SEAT_ROLES[seat])
+        cost += ROTATION_OFFSPEC_COST * offspecs
+        cost += DUTY_COST * sum(self.duties.get(player, 0) for player in dutiesOf(group))
+        return cost
+
+    def record(self, groups: List[WoWGroup]):
+        for group in groups:
+            members = group.players
+            for n, player in enumerate(members):
+                for other in members[:n]:
+                    key = _pair(player, other)
+                    self.pairs[key] = self.pairs.get(key, 0) + 1
+            for player in dutiesOf(group):
+                self.duties[player] = self.duties.get(player, 0) + 1
+
+
+# Battle res and bloodlust a group has, which a swap may not take away
+def _utilities(group: WoWGroup) -> Tuple[bool, bool]:
+    return group.has_brez, group.has_lust
+
+
+# Swaps pairs of players between seats, in the same group or two different
+# ones, as long as it lowers the cost of the round. A swap is only tried
+# when both players can take the other's seat and neither group loses its
+# battle res or bloodlust, so the round keeps every group it had. Each swap
+# only rescores the one or two groups it touches.
+def rotateRound(groups: List[WoWGroup], state: PlanState, history: PairingHistory = None,
+                maxSweeps: int = DEFAULT_SWEEPS, deadline: float = None, rng=random) -> List[WoWGroup]:
+    groups = list(groups)
+    costs = [state.groupCost(group, history) for group in groups]
+    spots = [(i, seat) for i, group in enumerate(groups) for seat, player in enumerate(seatsOf(group))
+             if player is not None]
+    stopAt = time.perf_counter() + deadline if deadline is not None else None
+
+    for _ in range(maxSweeps):
+        improved = False
+        rng.shuffle(spots)
+        for n, (i, s) in enumerate(spots):
+            for j, t in spots[n + 1:]:
+                a = seatsOf(groups[i])[s]
+                b = seatsOf(groups[j])[t]
+                if not canSit(a, t) or not canSit(b, s):
+                    continue
+                if i == j:
+                    swapped = {i: withSeat(withSeat(groups[i], SEATS[s], b), SEATS[t], a)}
+                else:
+                    swapped = {i: withSeat(groups[i], SEATS[s], b), j: withSeat(groups[j], SEATS[t], a)}
+                if any(old and not new for k, group in swapped.items()
+                       for old, new in zip(_utilities(groups[k]), _utilities(group))):
+                    continue
+                newCosts = {k: state.groupCost(group, history) for k, group in swapped.items()}
+                if sum(newCosts.values()) < sum(costs[k] for k in swapped) - EPSILON:
+                    for k, group in swapped.items():
+                        groups[k] = group
+                        costs[k] = newCosts[k]
+                    improved = True
+            if stopAt is not None and time.perf_counter() > stopAt:
+                return groups
+        if not improved:
+            break
+    return groups
+
+
+@dataclass
+class Rotation:
+    # The players the rounds were planned for
+    players: List[WoWPlayer]
+    rounds: List[List[WoWGroup]]
+    # Pairs of players grouped together in more than one round
+    repeats: int = 0
+    # Rounds handed out by next() so far
+    played: int = 0
+
+    def __len__(self) -> int:
+        return len(self.rounds)
+
+    @property
+    def remaining(self) -> int:
+        return len(self.rounds) - self.played
+
+    # The groups of the next round, or None once every round was played
+    def next(self) -> Optional[List[WoWGroup]]:
+        if self.played >= len(self.rounds):
+            return None
+        self.played += 1
+        return self.rounds[self.played - 1]
+
+
+# Plans a whole night of rounds at once, mixing the players up as much as possible.
+#
+# Like a social golfer schedule, every round tries to group players who
+# haven't played together yet tonight. Each round is built by buildGroups,
+# with the round before it as the last groups and the rounds planned so far
+# added to a copy of the pairing history. Then rotateRound swaps players to
+# cut the pairs repeated from earlier rounds and to hand playing offspec and
+# being a group's only battle res or bloodlust to someone who hasn't done it
+# yet. Every step is a greedy build and a bounded swap search, so planning a
+# night of rounds takes about as long as that many wheels.
+def planRotation(players: List[WoWPlayer], rounds: int, lastGroups: List[WoWGroup] = None,
+                 history: PairingHistory = None, mode: str = GREEDY, deadline: float = DEFAULT_DEADLINE,
+                 maxSweeps: int = DEFAULT_SWEEPS, rng=random) -> Rotation:
+    if not 1 <= rounds <= MAX_ROUNDS:
+        raise ValueError(f"Can plan 1 to {MAX_ROUNDS} rounds, not {rounds}")
+    planning = history.copy() if history is not None else PairingHistory()
+    state = PlanState()
+    previous = list(lastGroups) if lastGroups else []
+    planned = []
+    for _ in range(rounds):
+        groups = buildGroups(players, previous, history=planning, mode=mode, deadline=deadline, rng=rng)
+        groups = rotateRound(groups, state, history=history, maxSweeps=maxSweeps, deadline=deadline, rng=rng)
+        state.record(groups)
+        planning.recordSession(groups)
+        planned.append(groups)
+        previous = groups
+    repeats = sum(count - 1 for count in state.pairs.values() if count > 1)
+    return Rotation(players=list(players), rounds=planned, repeats=repeats)
+
+
+# Runs in the executor, so everything it needs is passed in
+def _plan(players: List[WoWPlayer], rounds: int, lastGroups: List[WoWGroup], history: Optional[PairingHistory],
+          mode: str, deadline: float, seed: int) -> Rotation:
+    return planRotation(players, rounds, lastGroups=lastGroups, history=history, mode=mode, deadline=deadline,
+                        rng=random.Random(seed))
+
+
+# Plans the rounds in an executor, from the engine's settings, last groups
+# and a snapshot of its history, without changing the engine
+async def planOffloaded(engine: GroupEngine, players: List[WoWPlayer], rounds: int, executor: Executor) -> Rotation:
+    loop = asyncio.get_running_loop()
+    history = engine.history.copy() if engine.history is not None else None
+    start = time.perf_counter()
+    rotation = await loop.run_in_executor(executor, _plan, list(players), rounds, list(engine.lastGroups), history,
+                                          engine.mode, engine.deadline, engine.rng.getrandbits(64))
+    engine.tracer.info('rotation_planned', lambda: f"Planned {len(rotation)} rounds for {len(players)} players in "
+                                                   f"{time.perf_counter() - start:.3f}s, {rotation.repeats} "
+                                                   f"repeated pairs", rounds=len(rotation), repeats=rotation.repeats)
+    return rotation
@@ -0,0 +1,86 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+import random
+import statistics
+from models import WoWPlayer, WoWGroup
+from coplay_index import CoPlayIndex
+from scoring import GroupingScore, scoreGroupings
+from engine import GREEDY, GroupEngine
+from local_search import DEFAULT_DEADLINE
+import parallel_group_creator
+
+# How many seeded runs to compare by default
+DEFAULT_SAMPLES = 16
+
+
+@dataclass
+class SampleResult:
+    groups: List[WoWGroup] = field(default_factory=list)
+    score: float = 0.0
+    seed: int = 0
+    # What the best score is made of
+    breakdown: GroupingScore = field(default_factory=GroupingScore)
+    # The score of every sample, in seed order
+    scores: List[float] = field(default_factory=list)
+
+    @property
+    def mean(self) -> float:
+        return statistics.fmean(self.scores) if self.scores else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return statistics.pstdev(self.scores) if self.scores else 0.0
+
+    @property
+    def worst(self) -> float:
+        return min(self.scores, default=0.0)
+
+
+# One seeded run of the group creator. Runs inside a worker process, on an
+# engine of its own built from everything passed in.
+def _runSample(players: List[WoWPlayer], seed: int, lastGroups: List[WoWGroup], history, mode: str,
+               deadline: float) -> Tuple[int, List[WoWGroup]]:
+    engine = GroupEngine(mode=mode, deadline=deadline, history=history, seed=seed, lastGroups=lastGroups)
+    return seed, engine.solve(players)
+
+
+# Runs the group creator once per seed and keeps the best scoring groups.
+#
+# The greedy passes depend a lot on how each role pool was shuffled, so
+# trying several shuffles and keeping the best is a cheap way to get better
+# groups. The runs are spread over a process pool: pass an executor to reuse
+# one, or workers=0 to run them one after another in this process.
+#
+# The samples start from the engine's last groups, the default engine unless
+# one is given, and like create_mythic_plus_groups the winning groups become
+# the last groups for the next wheel. The history is only read.
+def sample_mythic_plus_groups(players: List[WoWPlayer], samples: int = DEFAULT_SAMPLES, history=None,
+                              mode: str = GREEDY, deadline: float = DEFAULT_DEADLINE,
+                              workers: Optional[int] = None, executor: Executor = None,
+                              seed: Optional[int] = None, engine: GroupEngine = None) -> SampleResult:
+    if engine is None:
+        engine = parallel_group_creator.defaultEngine
+    baseSeed = random.randrange(2 ** 32) if seed is None else seed
+    seeds = [baseSeed + n for n in range(max(samples, 1))]
+    lastGroups = list(engine.lastGroups)
+    arguments = (
+        [players] * len(seeds), seeds, [lastGroups] * len(seeds), [history] * len(seeds),
+        [mode] * len(seeds), [deadline] * len(seeds),
+    )
+
+    if executor is not None:
+        results = list(executor.map(_runSample, *arguments))
+    elif workers == 0:
+        results = list(map(_runSample, *arguments))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_runSample, *arguments))
+
+    # Score every sample in one batch
+    scores = scoreGroupings([groups for _, groups in results], coplay=CoPlayIndex(lastGroups), history=history)
+    best = max(range(len(results)), key=lambda n: scores[n].total)
+    bestSeed, bestGroups = results[best]
+    engine.remember(bestGroups)
+    return SampleResult(groups=bestGroups, score=scores[best].total, seed=bestSeed, breakdown=scores[best],
+                        scores=[score.total for score in scores])
@@ -0,0 +1,182 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from models import ROLE_SLOTS, SEATS, Role, WoWPlayer, WoWGroup, seatRole
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# How much each part of a group is worth.
+# Completeness dwarfs everything else, then battle res and bloodlust, then a
+# ranged DPS. Offspecs and playing with the same people again cost a little.
+@dataclass(frozen=True)
+class ScoreWeights:
+    complete: float = 100.0
+    brez: float = 10.0
+    lust: float = 10.0
+    ranged: float = 3.0
+    offspec: float = 1.0
+    novelty: float = 2.0
+
+
+DEFAULT_WEIGHTS = ScoreWeights()
+
+# A group as five seats: tank, healer and three DPS, None when empty.
+# The main spec flag each seat needs, to tell main specs from offspecs.
+SEAT_ROLES = tuple(int(ROLE_SLOTS[seatRole(seat)][0]) for seat in SEATS)
+SEAT_PAIRS = [(a, b) for b in range(len(SEAT_ROLES)) for a in range(b)]
+BREZ, LUST, RANGED = int(Role.BREZ), int(Role.LUST), int(Role.RANGED)
+
+# Below this many groups NumPy's setup costs more than it saves
+NUMPY_MIN_GROUPS = 64
+
+
+# Everything that makes a grouping good, added up over its groups
+@dataclass
+class GroupingScore:
+    groups: int = 0
+    complete: int = 0
+    brez: int = 0
+    lust: int = 0
+    ranged: int = 0
+    offspec: int = 0
+    # How much the players in each group already played together, see pairingPenalty
+    novelty: float = 0.0
+    total: float = 0.0
+
+
+def seatsOf(group: WoWGroup) -> Tuple[Optional[WoWPlayer], ...]:
+    dps = list(group.dps[:3]) + [None] * (3 - len(group.dps[:3]))
+    return (group.tank, group.healer, *dps)
+
+
+def isFull(group: WoWGroup) -> bool:
+    return group.tank is not None and group.healer is not None and len(group.dps) == 3
+
+
+def offspecCount(group: WoWGroup) -> int:
+    return sum(1 for seat, player in enumerate(seatsOf(group)) if player is not None and not player.roleMask & SEAT_ROLES[seat])
+
+
+def pairCost(a: WoWPlayer, b: WoWPlayer, coplay=None, history=None) -> float:
+    cost = 0.0
+    if coplay and coplay.playedTogether(a, b):
+        cost += 1.0
+    if history is not None:
+        cost += history.weight(a, b)
+    return cost
+
+
+# How much the members of a group have already played together.
+# One point per pair that shared a group in the last wheel, plus the decayed
+# pairing history weight of every pair.
+def pairingPenalty(members: List, coplay=None, history=None) -> float:
+    if not coplay and history is None:
+        return 0.0
+    penalty = 0.0
+    for n, player in enumerate(members):
+        for other in members[:n]:
+            penalty += pairCost(player, other, coplay, history)
+    return penalty
+
+
+# (full, brez, lust, ranged, offspecs, novelty) for one group's seats
+def _groupTerms(seats: Tuple[Optional[WoWPlayer], ...], coplay, history) -> Tuple[bool, bool, bool, bool, int, float]:
+    roles = 0
+    offspecs = 0
+    full = True
+    for seat, player in enumerate(seats):
+        if player is None:
+            full = False
+            continue
+        mask = player.roleMask
+        roles |= mask
+        if not mask & SEAT_ROLES[seat]:
+            offspecs += 1
+    members = [p for p in seats if p is not None]
+    return full, bool(roles & BREZ), bool(roles & LUST), bool(roles & RANGED), offspecs, \
+        pairingPenalty(members, coplay, history)
+
+
+def _combine(terms, weights: ScoreWeights) -> float:
+    full, brez, lust, ranged, offspecs, novelty = terms
+    return weights.complete * full + weights.brez * brez + weights.lust * lust + weights.ranged * ranged \
+        - weights.offspec * offspecs - weights.novelty * novelty
+
+
+def groupScore(group: WoWGroup, weights: ScoreWeights = DEFAULT_WEIGHTS, coplay=None, history=None) -> float:
+    return _combine(_groupTerms(seatsOf(group), coplay, history), weights)
+
+
+def groupingScore(groups: Iterable[WoWGroup], weights: ScoreWeights = DEFAULT_WEIGHTS, coplay=None, history=None) -> float:
+    return sum(groupScore(group, weights, coplay, history) for group in groups)
+
+
+# Scores many candidate groupings of the same roster in one pass.
+#
+# Every group of every grouping becomes a row of five seat role masks, so
+# completeness, utility coverage, ranged coverage and offspecs are a few
+# mask operations over the whole batch. Novelty comes from a pair cost
+# matrix built once for all the players involved. With NumPy installed and
+# a big enough batch this runs fully vectorized, otherwise it falls back to
+# plain int operations with the same results.
+def scoreGroupings(groupings: Sequence[Sequence[WoWGroup]], weights: ScoreWeights = DEFAULT_WEIGHTS, coplay=None,
+                   history=None) -> List[GroupingScore]:
+    rows: List[Tuple[Optional[WoWPlayer], ...]] = []
+    owners: List[int] = []
+    for owner, groups in enumerate(groupings):
+        for group in groups:
+            rows.append(seatsOf(group))
+            owners.append(owner)
+
+    if np is not None and len(rows) >= NUMPY_MIN_GROUPS:
+        terms = _numpyTerms(rows, coplay, history)
+    else:
+        terms = [_groupTerms(seats, coplay, history) for seats in rows]
+
+    scores = [GroupingScore() for _ in groupings]
+    for owner, groupTerms in zip(owners, terms):
+        full, brez, lust, ranged, offspecs, novelty = groupTerms
+        score = scores[owner]
+        score.groups += 1
+        score.complete += int(full)
+        score.brez += int(brez)
+        score.lust += int(lust)
+        score.ranged += int(ranged)
+        score.offspec += int(offspecs)
+        score.novelty += float(novelty)
+        score.total += _combine(groupTerms, weights)
+    return scores
+
+
+def _numpyTerms(rows: List[Tuple[Optional[WoWPlayer], ...]], coplay, history):
+    # Give every player an index, with one extra index standing in for an empty seat
+    index: Dict[WoWPlayer, int] = {}
+    for seats in rows:
+        for player in seats:
+            if player is not None and player not in index:
+                index[player] = len(index)
+    players = list(index)
+    empty = len(players)
+
+    ids = np.array([[index[p] if p is not None else empty for p in seats] for seats in rows], dtype=np.int64)
+    masks = np.array([p.roleMask for p in players] + [0], dtype=np.uint32)[ids]
+    present = ids != empty
+
+    roles = np.bitwise_or.reduce(masks, axis=1)
+    full = present.all(axis=1)
+    offspecs = (present & ((masks & np.array(SEAT_ROLES, dtype=np.uint32)) == 0)).sum(axis=1)
+
+    novelty = np.zeros(len(rows))
+    if coplay or history is not None:
+        costs = np.zeros((empty + 1, empty + 1))
+        for i, a in enumerate(players):
+            for j in range(i):
+                costs[i, j] = costs[j, i] = pairCost(a, players[j], coplay, history)
+        for a, b in SEAT_PAIRS:
+            novelty += costs[ids[:, a], ids[:, b]]
+
+    return list(zip(full.tolist(), ((roles & BREZ) != 0).tolist(), ((roles & LUST) != 0).tolist(),
+                    ((roles & RANGED) != 0).tolist(), offspecs.tolist(), novelty.tolist()))
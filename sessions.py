@@ -0,0 +1,135 @@
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Hashable, List, Optional, Tuple
+import asyncio
+import time
+from models import WoWPlayer, WoWGroup
+from reveal import TokenBucket
+from engine import GroupEngine
+
+# Most sessions kept at once, and roughly how much memory they may use together
+DEFAULT_MAX_SESSIONS = 256
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+# Rough memory use of a session and of each player it holds, used for the memory cap
+SESSION_BYTES = 4096
+PLAYER_BYTES = 600
+
+SessionKey = Tuple[Hashable, Hashable]
+
+
+# Everything one channel's wheel remembers between commands
+@dataclass
+class Session:
+    key: SessionKey
+    engine: GroupEngine
+    players: List[WoWPlayer] = field(default_factory=list)
+    debug: bool = False
+    lastUsed: float = 0.0
+    # Held while a command works on the session, so commands in one channel run one at a time
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # Commands working on or waiting for the session
+    users: int = 0
+    # How many more messages Discord will take from the channel right now
+    limiter: TokenBucket = field(default_factory=TokenBucket)
+    # The messages showing the groups, batchSize groups to each, so single groups can be edited later
+    messages: List = field(default_factory=list)
+    batchSize: int = 1
+    # The rounds !wheel plan is planning or has planned, a task giving a rotation.Rotation
+    rotation: Optional[asyncio.Task] = None
+
+    @property
+    def groups(self) -> List[WoWGroup]:
+        return self.engine.lastGroups
+
+    @property
+    def busy(self) -> bool:
+        return self.users > 0
+
+    def estimatedBytes(self) -> int:
+        return SESSION_BYTES + PLAYER_BYTES * (len(self.players) + sum(g.size for g in self.groups))
+
+    # Stops planning rounds nobody will ask for once the session is dropped
+    def close(self):
+        if self.rotation is not None:
+            self.rotation.cancel()
+            self.rotation = None
+
+
+# Keeps one session per (guild, channel), so wheels in different channels or
+# guilds never see each other's players or groups.
+#
+# engineFactory(guildId) builds the engine of a new session, so engines can
+# share what belongs to their guild, like its pairing history.
+#
+# Sessions are kept in least recently used order. Whenever there are more
+# than maxSessions, or their estimated memory use is over maxBytes, the least
+# recently used idle sessions are dropped. A session a command is working on
+# or waiting for is never dropped.
+class SessionManager:
+    def __init__(self, engineFactory: Callable[[Hashable], GroupEngine] = lambda guildId: GroupEngine(),
+                 maxSessions: int = DEFAULT_MAX_SESSIONS, maxBytes: int = DEFAULT_MAX_BYTES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.engineFactory = engineFactory
+        self.maxSessions = maxSessions
+        self.maxBytes = maxBytes
+        self.clock = clock
+        self._sessions: 'OrderedDict[SessionKey, Session]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, key: SessionKey) -> bool:
+        return key in self._sessions
+
+    def totalBytes(self) -> int:
+        return sum(session.estimatedBytes() for session in self._sessions.values())
+
+    # The session for a channel, if it has one, without counting as a use
+    def peek(self, guildId: Hashable, channelId: Hashable) -> Optional[Session]:
+        return self._sessions.get((guildId, channelId))
+
+    # The session for a channel, created if needed, and marked as the most recently used
+    def get(self, guildId: Hashable, channelId: Hashable) -> Session:
+        key = (guildId, channelId)
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._sessions[key] = Session(key=key, engine=self.engineFactory(guildId))
+        self._sessions.move_to_end(key)
+        session.lastUsed = self.clock()
+        self.evict()
+        return session
+
+    # Works on a channel's session with its lock held, waiting for any other command on it to finish first
+    @asynccontextmanager
+    async def acquire(self, guildId: Hashable, channelId: Hashable) -> AsyncIterator[Session]:
+        session = self.get(guildId, channelId)
+        session.users += 1
+        try:
+            async with session.lock:
+                yield session
+        finally:
+            session.users -= 1
+            session.lastUsed = self.clock()
+        # The session may have grown, and sessions that were busy before can be dropped now
+        self.evict()
+
+    def remove(self, guildId: Hashable, channelId: Hashable):
+        session = self._sessions.pop((guildId, channelId), None)
+        if session is not None:
+            session.close()
+
+    # Drops least recently used idle sessions until the limits are met again.
+    # The most recently used session is always kept.
+    def evict(self):
+        total = self.totalBytes()
+        for key in list(self._sessions)[:-1]:
+            if len(self._sessions) <= self.maxSessions and total <= self.maxBytes:
+                break
+            session = self._sessions[key]
+            if session.busy:
+                continue
+            total -= session.estimatedBytes()
+            del self._sessions[key]
+            session.close()
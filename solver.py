@@ -0,0 +1,201 @@
+from typing import Dict, List, Optional, Tuple
+from models import SEATS, WoWPlayer, WoWGroup
+from scoring import BREZ, DEFAULT_WEIGHTS, LUST, RANGED, ScoreWeights, isFull, seatsOf
+
+# Give up after this many passes over all the seats, even if the last pass still improved things
+DEFAULT_SWEEPS = 10
+
+EPSILON = 1e-9
+
+
+# Solves the rectangular assignment problem with the Hungarian algorithm in
+# O(rows^2 * columns). Returns the column picked for every row so the total
+# cost is as small as possible. Needs rows <= columns.
+def solveAssignment(cost: List[List[float]]) -> List[int]:
+    rows = len(cost)
+    if rows == 0:
+        return []
+    columns = len(cost[0])
+    infinite = float('inf')
+    # Row and column potentials, and which row each column is matched to (1-indexed, 0 is none)
+    u = [0.0] * (rows + 1)
+    v = [0.0] * (columns + 1)
+    matchedRow = [0] * (columns + 1)
+    way = [0] * (columns + 1)
+    # Start every row at its cheapest column, and match it there right away if nobody took that column
+    # yet. Only the rows left over need an augmenting path, and the matrices optimizeGroups builds are
+    # mostly ties, so that's usually few of them.
+    unmatched = []
+    for row in range(1, rows + 1):
+        rowCost = cost[row - 1]
+        u[row] = min(rowCost)
+        for j in range(1, columns + 1):
+            if rowCost[j - 1] == u[row] and not matchedRow[j]:
+                matchedRow[j] = row
+                break
+        else:
+            unmatched.append(row)
+    for row in unmatched:
+        matchedRow[0] = row
+        column = 0
+        minimum = [infinite] * (columns + 1)
+        used = [False] * (columns + 1)
+        while True:
+            used[column] = True
+            currentRow = matchedRow[column]
+            delta = infinite
+            nextColumn = 0
+            rowCost = cost[currentRow - 1]
+            for j in range(1, columns + 1):
+                if not used[j]:
+                    reduced = rowCost[j - 1] - u[currentRow] - v[j]
+                    if reduced < minimum[j]:
+                        minimum[j] = reduced
+                        way[j] = column
+                    if minimum[j] < delta:
+                        delta = minimum[j]
+                        nextColumn = j
+            for j in range(columns + 1):
+                if used[j]:
+                    u[matchedRow[j]] += delta
+                    v[j] -= delta
+                else:
+                    minimum[j] -= delta
+            column = nextColumn
+            if matchedRow[column] == 0:
+                break
+        # Flip the augmenting path
+        while column:
+            previous = way[column]
+            matchedRow[column] = matchedRow[previous]
+            column = previous
+
+    assignment = [-1] * rows
+    for j in range(1, columns + 1):
+        if matchedRow[j]:
+            assignment[matchedRow[j] - 1] = j - 1
+    return assignment
+
+
+def getSeat(group: WoWGroup, seat: str) -> Optional[WoWPlayer]:
+    if seat == 'tank':
+        return group.tank
+    if seat == 'healer':
+        return group.healer
+    return group.dps[int(seat[3:])]
+
+
+# A copy of the group with someone else in one seat
+def withSeat(group: WoWGroup, seat: str, player: WoWPlayer) -> WoWGroup:
+    if seat == 'tank':
+        return WoWGroup(tank=player, healer=group.healer, dps=list(group.dps))
+    if seat == 'healer':
+        return WoWGroup(tank=group.tank, healer=player, dps=list(group.dps))
+    dps = list(group.dps)
+    dps[int(seat[3:])] = player
+    return WoWGroup(tank=group.tank, healer=group.healer, dps=dps)
+
+
+# Every player's pair costs with the others, already weighted for novelty.
+# Only pairs that played together are listed, as (other, cost) per player.
+def _pairCosts(players: List[WoWPlayer], weights: ScoreWeights, coplay, history) -> List[List[Tuple[int, float]]]:
+    number = {player: n for n, player in enumerate(players)}
+    costs: List[Dict[int, float]] = [{} for _ in players]
+
+    def add(a: int, b: int, cost: float):
+        costs[a][b] = costs[a].get(b, 0.0) + cost
+        costs[b][a] = costs[b].get(a, 0.0) + cost
+
+    if coplay:
+        for n, player in enumerate(players):
+            for partner in coplay.partnersOf(player):
+                other = number.get(partner)
+                if other is not None and other > n:
+                    add(n, other, weights.novelty)
+    if history is not None:
+        for a, b, weight in history.pairs(players):
+            add(number[a], number[b], weights.novelty * weight)
+    return [list(partners.items()) for partners in costs]
+
+
+# Improves all the full groups together instead of locking in each greedy pass.
+#
+# The role assignment (who tanks, heals and DPSes) stays as it is, since it
+# already gives the most complete groups. What changes is who goes in which
+# group. Each of the SEATS is solved exactly as an assignment problem over
+# all groups, which of the players sitting in it goes to which group, with
+# the other seats held fixed, and the seats are swept until a whole pass
+# finds nothing better. That is coordinate descent, one seat at a time, so
+# it stops at a local optimum: no single seat can be reassigned
+# for a better score, but moving players in several seats at once might
+# still be. Every step can only raise the total score, so it never ends up
+# worse than the groups it started from, and each one is polynomial, so
+# this stays fast for 100+ players.
+#
+# A seat's cost matrix is built straight from the players, not by scoring
+# trial groups. Completeness and the candidate's own offspec are the same
+# whichever group they go to, and so is everything the rest of a group
+# brings on its own, so none of them can change which assignment is best.
+# What's left is the battle res, bloodlust and ranged the candidate adds to
+# the rest of the group, and their pair costs with its other four players.
+# Pair costs are only kept for players who played together, so filling in
+# the matrix takes one pass over the groups plus one per such pair.
+#
+# Groups that aren't full (remainder groups) are left alone and kept at the end.
+def optimizeGroups(groups: List[WoWGroup], weights: ScoreWeights = DEFAULT_WEIGHTS, coplay=None, history=None,
+                   maxSweeps: int = DEFAULT_SWEEPS) -> List[WoWGroup]:
+    current = [g for g in groups if isFull(g)]
+    others = [g for g in groups if not isFull(g)]
+    if len(current) < 2:
+        return groups
+
+    # Every player in a full group is numbered, seats[j][s] is whoever sits in seat s of group j
+    players = [player for group in current for player in seatsOf(group)]
+    seats = [list(range(len(SEATS) * j, len(SEATS) * (j + 1))) for j in range(len(current))]
+    groupOf = [n // len(SEATS) for n in range(len(players))]
+    seatOf = [n % len(SEATS) for n in range(len(players))]
+    partners = _pairCosts(players, weights, coplay, history)
+    # The utilities a player brings as 3 bits, and what each combination of them is worth to a group
+    utilities = [bool(p.roleMask & BREZ) | bool(p.roleMask & LUST) << 1 | bool(p.roleMask & RANGED) << 2
+                 for p in players]
+    worth = [weights.brez * (bits & 1) + weights.lust * (bits >> 1 & 1) + weights.ranged * (bits >> 2 & 1)
+             for bits in range(8)]
+
+    for _ in range(maxSweeps):
+        improved = False
+        for s in range(len(SEATS)):
+            candidates = [group[s] for group in seats]
+            # What everyone but seat s brings to each group, then what each candidate would add to it
+            rest = []
+            for group in seats:
+                bits = 0
+                for t, player in enumerate(group):
+                    if t != s:
+                        bits |= utilities[player]
+                rest.append(bits)
+            adds = [utilities[player] for player in candidates]
+            cost = [[-worth[bits | add] for add in adds] for bits in rest]
+            for k, player in enumerate(candidates):
+                for other, pairCost in partners[player]:
+                    if seatOf[other] != s:
+                        cost[groupOf[other]][k] += pairCost
+            assignment = solveAssignment(cost)
+            before = sum(cost[j][j] for j in range(len(seats)))
+            after = sum(cost[j][assignment[j]] for j in range(len(seats)))
+            if after < before - EPSILON:
+                for j, group in enumerate(seats):
+                    group[s] = candidates[assignment[j]]
+                    groupOf[group[s]] = j
+                improved = True
+        if not improved:
+            break
+
+    optimized = []
+    for j, (group, seated) in enumerate(zip(current, seats)):
+        # Players were numbered in group order, so a group nobody moved in or out of still has its own numbers
+        if seated == list(range(len(SEATS) * j, len(SEATS) * (j + 1))):
+            optimized.append(group)
+        else:
+            optimized.append(WoWGroup(tank=players[seated[0]], healer=players[seated[1]],
+                                      dps=[players[n] for n in seated[2:]]))
+    return optimized + others
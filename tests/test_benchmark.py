@@ -0,0 +1,68 @@
+import os
+import random
+import sys
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import benchmark
+from benchmark import ENGINES, findRegressions, percentile, runBenchmarks
+from parallel_group_creator import clear
+from roster_generator import generateRoster
+
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self):
+        clear()
+
+    def tearDown(self):
+        clear()
+
+    def test_generated_roster(self):
+        """Test that generated rosters have distinct players and follow the role mix"""
+        players = generateRoster(500, 'tank_starved', rng=random.Random(1))
+        self.assertEqual(len({p.name for p in players}), 500)
+        tanks = sum(1 for p in players if p.tankMain)
+        healers = sum(1 for p in players if p.healerMain)
+        self.assertLess(tanks, healers)
+        self.assertTrue(any(p.offtank or p.offhealer or p.offdps for p in players))
+        self.assertEqual(
+            [p.name for p in generateRoster(50, rng=random.Random(2))],
+            [p.name for p in generateRoster(50, rng=random.Random(2))],
+        )
+
+    def test_percentile(self):
+        """Test the nearest rank percentiles"""
+        samples = [float(n) for n in range(1, 101)]
+        self.assertEqual(percentile(samples, 0.5), 50.0)
+        self.assertEqual(percentile(samples, 0.99), 99.0)
+        self.assertEqual(percentile([3.0], 0.99), 3.0)
+
+    def test_run_and_compare(self):
+        """Test that every engine runs and that a slower case is flagged as a regression"""
+        minTime = benchmark.MIN_TIME
+        benchmark.MIN_TIME = 0
+        try:
+            results = runBenchmarks(list(ENGINES.values()), [10], ['balanced'])
+        finally:
+            benchmark.MIN_TIME = minTime
+        self.assertEqual(sorted(r.engine for r in results), sorted(ENGINES))
+        for result in results:
+            self.assertGreater(result.groups, 0)
+            self.assertEqual(result.runs, benchmark.MIN_RUNS)
+            self.assertLessEqual(result.p50, result.p99)
+            self.assertGreater(result.peakMemory, 0)
+        greedy = next(r for r in results if r.engine == 'parallel-greedy')
+        self.assertIn('pools', greedy.phases)
+
+        fast = {'results': [{'engine': r.engine, 'players': r.players, 'mix': r.mix, 'p50': r.p50 / 10}
+                            for r in results]}
+        slow = {'results': [{'engine': r.engine, 'players': r.players, 'mix': r.mix, 'p50': r.p50 * 10}
+                            for r in results]}
+        self.assertEqual(len(findRegressions(results, fast)), len(results))
+        self.assertEqual(findRegressions(results, slow), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import sys
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from coplay_index import CoPlayIndex
+from models import WoWGroup
+from prebuilt_classes import *
+
+
+class TestCoPlayIndex(unittest.TestCase):
+    def setUp(self):
+        self.tank1 = TankWarrior("Tank1")
+        self.healer1 = HealerDruid("Healer1")
+        self.mage1 = Mage("Mage1")
+        self.tank2 = TankPaladin("Tank2")
+        self.healer2 = HealerShaman("Healer2")
+        self.index = CoPlayIndex([
+            WoWGroup(tank=self.tank1, healer=self.healer1, dps=[self.mage1]),
+            WoWGroup(tank=self.tank2, healer=self.healer2),
+        ])
+
+    def test_partners(self):
+        """Test that each player maps to the others in their previous group"""
+        self.assertEqual(self.index.partnersOf(self.tank1), {self.healer1, self.mage1})
+        self.assertEqual(self.index.partnersOf(self.tank2), {self.healer2})
+        self.assertTrue(self.index.playedTogether(self.mage1, self.healer1))
+        self.assertFalse(self.index.playedTogether(self.mage1, self.tank2))
+
+    def test_partners_of_all(self):
+        """Test that partners of several players are unioned"""
+        partners = self.index.partnersOfAll([self.mage1, self.tank2])
+        self.assertEqual(partners, {self.tank1, self.healer1, self.healer2})
+
+    def test_unknown_player(self):
+        """Test that players without history have no partners"""
+        self.assertEqual(self.index.partnersOf(Rogue("Newbie")), set())
+        self.assertFalse(CoPlayIndex())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import os
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from engine import ANYTIME, EXACT, GREEDY, OPTIMAL, GroupEngine
+from parallel_group_creator import clear, defaultEngine, iter_mythic_plus_groups
+from pairing_history import PairingHistory
+from tracing import DEBUG, Tracer
+from prebuilt_classes import *
+
+players = [
+    TankWarrior("Tank1"),
+    TankDeathKnight("Brez1"),
+    HealerDruid("Brez2"),
+    HealerPriest("Healer2"),
+    Mage("Lust1"),
+    Mage("Lust2"),
+    Warrior("Warrior1"),
+    Warrior("Warrior2"),
+    FeralDruid("Feral1"),
+    FeralDruid("Feral2"),
+    Rogue("Rogue1"),
+]
+
+
+def names(groups):
+    return [sorted(p.name for p in group.players) for group in groups]
+
+
+class TestEngine(unittest.TestCase):
+    def test_solve_is_pure(self):
+        """Test that solving leaves the engine alone and creating remembers the groups"""
+        engine = GroupEngine(seed=1)
+        groups = engine.solve(players)
+        self.assertEqual(engine.lastGroups, [])
+        self.assertEqual(sum(group.size for group in groups), len(players))
+
+        created = engine.create(players)
+        self.assertEqual(engine.lastGroups, created)
+        engine.clear()
+        self.assertEqual(engine.lastGroups, [])
+
+    def test_commit_records_history(self):
+        """Test that committing groups records them in the engine's history"""
+        history = PairingHistory()
+        engine = GroupEngine(history=history, seed=1)
+        groups = engine.solve(players)
+        engine.commit(groups)
+
+        self.assertEqual(history.sessions, 1)
+        self.assertEqual(engine.lastGroups, groups)
+        self.assertGreater(history.weight(groups[0].tank, groups[0].healer), 0)
+
+    def test_version(self):
+        """Test that the version only changes when the last groups do"""
+        engine = GroupEngine(seed=1)
+        groups = engine.solve(players)
+        self.assertEqual(engine.version, 0)
+        engine.remember(groups)
+        self.assertEqual(engine.version, 1)
+        engine.clear()
+        self.assertEqual(engine.version, 2)
+
+    def test_iter_solve_matches_solve(self):
+        """Test that streaming the groups gives the same groups as solving them, in every mode"""
+        for mode in (GREEDY, OPTIMAL, EXACT, ANYTIME):
+            streamed = list(GroupEngine(mode=mode, seed=3).iterSolve(players))
+            solved = GroupEngine(mode=mode, seed=3).solve(players)
+            self.assertEqual(names(streamed), names(solved), mode)
+
+    def test_iter_solve_yields_early(self):
+        """Test that a greedy full group comes out before the remainder groups are built"""
+        tracer = Tracer(level=DEBUG)
+        stream = GroupEngine(seed=1, tracer=tracer).iterSolve(players)
+        first = next(stream)
+        self.assertTrue(first.is_complete)
+        self.assertEqual(tracer.events('remainder_formed'), [])
+        rest = list(stream)
+        self.assertTrue(tracer.events('remainder_formed'))
+        self.assertEqual(sum(group.size for group in [first] + rest), len(players))
+
+    def test_iter_mythic_plus_groups(self):
+        """Test that the streamed groups are remembered once they are all out"""
+        clear()
+        try:
+            stream = iter_mythic_plus_groups(players)
+            groups = [next(stream)]
+            self.assertEqual(defaultEngine.lastGroups, [])
+            groups.extend(stream)
+            self.assertEqual(defaultEngine.lastGroups, groups)
+        finally:
+            clear()
+
+    def test_reroll(self):
+        """Test that rerolling mixes up only the chosen groups and keeps the rest"""
+        roster = players + [TankPaladin("Tank3"), HealerShaman("Healer3"), Mage("Mage3"), Rogue("Rogue3"),
+                            Warrior("Warrior3"), TankWarrior("Tank4"), Rogue("Rogue4"), Rogue("Rogue5")]
+        engine = GroupEngine(seed=5)
+        groups = engine.create(roster)
+        version = engine.version
+
+        result = engine.reroll([0, 1])
+        self.assertEqual(engine.lastGroups, result.groups)
+        self.assertGreater(engine.version, version)
+        self.assertEqual(result.changed, [0, 1])
+        self.assertEqual(result.groups[2:], groups[2:])
+        # The novelty rules split the old groups up
+        self.assertNotEqual(sorted(names(result.groups[:2])), sorted(names(groups[:2])))
+        self.assertGreater(result.moves, 0)
+        self.assertEqual(sorted(p.name for g in result.groups[:2] for p in g.players),
+                         sorted(p.name for g in groups[:2] for p in g.players))
+
+    def test_reroll_bad_group(self):
+        """Test that rerolling a group that doesn't exist fails"""
+        engine = GroupEngine(seed=1)
+        engine.create(players)
+        with self.assertRaises(IndexError):
+            engine.reroll([7])
+        self.assertEqual(engine.reroll([]).changed, [])
+
+    def test_seeded_engines_repeat(self):
+        """Test that engines with the same seed build the same groups, one wheel after another"""
+        first, second = GroupEngine(seed=5), GroupEngine(seed=5)
+        for _ in range(3):
+            self.assertEqual(names(first.create(players)), names(second.create(players)))
+
+    def test_engines_in_threads(self):
+        """Test that independent engines give the same groups in parallel as one after another"""
+        modes = [GREEDY, OPTIMAL, EXACT, GREEDY] * 4
+
+        def run(n):
+            engine = GroupEngine(mode=modes[n], seed=n)
+            return [names(engine.create(players)) for _ in range(3)]
+
+        expected = [run(n) for n in range(len(modes))]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            self.assertEqual(list(pool.map(run, range(len(modes)))), expected)
+
+    def test_own_tracer_and_overrides(self):
+        """Test that events go to the engine's own tracer and that solve can override the mode"""
+        tracer = Tracer(level=DEBUG)
+        engine = GroupEngine(tracer=tracer, seed=1)
+        stats = {}
+        engine.solve(players, stats=stats, mode=ANYTIME, deadline=0.01)
+        self.assertIn('search', stats)
+        self.assertTrue(tracer.events('pool_built'))
+
+    def test_unknown_mode(self):
+        """Test that an unknown mode is rejected up front"""
+        with self.assertRaises(ValueError):
+            GroupEngine(mode="fastest")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import random
+import sys
+import time
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from coplay_index import CoPlayIndex
+from exact_solver import EXACT_MAX_PLAYERS, EXACT_TIME_LIMIT, exactGroups
+from feasibility import maxCompleteGroups
+from models import WoWGroup
+from pairing_history import PairingHistory
+from parallel_group_creator import EXACT, clear, create_mythic_plus_groups
+from scoring import groupingScore
+from prebuilt_classes import *
+from roster_generator import generateRoster
+
+
+class TestExactSolver(unittest.TestCase):
+    def setUp(self):
+        clear()
+        self.players = [
+            TankWarrior("Tank1"),
+            TankDeathKnight("Brez1"),
+            HealerDruid("Brez2"),
+            HealerPriest("Healer2"),
+            Mage("Lust1"),
+            Mage("Lust2"),
+            Warrior("Warrior1"),
+            Warrior("Warrior2"),
+            FeralDruid("Feral1"),
+            FeralDruid("Feral2"),
+        ]
+
+    def tearDown(self):
+        clear()
+
+    def test_best_groups(self):
+        """Test that the exact search gives every group brez, lust and ranged"""
+        groups = exactGroups(self.players, 2)
+
+        self.assertEqual(len(groups), 2)
+        for group in groups:
+            self.assertTrue(group.is_complete)
+            self.assertTrue(group.has_brez and group.has_lust and group.has_ranged, f"group {group} should have every utility")
+
+    def test_scores_match_scoring(self):
+        """Test that the search never does worse than any other grouping of the same players"""
+        coplay = CoPlayIndex([
+            WoWGroup(tank=self.players[0], healer=self.players[2], dps=[self.players[4], self.players[6], self.players[8]]),
+        ])
+        groups = exactGroups(self.players, 2, coplay=coplay)
+        for _ in range(20):
+            clear()
+            greedy = create_mythic_plus_groups(self.players, debug=False)
+            self.assertGreaterEqual(groupingScore(groups, coplay=coplay), groupingScore(greedy, coplay=coplay))
+
+    def test_offspec_only_when_needed(self):
+        """Test that the exact search finds the only way to fill both groups"""
+        players = [
+            TankWarrior("Tank1"),
+            Paladin("Offtank", offtank=True),
+            HealerDruid("Healer1"),
+            BalanceDruid("Offhealer", offhealer=True),
+            Mage("Mage1"),
+            Mage("Mage2"),
+            Warrior("Warrior1"),
+            Warrior("Warrior2"),
+            FeralDruid("Feral1"),
+            FeralDruid("Feral2"),
+        ]
+        groups = exactGroups(players, 2)
+        self.assertEqual(len(groups), 2)
+        self.assertEqual({g.tank.name for g in groups}, {"Tank1", "Offtank"})
+        self.assertEqual({g.healer.name for g in groups}, {"Healer1", "Offhealer"})
+
+    def test_too_big_falls_back(self):
+        """Test that big rosters are left to the greedy engine"""
+        self.assertIsNone(exactGroups(self.players, 2, maxPlayers=9))
+
+        players = [TankWarrior(f"Tank{i}") for i in range(6)] + \
+            [HealerPriest(f"Healer{i}") for i in range(6)] + \
+            [Mage(f"Mage{i}") for i in range(18)]
+        groups = create_mythic_plus_groups(players, debug=False, mode=EXACT)
+        self.assertEqual(len(groups), 6)
+        for group in groups:
+            self.assertTrue(group.is_complete)
+
+    def test_finishes_at_max_players(self):
+        """Test that realistic rosters as big as the exact search takes finish within the time limit"""
+        for seed in range(3):
+            players = generateRoster(EXACT_MAX_PLAYERS, rng=random.Random(seed))
+            history = PairingHistory()
+            for _ in range(2):
+                clear()
+                history.recordSession(create_mythic_plus_groups(players, debug=False))
+            coplay = CoPlayIndex(create_mythic_plus_groups(players, debug=False))
+            groupCount = maxCompleteGroups(players)
+            start = time.perf_counter()
+            groups = exactGroups(players, groupCount, coplay=coplay, history=history)
+            self.assertIsNotNone(groups, f"roster {seed} should finish")
+            self.assertLess(time.perf_counter() - start, 2 * EXACT_TIME_LIMIT)
+            self.assertEqual(len(groups), groupCount)
+
+    def test_exact_mode_keeps_remainder(self):
+        """Test that players left out of the exact groups end up in remainder groups"""
+        players = self.players + [Rogue("Rogue1")]
+        groups = create_mythic_plus_groups(players, debug=False, mode=EXACT)
+
+        self.assertEqual(len(groups), 3)
+        self.assertEqual(sum(group.size for group in groups), len(players))
+        for group in groups[:2]:
+            self.assertTrue(group.has_brez and group.has_lust)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import random
+import sys
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from feasibility import SLOTS_PER_GROUP, MinCostFlow, _buildNetwork, _signatures, assignRoles, maxCompleteGroups
+from models import Role, WoWPlayer
+from prebuilt_classes import *
+from roster_generator import ROLE_MIXES, generateRoster
+
+
+class TestFeasibility(unittest.TestCase):
+    def test_min_cost_flow(self):
+        """Test that the flow takes the cheapest paths first"""
+        network = MinCostFlow(4)
+        cheap = network.addEdge(0, 1, 1, 1)
+        expensive = network.addEdge(0, 2, 5, 10)
+        network.addEdge(1, 3, 5)
+        network.addEdge(2, 3, 5)
+
+        self.assertEqual(network.solve(0, 3, 2), (2, 11))
+        self.assertEqual(network.flowOn(cheap), 1)
+        self.assertEqual(network.flowOn(expensive), 1)
+
+    def test_offspec_overlap_is_not_double_counted(self):
+        """Test that players able to play several roles only fill one slot"""
+        players = [WoWPlayer.create(f"Flex{i}", ["Tank", "Healer Offspec", "DPS Offspec"]) for i in range(5)]
+        self.assertEqual(maxCompleteGroups(players), 1)
+
+        # Three tanks that can offheal can't also cover both healer slots and both tank slots
+        players = [WoWPlayer.create(f"Flex{i}", ["Tank", "Healer Offspec"]) for i in range(3)] + \
+            [Mage(f"Mage{i}") for i in range(7)]
+        self.assertEqual(maxCompleteGroups(players), 1)
+
+    def test_matches_flow(self):
+        """Test that the counted maximum is the most groups a flow can fill, and no fewer"""
+        for seed in range(20):
+            rng = random.Random(seed)
+            mix = rng.choice(sorted(ROLE_MIXES))
+            players = generateRoster(rng.randrange(5, 80), mix, offspecRate=rng.random(), rng=rng)
+            groups = maxCompleteGroups(players)
+            for g, fills in ((groups, True), (groups + 1, False)):
+                network, source, sink, _ = _buildNetwork(_signatures(players), g)
+                flow, _ = network.solve(source, sink)
+                self.assertEqual(flow == g * sum(SLOTS_PER_GROUP), fills)
+
+    def test_missing_role(self):
+        """Test that no complete group can be formed without a healer"""
+        players = [TankWarrior("Tank1")] + [Warrior(f"Warrior{i}") for i in range(9)]
+        self.assertEqual(maxCompleteGroups(players), 0)
+        self.assertEqual(len(assignRoles(players).bench), 10)
+
+    def test_assignment_prefers_main_specs(self):
+        """Test that offspecs are only used when they are needed"""
+        players = [
+            TankWarrior("Tank1"),
+            Paladin("Offtank", offtank=True),
+            HealerDruid("Healer1"),
+            BalanceDruid("Offhealer", offhealer=True),
+            Mage("Mage1"),
+            Mage("Mage2"),
+            Warrior("Warrior1"),
+            Warrior("Warrior2"),
+            FeralDruid("Feral1"),
+            FeralDruid("Feral2"),
+            HealerPriest("Healer2"),
+        ]
+        assignment = assignRoles(players)
+
+        self.assertEqual(assignment.groups, 2)
+        self.assertEqual(assignment.offspecs, 1)
+        self.assertEqual(assignment.roleOf(players[1]), Role.TANK)
+        self.assertEqual(assignment.roleOf(players[3]), Role.DPS)
+        self.assertEqual(len(assignment.bench), 1)
+
+    def test_bench_keeps_utility_players(self):
+        """Test that players without a utility are benched first"""
+        players = [TankWarrior("Tank1"), HealerPriest("Healer1"), DeathKnight("Brez1"), Mage("Lust1"), Rogue("Rogue1"), Rogue("Rogue2")]
+        for _ in range(10):
+            assignment = assignRoles(players)
+            self.assertEqual(len(assignment.bench), 1)
+            self.assertIn(assignment.bench[0].name, ["Rogue1", "Rogue2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
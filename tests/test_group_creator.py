@@ -7,7 +7,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 from models import WoWPlayer
 from parallel_group_creator import clear, create_mythic_plus_groups
-from tests.prebuilt_classes import *
+from prebuilt_classes import *
 
 
 class TestGroupCreator(unittest.TestCase):
@@ -236,6 +236,27 @@ class TestGroupCreator(unittest.TestCase):
         self.assertEqual(groups[2].size, 1, 'Second to last group should have 1 player')
         self.assertEqual(groups[3].size, 2, 'Last group should have 2 players')
 
+    def test_no_group_without_a_healer(self):
+        """Test that a second group isn't started when nobody could heal it"""
+        players = [
+            TankWarrior("Tank1"),
+            TankWarrior("Tank2"),
+            HealerDruid("Healer1"),
+            Mage("Mage1"),
+            Mage("Mage2"),
+            Warrior("Warrior1"),
+            Warrior("Warrior2"),
+            Warrior("Warrior3"),
+            FeralDruid("Feral1"),
+            FeralDruid("Feral2"),
+        ]
+        groups = create_mythic_plus_groups(players)
+
+        complete_groups = [group for group in groups if group.is_complete]
+        self.assertEqual(len(complete_groups), 1)
+        self.assertTrue(groups[0].is_complete, "The first group should be complete")
+        self.assertEqual(sum(group.size for group in groups), len(players))
+
     def test_not_in_same_group_as_last_time(self):
         """Test that players are not put in the same group as last time if possible"""
         players = [
@@ -260,15 +281,15 @@ class TestGroupCreator(unittest.TestCase):
         # Create new groups with the same players
         new_groups = create_mythic_plus_groups(players)
 
-        # Verify that no players are in the same group as last time
-        for old_group, new_group in zip(lastGroups, new_groups):
-            old_players = set(old_group.players)
-            new_players = set(new_group.players)
-            intersection = old_players.intersection(new_players)
-            self.assertEqual(
-                len(intersection),
-                0,
-                f"Players {intersection} are in the same group as last time",
+        # Verify that no group is made up of the same players as last time.
+        # With two tanks and two healers everyone shares a group with someone again,
+        # but the groups themselves should get mixed up.
+        old_groups = [set(old_group.players) for old_group in lastGroups]
+        for new_group in new_groups:
+            self.assertNotIn(
+                set(new_group.players),
+                old_groups,
+                f"Group {new_group} is the same as last time",
             )
 
 if __name__ == "__main__":
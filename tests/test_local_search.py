@@ -0,0 +1,87 @@
+import itertools
+import os
+import random
+import sys
+import time
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from local_search import SWAPPABLE_SEATS, improveGroups
+from models import WoWGroup
+from parallel_group_creator import ANYTIME, clear, create_mythic_plus_groups
+from scoring import groupScore
+from solver import EPSILON, getSeat, withSeat
+from prebuilt_classes import *
+
+
+class TestLocalSearch(unittest.TestCase):
+    def setUp(self):
+        clear()
+        self.groups = [
+            WoWGroup(tank=TankWarrior("Tank1"), healer=HealerShaman("Healer1"),
+                     dps=[DeathKnight("Brez1"), FeralDruid("Brez2"), Rogue("Rogue1")]),
+            WoWGroup(tank=TankMonk("Tank2"), healer=HealerPriest("Healer2"),
+                     dps=[Mage("Lust1"), Rogue("Rogue2"), Rogue("Rogue3")]),
+        ]
+
+    def tearDown(self):
+        clear()
+
+    def test_swaps_fix_utilities(self):
+        """Test that a swap between groups gives both groups a brez"""
+        groups, report = improveGroups(self.groups, time.perf_counter() + 1)
+
+        for group in groups:
+            self.assertTrue(group.has_brez, f"group {group} should have a brez")
+        self.assertGreater(report.score, report.initialScore)
+        self.assertGreater(report.improvements, 0)
+        self.assertGreaterEqual(report.iterations, report.improvements)
+        self.assertTrue(report.converged)
+
+    def test_converged_means_no_swap_helps(self):
+        """Test that the search only reports it converged once no single swap raises the score"""
+        # Always draws the same tank swap, which never helps
+        class SameSwap(random.Random):
+            def sample(self, population, k):
+                return list(population)[:k]
+
+            def choices(self, population, weights=None, k=1):
+                return [population[0]] * k
+
+        groups, report = improveGroups(self.groups, time.perf_counter() + 5, rng=SameSwap())
+        self.assertTrue(report.converged)
+        for group in groups:
+            self.assertTrue(group.has_brez, f"group {group} should have a brez")
+
+        for seatsA, seatsB in SWAPPABLE_SEATS:
+            for seatA, seatB in itertools.product(seatsA, seatsB):
+                newA = withSeat(groups[0], seatA, getSeat(groups[1], seatB))
+                newB = withSeat(groups[1], seatB, getSeat(groups[0], seatA))
+                self.assertLessEqual(groupScore(newA) + groupScore(newB),
+                                     groupScore(groups[0]) + groupScore(groups[1]) + EPSILON)
+
+    def test_deadline_already_passed(self):
+        """Test that the groups come back untouched when there is no time left"""
+        groups, report = improveGroups(self.groups, time.perf_counter() - 1)
+
+        self.assertEqual(groups, self.groups)
+        self.assertEqual(report.iterations, 0)
+        self.assertEqual(report.score, report.initialScore)
+
+    def test_anytime_mode_reports(self):
+        """Test that the anytime mode fills in the search report"""
+        players = [p for group in self.groups for p in group.players] + [Rogue("Rogue4")]
+        stats = {}
+        start = time.perf_counter()
+        groups = create_mythic_plus_groups(players, debug=False, mode=ANYTIME, deadline=0.05, stats=stats)
+
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(sum(group.size for group in groups), len(players))
+        self.assertIn("search", stats)
+        self.assertGreaterEqual(stats["search"].score, stats["search"].initialScore)
+
+
+if __name__ == "__main__":
+    unittest.main()
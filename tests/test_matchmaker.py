@@ -0,0 +1,137 @@
+import os
+import sys
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from matchmaker import Matchmaker, QueueEntry, RoleQueue
+from prebuilt_classes import *
+
+
+class TestMatchmaker(unittest.TestCase):
+    def setUp(self):
+        self.now = [0.0]
+        self.matchmaker = Matchmaker(clock=lambda: self.now[0])
+
+    def enqueue(self, *players):
+        matches = []
+        for player in players:
+            self.now[0] += 1
+            matches.extend(self.matchmaker.enqueue(player))
+        return matches
+
+    def test_role_queue(self):
+        """Test that the heap gives the longest waiting live entries and skips removed ones"""
+        queue = RoleQueue()
+        entries = [QueueEntry(ticket=n, player=Mage(f"Mage{n}"), joined=0) for n in range(5)]
+        for entry in reversed(entries):
+            queue.push(entry)
+        entries[0].active = False
+        queue.discard()
+
+        self.assertEqual(len(queue), 4)
+        self.assertEqual(queue.oldest(2), entries[1:3])
+        self.assertEqual(queue.oldest(10), entries[1:])
+
+    def test_forms_group_when_possible(self):
+        """Test that a group is formed as soon as the fifth player joins"""
+        matches = self.enqueue(TankDeathKnight("Tank1"), HealerShaman("Healer1"), Mage("Mage1"), Rogue("Rogue1"))
+        self.assertEqual(matches, [])
+        self.assertEqual(len(self.matchmaker), 4)
+
+        matches = self.enqueue(Warlock("Warlock1"))
+        self.assertEqual(len(matches), 1)
+        group = matches[0].group
+        self.assertTrue(group.is_complete)
+        self.assertTrue(group.has_brez and group.has_lust)
+        self.assertEqual(matches[0].waited, 4)
+        self.assertEqual(len(self.matchmaker), 0)
+
+    def test_needs_utilities(self):
+        """Test that no group is formed without battle res and bloodlust"""
+        matches = self.enqueue(TankDemonHunter("Tank1"), HealerPriest("Healer1"), Rogue("Rogue1"), Rogue("Rogue2"),
+                               Rogue("Rogue3"))
+        self.assertEqual(matches, [])
+        matches = self.enqueue(Mage("Mage1"), DeathKnight("DeathKnight1"))
+        self.assertEqual(len(matches), 1)
+        names = {player.name for player in matches[0].group.players}
+        self.assertIn("Mage1", names)
+        self.assertIn("DeathKnight1", names)
+
+    def test_longest_waiting_first(self):
+        """Test that the players waiting longest get the group"""
+        self.enqueue(Mage("Mage1"), Warlock("Warlock1"), Warlock("Warlock2"), HealerShaman("Healer1"))
+        matches = self.enqueue(TankDeathKnight("Tank1"))
+        self.assertEqual(sorted(p.name for p in matches[0].group.dps), ["Mage1", "Warlock1", "Warlock2"])
+
+    def test_main_spec_preferred(self):
+        """Test that a main spec is picked over an offspec that waited a little longer"""
+        self.enqueue(Warrior("Offtank1", offtank=True), BalanceDruid("Druid1"), Warlock("Warlock1"),
+                     Warlock("Warlock2"), TankWarrior("Tank1"))
+        matches = self.enqueue(HealerShaman("Healer1"))
+        self.assertEqual(matches[0].group.tank.name, "Tank1")
+
+    def test_dequeue(self):
+        """Test that players who leave aren't matched"""
+        self.enqueue(TankDeathKnight("Tank1"), HealerShaman("Healer1"), Mage("Mage1"), Rogue("Rogue1"))
+        self.assertIsNotNone(self.matchmaker.dequeue("Tank1"))
+        self.assertIsNone(self.matchmaker.dequeue("Tank1"))
+        self.assertEqual(self.enqueue(Warlock("Warlock1")), [])
+        self.assertEqual(len(self.enqueue(TankDeathKnight("Tank2"))), 1)
+
+    def test_requeue_keeps_place(self):
+        """Test that changing roles keeps a player's place in line"""
+        self.enqueue(Shaman("Shaman1"))
+        ticket = self.matchmaker.entry("Shaman1").ticket
+        self.enqueue(Mage("Mage1"), Shaman("Shaman1", offhealer=True))
+        self.assertEqual(self.matchmaker.entry("Shaman1").ticket, ticket)
+        self.assertEqual(len(self.matchmaker), 2)
+        self.assertEqual(len(self.matchmaker.queues['healer']), 1)
+
+    def test_keyed_by_id(self):
+        """Test that a player queued by id keeps their place and can leave after renaming"""
+        self.matchmaker.enqueue(Shaman("Shaman1"), key=42)
+        ticket = self.matchmaker.entry(42).ticket
+        self.matchmaker.enqueue(Shaman("Renamed", offhealer=True), key=42)
+        self.assertEqual(len(self.matchmaker), 1)
+        self.assertEqual(self.matchmaker.entry(42).ticket, ticket)
+        self.assertEqual(self.matchmaker.entry(42).player.name, "Renamed")
+        self.assertNotIn("Shaman1", self.matchmaker)
+        self.assertEqual(len(self.enqueue(TankDeathKnight("Tank1"), Mage("Mage1"), Rogue("Rogue1"), Warlock("Warlock1"))), 1)
+        self.assertNotIn(42, self.matchmaker)
+
+    def test_no_roles(self):
+        """Test that a player without a role can't queue"""
+        with self.assertRaises(ValueError):
+            self.matchmaker.enqueue(WoWPlayer.create("Nobody", []))
+
+    def test_utilities_outside_window(self):
+        """Test that a group is found when only players outside the window bring the utilities"""
+        self.enqueue(TankDemonHunter("Tank1"), HealerPriest("Healer1"),
+                     *[Rogue(f"Rogue{n}") for n in range(12)])
+        matches = self.enqueue(Mage("Mage1"), DeathKnight("DeathKnight1"))
+        self.assertEqual(len(matches), 1)
+        names = {player.name for player in matches[0].group.players}
+        self.assertIn("Mage1", names)
+        self.assertIn("DeathKnight1", names)
+        # The third DPS is the longest waiting one
+        self.assertIn("Rogue0", names)
+
+    def test_matching_is_bounded(self):
+        """Test that the work per join doesn't grow with the length of the queue"""
+        work = []
+        for waiting in (300, 3000):
+            matchmaker = Matchmaker()
+            for n in range(waiting):
+                matchmaker.enqueue(Rogue(f"Rogue{n}"))
+            for n in range(20):
+                matchmaker.enqueue(TankDemonHunter(f"Tank{n}"))
+                matchmaker.enqueue(HealerPriest(f"Healer{n}"))
+            self.assertEqual(len(matchmaker), waiting + 40)
+            work.append(matchmaker.examined)
+        self.assertEqual(work[0], work[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models import Role, RosterTable, WoWPlayer
+from prebuilt_classes import *
+
+
+class TestModels(unittest.TestCase):
+    def test_create_sets_role_mask(self):
+        """Test that WoWPlayer.create packs the Discord roles into the role mask"""
+        player = WoWPlayer.create("Widdershins", ["Healer Offspec", "Ranged", "Lust"])
+        self.assertTrue(player.dpsMain and player.ranged and player.offhealer and player.hasLust)
+        self.assertEqual(player.roleMask, Role.DPS | Role.RANGED | Role.OFFHEALER | Role.LUST)
+
+    def test_prebuilt_classes_set_role_mask(self):
+        """Test that players built from bool fields get the same mask"""
+        self.assertEqual(TankPaladin("Tank1", offhealer=True).roleMask, Role.TANK | Role.BREZ | Role.OFFHEALER)
+
+    def test_test_string_round_trip(self):
+        """Test that toTestString produces a create call for an equal player"""
+        player = WoWPlayer.create("Moriim", ["Tank Offspec", "Healer Offspec", "Melee", "Ranged"])
+        self.assertEqual(
+            player.toTestString(),
+            "WoWPlayer.create(\"Moriim\", ['DPS', 'Tank Offspec', 'Healer Offspec', 'Ranged', 'Melee'])",
+        )
+        rebuilt = eval(player.toTestString())
+        self.assertEqual(rebuilt.roleMask, player.roleMask)
+
+    def test_has_roles(self):
+        """Test that utility roles alone don't count as a role"""
+        self.assertFalse(WoWPlayer.create("Nobody", ["Brez", "Lust"]).hasRoles())
+        self.assertTrue(WoWPlayer.create("Somebody", ["DPS Offspec"]).hasRoles())
+
+    def test_roster_table_queries(self):
+        """Test role and utility queries over a roster table"""
+        players = [TankPaladin("Tank1"), Paladin("Offtank", offtank=True), HealerShaman("Healer1"), Mage("Mage1")]
+        table = RosterTable(players)
+
+        self.assertEqual(table.playersWith(Role.TANK), [players[0]])
+        self.assertEqual(table.playersWith(Role.OFFTANK, noneOf=Role.TANK), [players[1]])
+        self.assertEqual(table.select(anyOf=Role.LUST), [2, 3])
+        self.assertEqual(table.count(Role.DPS, anyOf=Role.BREZ | Role.LUST), 2)
+
+    def test_roster_table_from_masks(self):
+        """Test that a roster table rebuilds players from names and masks"""
+        table = RosterTable.fromMasks(["Mage1"], [Role.DPS | Role.RANGED | Role.LUST])
+        self.assertEqual(table.players[0].toTestString(), "WoWPlayer.create(\"Mage1\", ['DPS', 'Ranged', 'Lust'])")
+
+
+if __name__ == "__main__":
+    unittest.main()
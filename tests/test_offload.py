@@ -0,0 +1,207 @@
+import asyncio
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from engine import ANYTIME, GREEDY, GroupEngine
+from offload import PROCESS, THREAD, makeExecutor, solveOffloaded, streamOffloaded
+from pairing_history import PairingHistory
+from tracing import WARNING, Tracer
+from prebuilt_classes import *
+
+players = [
+    TankWarrior("Tank1"),
+    TankDeathKnight("Brez1"),
+    HealerDruid("Brez2"),
+    HealerPriest("Healer2"),
+    Mage("Lust1"),
+    Mage("Lust2"),
+    Warrior("Warrior1"),
+    Warrior("Warrior2"),
+    FeralDruid("Feral1"),
+    FeralDruid("Feral2"),
+]
+
+
+# An executor whose jobs never finish until released
+class StuckExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.release = threading.Event()
+
+    def submit(self, fn, *args, **kwargs):
+        return super().submit(lambda: (self.release.wait(), fn(*args, **kwargs))[1])
+
+
+class TestOffload(unittest.TestCase):
+    def test_thread_pool(self):
+        """Test that groups are solved in a thread without changing the engine"""
+        history = PairingHistory()
+        engine = GroupEngine(history=history, seed=1)
+        with makeExecutor(THREAD, 2) as executor:
+            result = asyncio.run(solveOffloaded(engine, players, executor))
+
+        self.assertFalse(result.fallback)
+        self.assertEqual(sum(group.size for group in result.groups), len(players))
+        self.assertIn('phases', result.stats)
+        self.assertEqual(engine.lastGroups, [])
+        self.assertEqual(history.sessions, 0)
+
+    def test_process_pool(self):
+        """Test that groups can be solved in a worker process"""
+        engine = GroupEngine(history=PairingHistory(), seed=1)
+        with makeExecutor(PROCESS, 1) as executor:
+            result = asyncio.run(solveOffloaded(engine, players, executor))
+        self.assertFalse(result.fallback)
+        self.assertEqual(sum(group.size for group in result.groups), len(players))
+
+    def test_timeout_falls_back_to_greedy(self):
+        """Test that an overrunning solver is replaced by the greedy groups"""
+        tracer = Tracer(level=WARNING)
+        engine = GroupEngine(mode=ANYTIME, deadline=10, tracer=tracer, seed=1)
+        executor = StuckExecutor()
+        try:
+            result = asyncio.run(solveOffloaded(engine, players, executor, timeout=0.05))
+        finally:
+            executor.release.set()
+            executor.shutdown()
+
+        self.assertTrue(result.fallback)
+        self.assertLess(result.elapsed, 1)
+        self.assertEqual(sum(group.size for group in result.groups), len(players))
+        self.assertTrue(tracer.events('solver_timeout'))
+        # The only worker is stuck, so the greedy groups had to be built on the event loop
+        self.assertTrue(tracer.events('greedy_inline'))
+
+    def test_failure_falls_back_to_greedy(self):
+        """Test that a broken executor is replaced by the greedy groups"""
+        executor = makeExecutor(THREAD, 1)
+        executor.shutdown()
+        tracer = Tracer(level=WARNING)
+        result = asyncio.run(solveOffloaded(GroupEngine(tracer=tracer), players, executor))
+        self.assertTrue(result.fallback)
+        self.assertTrue(tracer.events('solver_failed'))
+
+    def test_cancellation(self):
+        """Test that cancelling the command cancels the wait"""
+        executor = StuckExecutor()
+
+        async def main():
+            task = asyncio.create_task(solveOffloaded(GroupEngine(), players, executor, timeout=10))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        try:
+            asyncio.run(main())
+        finally:
+            executor.release.set()
+            executor.shutdown()
+
+    def test_stream_from_thread(self):
+        """Test that streamed groups come out of a thread one at a time, with the solver's stats"""
+        stats = {}
+
+        async def main():
+            return [group async for group in streamOffloaded(GroupEngine(seed=1), players, executor, stats=stats)]
+
+        with makeExecutor(THREAD, 1) as executor:
+            groups = asyncio.run(main())
+        self.assertEqual(sum(group.size for group in groups), len(players))
+        self.assertIn('phases', stats)
+
+    def test_stream_mode_override(self):
+        """Test that an ANYTIME engine can stream in a streaming mode instead"""
+        stats = {}
+
+        async def main():
+            engine = GroupEngine(mode=ANYTIME, deadline=10, seed=1)
+            return [group async for group in streamOffloaded(engine, players, executor, stats=stats, mode=GREEDY)]
+
+        with makeExecutor(THREAD, 1) as executor:
+            groups = asyncio.run(main())
+        self.assertEqual(sum(group.size for group in groups), len(players))
+        # No ten second search ran
+        self.assertNotIn('search', stats)
+
+    def test_stream_from_process(self):
+        """Test that a process pool still streams every group, after solving them all"""
+        async def main():
+            return [group async for group in streamOffloaded(GroupEngine(seed=1), players, executor)]
+
+        with makeExecutor(PROCESS, 1) as executor:
+            groups = asyncio.run(main())
+        self.assertEqual(sum(group.size for group in groups), len(players))
+
+    def test_stream_timeout_falls_back_to_greedy(self):
+        """Test that a stream whose first group is late yields the greedy groups"""
+        tracer = Tracer(level=WARNING)
+        executor = StuckExecutor()
+
+        async def main():
+            stream = streamOffloaded(GroupEngine(tracer=tracer, seed=1), players, executor, timeout=0.05)
+            return [group async for group in stream]
+
+        try:
+            groups = asyncio.run(main())
+        finally:
+            executor.release.set()
+            executor.shutdown()
+        self.assertEqual(sum(group.size for group in groups), len(players))
+        self.assertTrue(tracer.events('solver_timeout'))
+
+    def test_stream_stuck_after_first_group(self):
+        """Test that a solver stuck after its first group doesn't hold up the rest of the groups"""
+        tracer = Tracer(level=WARNING)
+        release = threading.Event()
+        iterSolve = GroupEngine.iterSolve
+
+        def stuck(engine, players, **kwargs):
+            groups = iterSolve(engine, players, **kwargs)
+            yield next(groups)
+            release.wait()
+            yield from groups
+
+        async def main():
+            stream = streamOffloaded(GroupEngine(tracer=tracer, seed=1), players, executor, timeout=0.2)
+            return [group async for group in stream]
+
+        with makeExecutor(THREAD, 2) as executor:
+            try:
+                with mock.patch.object(GroupEngine, 'iterSolve', stuck):
+                    groups = asyncio.run(main())
+            finally:
+                release.set()
+        self.assertCountEqual([p.name for group in groups for p in group.players], [p.name for p in players])
+        self.assertTrue(tracer.events('solver_timeout'))
+        # The other worker built the greedy groups
+        self.assertFalse(tracer.events('greedy_inline'))
+
+    def test_stream_failure_falls_back_to_greedy(self):
+        """Test that a stream from a broken executor yields the greedy groups"""
+        executor = makeExecutor(THREAD, 1)
+        executor.shutdown()
+        tracer = Tracer(level=WARNING)
+
+        async def main():
+            return [group async for group in streamOffloaded(GroupEngine(tracer=tracer), players, executor)]
+
+        groups = asyncio.run(main())
+        self.assertEqual(sum(group.size for group in groups), len(players))
+        self.assertTrue(tracer.events('solver_failed'))
+
+    def test_unknown_executor(self):
+        """Test that an unknown kind of executor is rejected"""
+        with self.assertRaises(ValueError):
+            makeExecutor("fiber")
+
+
+if __name__ == "__main__":
+    unittest.main()
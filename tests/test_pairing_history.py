@@ -0,0 +1,115 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models import WoWGroup
+from pairing_history import PairingHistory
+from parallel_group_creator import clear, create_mythic_plus_groups
+from prebuilt_classes import *
+
+
+class TestPairingHistory(unittest.TestCase):
+    def setUp(self):
+        clear()
+        self.tank = TankWarrior("Tank1")
+        self.healer = HealerDruid("Healer1")
+        self.mage = Mage("Mage1")
+        self.rogue = Rogue("Rogue1")
+        self.group = WoWGroup(tank=self.tank, healer=self.healer, dps=[self.mage])
+
+    def tearDown(self):
+        clear()
+
+    def test_pairs_are_counted(self):
+        """Test that every pair in a recorded group gets a weight"""
+        history = PairingHistory(decay=0.5)
+        history.recordSession([self.group])
+
+        self.assertEqual(history.weight(self.tank, self.healer), 1.0)
+        self.assertEqual(history.weight("Mage1", "Tank1"), 1.0)
+        self.assertEqual(history.weight(self.tank, self.rogue), 0.0)
+        self.assertEqual(history.score(self.mage, [self.tank, self.healer]), 2.0)
+
+    def test_pairs(self):
+        """Test that pairs lists every pair of the players that played together, with its weight"""
+        history = PairingHistory(decay=0.5)
+        history.recordSession([self.group])
+        history.recordSession([WoWGroup(tank=self.tank, dps=[self.rogue])])
+
+        pairs = {frozenset((a.name, b.name)): weight for a, b, weight in history.pairs([self.rogue, self.tank, self.mage])}
+        self.assertEqual(pairs, {frozenset(("Tank1", "Rogue1")): 1.0, frozenset(("Tank1", "Mage1")): 0.5})
+
+    def test_decay_per_session(self):
+        """Test that older sessions count for less"""
+        history = PairingHistory(decay=0.5)
+        history.recordSession([self.group])
+        history.recordSession([WoWGroup(tank=self.tank, dps=[self.rogue])])
+        history.recordSession([])
+
+        self.assertEqual(history.weight(self.tank, self.healer), 0.25)
+        self.assertEqual(history.weight(self.tank, self.rogue), 0.5)
+        self.assertEqual(history.sessions, 3)
+
+    def test_renormalize(self):
+        """Test that long histories keep their weights when the scale is renormalized"""
+        history = PairingHistory(decay=0.1)
+        history.recordSession([self.group])
+        for _ in range(150):
+            history.recordSession([WoWGroup(tank=self.tank, dps=[self.rogue])])
+
+        self.assertAlmostEqual(history.weight(self.tank, self.rogue), 1.0 / 0.9, places=6)
+        self.assertAlmostEqual(history.weight(self.tank, self.healer), 0.0, places=6)
+
+    def test_save_and_load(self):
+        """Test that a history survives a round trip through a file"""
+        history = PairingHistory(decay=0.5)
+        history.recordSession([self.group])
+        history.recordSession([WoWGroup(tank=self.tank, dps=[self.rogue])])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "history.json")
+            history.save(path)
+            loaded = PairingHistory.load(path)
+
+        self.assertEqual(loaded.sessions, 2)
+        self.assertEqual(len(loaded), 4)
+        self.assertEqual(loaded.weight(self.tank, self.healer), 0.5)
+        self.assertEqual(loaded.weight(self.tank, self.rogue), 1.0)
+
+    def test_copy_is_independent(self):
+        """Test that a copy keeps the weights and doesn't see later sessions"""
+        history = PairingHistory(decay=0.5)
+        history.recordSession([self.group])
+        copy = history.copy()
+        history.recordSession([WoWGroup(tank=self.tank, dps=[self.rogue])])
+
+        self.assertEqual(copy.sessions, 1)
+        self.assertEqual(copy.weight(self.tank, self.healer), 1.0)
+        self.assertEqual(copy.weight(self.tank, self.rogue), 0.0)
+        self.assertEqual(history.weight(self.tank, self.healer), 0.5)
+
+    def test_creator_prefers_least_paired(self):
+        """Test that the group creator avoids pairs that played together in older sessions"""
+        tanks = [TankWarrior("Tank1"), TankWarrior("Tank2")]
+        healers = [HealerPriest("Healer1"), HealerPriest("Healer2")]
+        history = PairingHistory(decay=0.9)
+        history.recordSession([
+            WoWGroup(tank=tanks[0], healer=healers[0]),
+            WoWGroup(tank=tanks[1], healer=healers[1]),
+        ])
+        players = tanks + healers + [Warrior(f"Warrior{i}") for i in range(6)]
+
+        for _ in range(10):
+            # Forget the last wheel so only the long term history is left
+            clear()
+            groups = create_mythic_plus_groups(players, debug=False, history=PairingHistory.fromDict(history.toDict()))
+            for group in groups:
+                self.assertNotEqual(tanks.index(group.tank), healers.index(group.healer))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import sys
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parallel_group_creator import ANYTIME, EXACT, clear, create_mythic_plus_groups
+from phase_timer import NullPhaseTimer, PhaseTimer, formatPhases
+from prebuilt_classes import *
+
+players = [
+    TankWarrior("Tank1"),
+    TankPaladin("Tank2"),
+    HealerShaman("Healer1"),
+    HealerDruid("Healer2"),
+    Mage("Mage1"),
+    Rogue("Rogue1"),
+    Warlock("Warlock1"),
+    DeathKnight("DeathKnight1"),
+    Hunter("Hunter1"),
+    Priest("Priest1"),
+    Warrior("Warrior1"),
+]
+
+
+class TestPhaseTimer(unittest.TestCase):
+    def setUp(self):
+        clear()
+
+    def tearDown(self):
+        clear()
+
+    def test_laps_and_helpers(self):
+        """Test that laps and timed helpers are counted"""
+        timer = PhaseTimer()
+        double = timer.timed('double', lambda x: x * 2)
+        self.assertEqual(double(2), 4)
+        self.assertEqual(double(3), 6)
+        timer.lap('first')
+        timer.lap('first')
+        timer.lap('second')
+
+        self.assertEqual({name: stat.calls for name, stat in timer.phases.items()},
+                         {'double': 2, 'first': 2, 'second': 1})
+        self.assertTrue(all(stat.seconds >= 0 for stat in timer.phases.values()))
+        self.assertEqual(len(formatPhases(timer.phases).splitlines()), 3)
+
+    def test_null_timer(self):
+        """Test that the null timer records nothing and leaves helpers alone"""
+        timer = NullPhaseTimer()
+        function = lambda: None
+        self.assertIs(timer.timed('function', function), function)
+        timer.lap('phase')
+        self.assertEqual(timer.phases, {})
+
+    def test_group_creator_phases(self):
+        """Test that the group creator reports every phase and helper it ran"""
+        stats = {}
+        create_mythic_plus_groups(players, mode=ANYTIME, deadline=0.01, stats=stats)
+        phases = stats['phases']
+        for phase in ('pools', 'tanks', 'lust', 'brez', 'healers', 'ranged', 'dps', 'search', 'remainder'):
+            self.assertEqual(phases[phase].calls, 1, phase)
+        self.assertNotIn('exact', phases)
+        self.assertEqual(phases['removePlayer'].calls, len(players))
+        self.assertGreaterEqual(phases['grabNextAvailablePlayer'].calls, len(players))
+
+        stats = {}
+        create_mythic_plus_groups(players, mode=EXACT, stats=stats)
+        self.assertIn('exact', stats['phases'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import sys
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from engine import GroupEngine
+from models import DPS, TANK, WoWGroup
+from repair import SlotIndex, repairGroups
+from prebuilt_classes import *
+
+
+class TestRepair(unittest.TestCase):
+    def setUp(self):
+        self.groups = [
+            WoWGroup(tank=TankWarrior("Tank1"), healer=HealerShaman("Healer1"),
+                     dps=[Mage("Mage1"), Rogue("Rogue1"), Warrior("Warrior1")]),
+            WoWGroup(tank=TankDeathKnight("Tank2"), healer=HealerDruid("Healer2"),
+                     dps=[Mage("Mage2"), Rogue("Rogue2"), Warrior("Warrior2")]),
+            WoWGroup(healer=HealerPriest("Healer3"), dps=[Rogue("Rogue3")]),
+        ]
+
+    def test_slot_index(self):
+        """Test that the index knows where everyone is and which seats are open"""
+        index = SlotIndex(self.groups)
+        self.assertEqual(index.where[Rogue("Rogue3")], 2)
+        self.assertEqual(index.open[TANK], {2})
+        self.assertEqual(index.open[DPS], {2})
+        self.assertEqual(index.remove(Mage("Mage1")), (0, DPS))
+        self.assertEqual(index.open[DPS], {0, 2})
+        # The original group is left alone
+        self.assertEqual(len(self.groups[0].dps), 3)
+
+    def test_swap_one_player(self):
+        """Test that a player who leaves is replaced in their group, leaving the others alone"""
+        result = repairGroups(self.groups, added=[Mage("Mage9")], removed=[Mage("Mage1")])
+        self.assertEqual(result.changed, [0])
+        self.assertEqual(result.moves, 1)
+        self.assertIn(Mage("Mage9"), result.groups[0].dps)
+        self.assertIs(result.groups[1], self.groups[1])
+        self.assertIs(result.groups[2], self.groups[2])
+
+    def test_hole_filled_from_remainder(self):
+        """Test that a hole nobody new can fill is filled from the remainder group"""
+        result = repairGroups(self.groups, removed=[HealerDruid("Healer2")])
+        self.assertEqual(result.groups[1].healer, HealerPriest("Healer3"))
+        self.assertEqual(result.changed, [1, 2])
+        self.assertEqual(result.moves, 1)
+        self.assertIsNone(result.groups[2].healer)
+
+    def test_hole_filled_by_swap(self):
+        """Test that a hole only a complete group's player can fill is filled by swapping them for a donor"""
+        groups = [
+            WoWGroup(tank=TankWarrior("Tank1"), healer=HealerShaman("Healer1"),
+                     dps=[Mage("Mage1"), Rogue("Rogue1"), Paladin("Paladin1", offtank=True)]),
+            WoWGroup(tank=TankDeathKnight("Tank2"), healer=HealerPriest("Healer2"),
+                     dps=[Warlock("Warlock2"), Hunter("Hunter2"), Rogue("Rogue2")]),
+            WoWGroup(dps=[Mage("Mage3")]),
+        ]
+        result = repairGroups(groups, removed=[TankDeathKnight("Tank2")])
+        self.assertEqual(result.groups[1].tank, Paladin("Paladin1", offtank=True))
+        self.assertEqual(result.groups[0].dps, [Mage("Mage1"), Rogue("Rogue1"), Mage("Mage3")])
+        self.assertTrue(all(group.is_complete for group in result.groups))
+        self.assertEqual(result.changed, [0, 1])
+        self.assertEqual(result.moves, 2)
+        # The groups passed in are left alone
+        self.assertEqual(groups[0].dps[2], Paladin("Paladin1", offtank=True))
+
+    def test_swap_reseats_offspec(self):
+        """Test that a swap may move a complete group's player onto their offspec to make room for the donor"""
+        groups = [
+            WoWGroup(tank=TankWarrior("Tank1"), healer=HealerDruid("Healer1", offdps=True),
+                     dps=[Mage("Mage1"), Rogue("Rogue1"), Paladin("Paladin1", offtank=True)]),
+            WoWGroup(tank=TankDeathKnight("Tank2"), healer=HealerShaman("Healer2"),
+                     dps=[Warlock("Warlock2"), Hunter("Hunter2"), Rogue("Rogue2")]),
+            WoWGroup(healer=HealerPriest("Healer3")),
+        ]
+        result = repairGroups(groups, removed=[TankDeathKnight("Tank2")])
+        self.assertEqual(result.groups[1].tank, Paladin("Paladin1", offtank=True))
+        self.assertEqual(result.groups[0].healer, HealerPriest("Healer3"))
+        self.assertIn(HealerDruid("Healer1", offdps=True), result.groups[0].dps)
+        self.assertEqual(len(result.groups), 2)
+
+    def test_new_group_when_full(self):
+        """Test that players with no open seat start a new group"""
+        groups = self.groups[:2]
+        result = repairGroups(groups, added=[Mage("Mage9"), TankWarrior("Tank9")])
+        self.assertEqual(len(result.groups), 3)
+        self.assertEqual(result.changed, [2])
+        self.assertEqual(result.groups[2].tank, TankWarrior("Tank9"))
+        self.assertEqual(result.groups[2].dps, [Mage("Mage9")])
+
+    def test_empty_groups_dropped(self):
+        """Test that a group everyone left is dropped"""
+        result = repairGroups(self.groups, removed=[HealerPriest("Healer3"), Rogue("Rogue3")])
+        self.assertEqual(len(result.groups), 2)
+        self.assertEqual(result.changed, [])
+
+    def test_missing_players(self):
+        """Test that removing someone who isn't in a group is reported"""
+        result = repairGroups(self.groups, removed=[Mage("Nobody")])
+        self.assertEqual(result.missing, [Mage("Nobody")])
+        self.assertEqual(result.changed, [])
+
+    def test_engine_repair(self):
+        """Test that the engine repairs and remembers its last groups, reusing its index"""
+        engine = GroupEngine(lastGroups=self.groups)
+        result = engine.repair(added=[Mage("Mage9")], removed=[Mage("Mage1")])
+        self.assertEqual(engine.lastGroups, result.groups)
+        self.assertEqual(engine.version, 1)
+        index = engine._slots
+
+        result = engine.repair(removed=[Mage("Mage9")], added=[Mage("Mage1")])
+        self.assertIs(engine._slots, index)
+        self.assertIn(Mage("Mage1"), result.groups[0].dps)
+        self.assertEqual(sum(group.size for group in result.groups), 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
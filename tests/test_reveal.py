@@ -0,0 +1,250 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models import WoWGroup
+from reveal import (BATCH, SINGLE, TokenBucket, groupFrames, groupsPerMessage, pickFrames, planSteps, revealChanges,
+                    revealGroups)
+from prebuilt_classes import *
+
+
+def makeGroups(count):
+    return [WoWGroup(tank=TankWarrior(f"Tank{i}"), healer=HealerShaman(f"Healer{i}"),
+                     dps=[Mage(f"Mage{i}"), Rogue(f"Rogue{i}"), Warrior(f"Warrior{i}")])
+            for i in range(count)]
+
+
+# Records every call as a list of the frames each message showed
+class FakeChannel:
+    def __init__(self):
+        self.messages = []
+        self.calls = []
+
+    async def send(self, frames):
+        self.calls.append(time.monotonic())
+        self.messages.append([frames])
+        return len(self.messages) - 1
+
+    async def edit(self, message, frames):
+        self.calls.append(time.monotonic())
+        self.messages[message].append(frames)
+        return message
+
+
+class TestReveal(unittest.TestCase):
+    def test_group_frames(self):
+        """Test that a group is revealed one seat at a time"""
+        group = WoWGroup(tank=TankWarrior("Tank1"), healer=HealerShaman("Healer1"), dps=[Mage("Mage1")])
+        frames = groupFrames(group, 3)
+
+        self.assertEqual(len(frames), 7)
+        self.assertEqual(frames[0].title, "Group 3")
+        self.assertEqual([f.value for f in frames[0].fields], ["?????", "???????", "?????, ??????????, ??????????",
+                                                               "????", "???????"])
+        self.assertEqual(frames[1].fields[0].value, "Tank1")
+        self.assertEqual(frames[1].fields[1].value, "???????")
+        self.assertEqual(frames[3].fields[2].value, "Mage1, ??????????, ??????????")
+        self.assertEqual([f.value for f in frames[-1].fields], ["Tank1", "Healer1", "Mage1, :question:, :question:",
+                                                                "None", "Healer1"])
+
+    def test_pick_frames(self):
+        """Test that fewer steps keep the first and last frames"""
+        frames = list(range(7))
+        self.assertEqual(pickFrames(frames, 6), frames)
+        self.assertEqual(pickFrames(frames, 10), frames)
+        self.assertEqual(pickFrames(frames, 2), [0, 3, 6])
+        self.assertEqual(pickFrames(frames, 1), [0, 6])
+        self.assertEqual(pickFrames(frames, 0), [6])
+
+    def test_plan_steps(self):
+        """Test that more groups get fewer steps within the same budget"""
+        self.assertEqual(planSteps(1, 15, 6), 6)
+        self.assertEqual(planSteps(3, 15, 6), 4)
+        self.assertEqual(planSteps(6, 15, 6), 1)
+        self.assertEqual(planSteps(20, 15, 6), 0)
+        self.assertEqual(planSteps(0, 15, 6), 0)
+
+    def test_token_bucket(self):
+        """Test that the bucket allows a burst and then refills at its rate"""
+        now = [0.0]
+        bucket = TokenBucket(rate=2, capacity=4, clock=lambda: now[0])
+        self.assertEqual(bucket.budget(5), 14)
+
+        async def drain():
+            for _ in range(4):
+                await bucket.acquire()
+
+        asyncio.run(drain())
+        self.assertEqual(bucket.budget(0), 0)
+        now[0] = 1.0
+        self.assertEqual(bucket.budget(0), 2)
+        now[0] = 100.0
+        self.assertEqual(bucket.budget(0), 4)
+
+    def test_reveal_all_groups(self):
+        """Test that every group is sent in order and ends fully revealed"""
+        groups = makeGroups(3)
+        channel = FakeChannel()
+        limiter = TokenBucket(rate=1000, capacity=1000)
+        asyncio.run(revealGroups(groups, channel.send, channel.edit, limiter=limiter, totalTime=0.1))
+
+        self.assertEqual([steps[0][0].title for steps in channel.messages], ["Group 1", "Group 2", "Group 3"])
+        for number, (steps, group) in enumerate(zip(channel.messages, groups), 1):
+            self.assertEqual(steps, [[frame] for frame in groupFrames(group, number)])
+
+    def test_reveal_is_concurrent_and_bounded(self):
+        """Test that many groups stay within the rate limit and the time budget"""
+        groups = makeGroups(8)
+        channel = FakeChannel()
+        limiter = TokenBucket(rate=100, capacity=5)
+        start = time.monotonic()
+        asyncio.run(revealGroups(groups, channel.send, channel.edit, limiter=limiter, totalTime=0.3))
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 0.5)
+        # 5 + 100 * 0.3 = 35 calls: 8 sends and 3 edits for each group
+        self.assertEqual(len(channel.calls), 32)
+        self.assertTrue(all(len(steps) == 4 for steps in channel.messages))
+        # Never more calls in any window than the bucket allows
+        for n, call in enumerate(channel.calls):
+            inWindow = [c for c in channel.calls[n:] if c - call <= 0.05]
+            self.assertLessEqual(len(inWindow), 5 + 100 * 0.05 + 1)
+
+    def test_no_animation(self):
+        """Test that without the animation every group is sent revealed, once"""
+        groups = makeGroups(2)
+        channel = FakeChannel()
+        asyncio.run(revealGroups(groups, channel.send, channel.edit, animate=False))
+        self.assertEqual([len(steps) for steps in channel.messages], [1, 1])
+        self.assertEqual(channel.messages[1][0], [groupFrames(groups[1], 2)[-1]])
+
+    def test_batches(self):
+        """Test that batching packs up to 10 groups per message and animates them together"""
+        groups = makeGroups(12)
+        channel = FakeChannel()
+        limiter = TokenBucket(rate=1000, capacity=1000)
+        asyncio.run(revealGroups(groups, channel.send, channel.edit, limiter=limiter, totalTime=0.1,
+                                 batchSize=groupsPerMessage(BATCH)))
+
+        self.assertEqual(len(channel.messages), 2)
+        self.assertEqual(len(channel.calls), 14)
+        self.assertEqual([len(steps[0]) for steps in channel.messages], [10, 2])
+        for step in range(7):
+            self.assertEqual(channel.messages[1][step], [groupFrames(groups[10], 11)[step],
+                                                         groupFrames(groups[11], 12)[step]])
+
+    def test_batches_fit_in_the_rate_limit(self):
+        """Test that batching keeps the full animation where single messages can't"""
+        groups = makeGroups(10)
+        single, batched = FakeChannel(), FakeChannel()
+        asyncio.run(revealGroups(groups, single.send, single.edit, limiter=TokenBucket(rate=100, capacity=5),
+                                 totalTime=0.1))
+        asyncio.run(revealGroups(groups, batched.send, batched.edit, limiter=TokenBucket(rate=100, capacity=5),
+                                 totalTime=0.1, batchSize=groupsPerMessage(BATCH)))
+
+        self.assertEqual([len(steps) for steps in single.messages], [1] * 10)
+        self.assertEqual([len(steps) for steps in batched.messages], [7])
+
+    def test_stream(self):
+        """Test that a stream of groups is revealed as the groups come in"""
+        groups = makeGroups(3)
+        channel = FakeChannel()
+        sentBefore = []
+
+        async def stream():
+            for group in groups:
+                sentBefore.append(len(channel.messages))
+                yield group
+                await asyncio.sleep(0.01)
+
+        limiter = TokenBucket(rate=1000, capacity=1000)
+        asyncio.run(revealGroups(stream(), channel.send, channel.edit, limiter=limiter, totalTime=0.1, expected=3))
+        self.assertEqual(sentBefore, [0, 1, 2])
+        for number, (steps, group) in enumerate(zip(channel.messages, groups), 1):
+            self.assertEqual(steps, [[frame] for frame in groupFrames(group, number)])
+
+    def test_stream_batches(self):
+        """Test that a streamed batch is sent with its first group and edited to add the others"""
+        groups = makeGroups(3)
+        channel = FakeChannel()
+        sentBefore = []
+
+        async def stream():
+            for group in groups:
+                sentBefore.append(len(channel.messages))
+                yield group
+                await asyncio.sleep(0.01)
+
+        limiter = TokenBucket(rate=1000, capacity=1000)
+        asyncio.run(revealGroups(stream(), channel.send, channel.edit, limiter=limiter, totalTime=0.1, expected=3,
+                                 batchSize=groupsPerMessage(BATCH)))
+        self.assertEqual(sentBefore, [0, 1, 1])
+        self.assertEqual(len(channel.messages), 1)
+        steps = channel.messages[0]
+        self.assertEqual(steps[0], [groupFrames(groups[0], 1)[0]])
+        self.assertEqual(steps[-1], [groupFrames(group, number)[-1] for number, group in enumerate(groups, 1)])
+        self.assertIn(2, [len(frames) for frames in steps])
+
+    def test_stream_needs_expected(self):
+        """Test that a stream can't be revealed without knowing roughly how many groups to expect"""
+        async def stream():
+            yield makeGroups(1)[0]
+
+        with self.assertRaises(ValueError):
+            asyncio.run(revealGroups(stream(), FakeChannel().send, FakeChannel().edit))
+
+    def test_reveal_changes(self):
+        """Test that only the messages with a changed group are edited, animating just that group"""
+        groups = makeGroups(12)
+        channel = FakeChannel()
+        limiter = TokenBucket(rate=1000, capacity=1000)
+        batchSize = groupsPerMessage(BATCH)
+        messages = asyncio.run(revealGroups(groups, channel.send, channel.edit, limiter=limiter, totalTime=0.1,
+                                            batchSize=batchSize))
+        calls = len(channel.calls)
+
+        changed = list(groups)
+        changed[11] = makeGroups(13)[12]
+        messages = asyncio.run(revealChanges(changed, [11], messages, channel.send, channel.edit, limiter=limiter,
+                                             totalTime=0.1, batchSize=batchSize))
+        self.assertEqual(messages, [0, 1])
+        self.assertEqual(len(channel.calls) - calls, 7)
+        steps = channel.messages[1][7:]
+        final = groupFrames(groups[10], 11)[-1]
+        self.assertTrue(all(step[0] == final for step in steps))
+        self.assertEqual([step[1] for step in steps], groupFrames(changed[11], 12))
+
+    def test_reveal_changes_grow_and_shrink(self):
+        """Test that new groups get new messages and messages left without groups are deleted"""
+        groups = makeGroups(3)
+        channel = FakeChannel()
+        deleted = []
+
+        async def delete(message):
+            deleted.append(message)
+
+        limiter = TokenBucket(rate=1000, capacity=1000)
+        messages = asyncio.run(revealGroups(groups, channel.send, channel.edit, limiter=limiter, animate=False))
+        messages = asyncio.run(revealChanges(makeGroups(4), [3], messages, channel.send, channel.edit, limiter=limiter,
+                                             animate=False))
+        self.assertEqual(messages, [0, 1, 2, 3])
+        messages = asyncio.run(revealChanges(groups[:2], [], messages, channel.send, channel.edit, delete=delete,
+                                             limiter=limiter, animate=False))
+        self.assertEqual(messages, [0, 1])
+        self.assertEqual(deleted, [2, 3])
+
+    def test_output_modes(self):
+        """Test how many groups each output mode puts in a message"""
+        self.assertEqual(groupsPerMessage(SINGLE), 1)
+        self.assertEqual(groupsPerMessage(BATCH), 10)
+        with self.assertRaises(ValueError):
+            groupsPerMessage("carrier pigeon")
+
+
+if __name__ == "__main__":
+    unittest.main()
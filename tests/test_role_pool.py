@@ -0,0 +1,53 @@
+import os
+import sys
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models import DPS, HEALER, TANK
+from role_pool import RolePool, seatsFor
+from prebuilt_classes import *
+
+
+class TestRolePool(unittest.TestCase):
+    def setUp(self):
+        self.tank = TankPaladin("Tank1", offhealer=True)
+        self.offtank = Paladin("Offtank", offtank=True)
+        self.healer = HealerShaman("Healer1")
+        self.mage = Mage("Mage1")
+        self.druid = BalanceDruid("Boomkin", offhealer=True)
+        self.pool = RolePool([self.tank, self.offtank, self.healer, self.mage, self.druid])
+
+    def test_main_specs_before_offspecs(self):
+        """Test that role views list main specs before offspecs"""
+        self.assertEqual(list(self.pool.tanks), [self.tank, self.offtank])
+        self.assertEqual(list(self.pool.healers)[0], self.healer)
+        self.assertEqual(set(self.pool.off_healers), {self.tank, self.druid})
+
+    def test_seats_for(self):
+        """Test that main specs come before offspecs"""
+        self.assertEqual(seatsFor(self.mage), [(DPS, False)])
+        self.assertEqual(seatsFor(self.tank), [(TANK, False), (HEALER, True)])
+
+    def test_remove_from_every_pool(self):
+        """Test that removing a player takes them out of every pool they were in"""
+        self.pool.remove(self.druid)
+        self.assertNotIn(self.druid, self.pool.dps)
+        self.assertNotIn(self.druid, self.pool.healers)
+        self.assertNotIn(self.druid, self.pool.brez)
+        self.assertNotIn(self.druid, self.pool)
+        self.assertEqual(len(self.pool), 4)
+
+        # Removing twice is harmless
+        self.pool.remove(self.druid)
+        self.assertEqual(len(self.pool), 4)
+
+    def test_utility_pools(self):
+        """Test that utility pools track brez and lust players"""
+        self.assertEqual(set(self.pool.brez), {self.tank, self.offtank, self.druid})
+        self.assertEqual(set(self.pool.lust), {self.healer, self.mage})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import unittest
+from dataclasses import dataclass, field
+from typing import List
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models import WoWPlayer
+from roster_cache import RosterCache
+
+
+@dataclass
+class FakeMember:
+    id: int
+    name: str
+    roles: List[str] = field(default_factory=list)
+
+
+class TestRosterCache(unittest.TestCase):
+    def setUp(self):
+        self.made = 0
+        self.cache = RosterCache(makePlayer=self.makePlayer)
+        self.tank = FakeMember(1, "Tank1", ["Tank", "Brez"])
+        self.healer = FakeMember(2, "Healer1", ["Healer"])
+        self.nobody = FakeMember(3, "Lurker1")
+
+    def makePlayer(self, member):
+        self.made += 1
+        player = WoWPlayer.create(member.name, member.roles)
+        return player if player.hasRoles() else None
+
+    def test_load_skips_non_players(self):
+        """Test that a roster is built once from the members and skips anyone without roles"""
+        members = lambda: [self.tank, self.healer, self.nobody]
+        roster = self.cache.get("general", members)
+        self.assertEqual([p.name for p in roster.players], ["Tank1", "Healer1"])
+        self.assertEqual(self.made, 3)
+
+        self.assertIs(self.cache.get("general", members), roster)
+        self.assertIs(roster.players, roster.players)
+        self.assertEqual(self.made, 3)
+
+    def test_role_change_updates_player(self):
+        """Test that a change of roles rebuilds only that member and bumps the version"""
+        roster = self.cache.load("general", [self.tank, self.healer])
+        version = roster.version
+
+        self.tank.roles = ["Tank", "DPS Offspec"]
+        self.cache.memberUpdated(self.tank, lambda channelId: True)
+        self.assertEqual(self.made, 3)
+        self.assertGreater(roster.version, version)
+        self.assertTrue(roster.players[0].offdps)
+
+        # Nothing changed, so the version stays
+        version = roster.version
+        self.cache.memberUpdated(self.tank, lambda channelId: True)
+        self.assertEqual(roster.version, version)
+
+    def test_losing_roles_or_access_removes_player(self):
+        """Test that a member leaves the roster when they lose their roles or the channel"""
+        roster = self.cache.load("general", [self.tank, self.healer])
+        self.tank.roles = []
+        self.cache.memberUpdated(self.tank, lambda channelId: True)
+        self.cache.memberUpdated(self.healer, lambda channelId: False)
+        self.assertEqual(roster.players, [])
+
+    def test_voice_moves(self):
+        """Test that moving between voice channels moves the player between tracked rosters"""
+        lobby = self.cache.load("lobby", [self.tank, self.healer])
+        keys = self.cache.load("keys", [])
+
+        self.cache.memberMoved(self.tank, "lobby", "keys")
+        self.cache.memberMoved(self.healer, "lobby", "untracked")
+        self.assertEqual(lobby.players, [])
+        self.assertEqual([p.name for p in keys.players], ["Tank1"])
+        self.assertNotIn("untracked", self.cache)
+
+        self.cache.memberMoved(self.tank, "keys", None)
+        self.assertEqual(len(keys), 0)
+
+    def test_member_removed_and_forget(self):
+        """Test that removed members leave every roster and forgotten channels are reloaded"""
+        general = self.cache.load("general", [self.tank, self.healer])
+        lobby = self.cache.load("lobby", [self.tank])
+        self.cache.memberRemoved(self.tank)
+        self.assertEqual([p.name for p in general.players], ["Healer1"])
+        self.assertEqual(lobby.players, [])
+
+        self.cache.forget("general")
+        reloaded = self.cache.get("general", lambda: [self.tank])
+        self.assertIsNot(reloaded, general)
+        self.assertEqual([p.name for p in reloaded.players], ["Tank1"])
+
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
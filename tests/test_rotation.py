@@ -0,0 +1,120 @@
+import asyncio
+import os
+import random
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from engine import GroupEngine, buildGroups
+from models import WoWGroup
+from rotation import MAX_ROUNDS, PlanState, planOffloaded, planRotation, rotateRound
+from prebuilt_classes import *
+
+
+def countRepeats(rounds):
+    seen = {}
+    for groups in rounds:
+        for group in groups:
+            members = sorted(p.name for p in group.players)
+            for n, name in enumerate(members):
+                for other in members[:n]:
+                    seen[(other, name)] = seen.get((other, name), 0) + 1
+    return sum(count - 1 for count in seen.values() if count > 1)
+
+
+class TestRotation(unittest.TestCase):
+    def setUp(self):
+        self.players = [
+            TankDeathKnight("Tank1"), TankWarrior("Tank2"), TankDemonHunter("Tank3"),
+            HealerShaman("Healer1"), HealerDruid("Healer2"), HealerPriest("Healer3"),
+            Mage("Mage1"), Mage("Mage2"), Shaman("Shaman1"), Warlock("Warlock1"), Warlock("Warlock2"),
+            Rogue("Rogue1"), Rogue("Rogue2"), BalanceDruid("Druid1"), Paladin("Paladin1"),
+        ]
+        # One main tank, so one of the two warriors has to offtank every round
+        self.offtankers = [
+            TankDeathKnight("Tank1"), HealerShaman("Healer1"), HealerShaman("Healer2"),
+            Warrior("Off1", offtank=True), Warrior("Off2", offtank=True), BalanceDruid("Druid1"),
+            Mage("Mage1"), Mage("Mage2"), Rogue("Rogue1"), Rogue("Rogue2"),
+        ]
+
+    def test_plans_every_round(self):
+        """Test that every round seats every player exactly once"""
+        rotation = planRotation(self.players, 3, rng=random.Random(1))
+        self.assertEqual(len(rotation), 3)
+        for groups in rotation.rounds:
+            seated = [p.name for group in groups for p in group.players]
+            self.assertCountEqual(seated, [p.name for p in self.players])
+
+    def test_next(self):
+        """Test that next hands out the rounds in order, then None"""
+        rotation = planRotation(self.players, 2, rng=random.Random(1))
+        self.assertIs(rotation.next(), rotation.rounds[0])
+        self.assertEqual(rotation.remaining, 1)
+        self.assertIs(rotation.next(), rotation.rounds[1])
+        self.assertIsNone(rotation.next())
+
+    def test_fewer_repeats_than_chained_wheels(self):
+        """Test that planning the night repeats fewer pairs than running a wheel per round"""
+        rotation = planRotation(self.players, 4, rng=random.Random(3))
+        rng = random.Random(3)
+        chained, last = [], []
+        for _ in range(4):
+            last = buildGroups(self.players, last, rng=rng)
+            chained.append(last)
+        self.assertEqual(rotation.repeats, countRepeats(rotation.rounds))
+        self.assertLessEqual(rotation.repeats, countRepeats(chained))
+
+    def test_keeps_utilities(self):
+        """Test that every full group keeps battle res and bloodlust after the swaps"""
+        rotation = planRotation(self.players, 4, rng=random.Random(5))
+        for groups in rotation.rounds:
+            for group in groups:
+                if group.is_complete:
+                    self.assertTrue(group.has_brez and group.has_lust)
+
+    def test_offspec_rotates(self):
+        """Test that offtanking is handed to a different player each round"""
+        rotation = planRotation(self.offtankers, 2, rng=random.Random(2))
+        offtanks = [[group.tank.name for group in groups if not group.tank.tankMain]
+                    for groups in rotation.rounds]
+        self.assertEqual(len(offtanks[0]), 1)
+        self.assertEqual(len(offtanks[1]), 1)
+        self.assertNotEqual(offtanks[0], offtanks[1])
+
+    def test_rotate_round(self):
+        """Test that the player who already offtanked swaps the seat with one who hasn't"""
+        groups = [
+            WoWGroup(tank=TankDeathKnight("Tank1"), healer=HealerShaman("Healer1"),
+                     dps=[Warrior("Off2", offtank=True), Mage("Mage1"), Rogue("Rogue1")]),
+            WoWGroup(tank=Warrior("Off1", offtank=True), healer=HealerShaman("Healer2"),
+                     dps=[BalanceDruid("Druid1"), Mage("Mage2"), Rogue("Rogue2")]),
+        ]
+        state = PlanState(duties={Warrior("Off1", offtank=True): 1})
+        rotated = rotateRound(groups, state, rng=random.Random(0))
+        self.assertEqual(rotated[1].tank.name, "Off2")
+        self.assertTrue(rotated[1].has_brez)
+        # The groups passed in are left alone
+        self.assertEqual(groups[1].tank.name, "Off1")
+
+    def test_rounds_out_of_range(self):
+        """Test that planning no rounds or too many is refused"""
+        with self.assertRaises(ValueError):
+            planRotation(self.players, 0)
+        with self.assertRaises(ValueError):
+            planRotation(self.players, MAX_ROUNDS + 1)
+
+    def test_plan_offloaded(self):
+        """Test that planning in an executor leaves the engine alone"""
+        engine = GroupEngine(seed=4)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            rotation = asyncio.run(planOffloaded(engine, self.players, 3, executor))
+        self.assertEqual(len(rotation), 3)
+        self.assertEqual(engine.version, 0)
+        self.assertEqual(engine.lastGroups, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
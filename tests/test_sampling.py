@@ -0,0 +1,69 @@
+import os
+import sys
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import parallel_group_creator
+from parallel_group_creator import clear
+from sampling import sample_mythic_plus_groups
+from prebuilt_classes import *
+
+
+class TestSampling(unittest.TestCase):
+    def setUp(self):
+        clear()
+        self.players = [
+            TankWarrior("Tank1"),
+            TankDeathKnight("Brez1"),
+            TankMonk("Tank3"),
+            HealerDruid("Brez2"),
+            HealerPriest("Healer2"),
+            HealerShaman("Healer3"),
+            Mage("Lust1"),
+            Mage("Lust2"),
+            Warrior("Warrior1"),
+            Warrior("Warrior2"),
+            FeralDruid("Feral1"),
+            FeralDruid("Feral2"),
+            Rogue("Rogue1"),
+            Warlock("Warlock1"),
+            Hunter("Hunter1"),
+        ]
+
+    def tearDown(self):
+        clear()
+
+    def test_keeps_best_sample(self):
+        """Test that the best scoring sample is returned along with every score"""
+        result = sample_mythic_plus_groups(self.players, samples=8, workers=0, seed=42)
+
+        self.assertEqual(len(result.scores), 8)
+        self.assertEqual(result.score, max(result.scores))
+        self.assertGreaterEqual(result.score, result.mean)
+        self.assertGreaterEqual(result.mean, result.worst)
+        self.assertEqual(sum(group.size for group in result.groups), len(self.players))
+        self.assertEqual(parallel_group_creator.defaultEngine.lastGroups, result.groups)
+
+    def test_seeded_runs_repeat(self):
+        """Test that the same seed gives the same samples"""
+        first = sample_mythic_plus_groups(self.players, samples=4, workers=0, seed=7)
+        clear()
+        second = sample_mythic_plus_groups(self.players, samples=4, workers=0, seed=7)
+
+        self.assertEqual(first.scores, second.scores)
+        self.assertEqual(first.seed, second.seed)
+
+    def test_process_pool(self):
+        """Test that samples can run in worker processes"""
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            result = sample_mythic_plus_groups(self.players, samples=4, executor=executor, seed=3)
+
+        self.assertEqual(len(result.scores), 4)
+        self.assertEqual(sum(group.size for group in result.groups), len(self.players))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from coplay_index import CoPlayIndex
+from models import WoWGroup
+from pairing_history import PairingHistory
+import scoring
+from scoring import GroupingScore, groupingScore, scoreGroupings
+from prebuilt_classes import *
+
+
+def fullGroup(suffix: str) -> WoWGroup:
+    return WoWGroup(tank=TankWarrior(f"Tank{suffix}"), healer=HealerShaman(f"Healer{suffix}"),
+                    dps=[DeathKnight(f"Brez{suffix}"), Rogue(f"Rogue{suffix}"), Warrior(f"Warrior{suffix}")])
+
+
+class TestScoring(unittest.TestCase):
+    def test_breakdown(self):
+        """Test that every part of the score is counted per group"""
+        groups = [
+            fullGroup("1"),
+            WoWGroup(tank=Paladin("Offtank", offtank=True), healer=None, dps=[Mage("Lust"), Rogue("Rogue")]),
+        ]
+        score = scoreGroupings([groups])[0]
+
+        self.assertEqual(score, GroupingScore(groups=2, complete=1, brez=2, lust=2, ranged=1, offspec=1,
+                                              novelty=0.0, total=groupingScore(groups)))
+
+    def test_novelty(self):
+        """Test that pairs from the last wheel and the pairing history are both counted"""
+        group = fullGroup("1")
+        history = PairingHistory()
+        history.recordSession([WoWGroup(tank=group.tank, healer=group.healer, dps=[])])
+        coplay = CoPlayIndex([WoWGroup(tank=None, healer=None, dps=group.dps[:2])])
+
+        score = scoreGroupings([[group]], coplay=coplay, history=history)[0]
+        self.assertAlmostEqual(score.novelty, 2.0)
+        self.assertAlmostEqual(score.total, groupingScore([group], coplay=coplay, history=history))
+
+    def test_batch_matches_single_scores(self):
+        """Test that scoring a batch gives the same totals as scoring each grouping alone"""
+        groupings = [[fullGroup(f"{n}-{m}") for m in range(n)] for n in range(5)]
+        coplay = CoPlayIndex(groupings[2])
+        scores = scoreGroupings(groupings, coplay=coplay)
+
+        self.assertEqual(len(scores), len(groupings))
+        for groups, score in zip(groupings, scores):
+            self.assertEqual(score.groups, len(groups))
+            self.assertAlmostEqual(score.total, groupingScore(groups, coplay=coplay))
+
+    @unittest.skipIf(scoring.np is None, "numpy is not installed")
+    def test_numpy_matches_python(self):
+        """Test that the vectorized path gives the same breakdown as the plain one"""
+        groupings = [[fullGroup(f"{n}-{m}") for m in range(20)] for n in range(5)]
+        groupings.append([WoWGroup(tank=None, healer=HealerPriest("Lonely"), dps=[Mage("Lust")])] * 70)
+        coplay = CoPlayIndex(groupings[0][:3])
+        vectorized = scoreGroupings(groupings, coplay=coplay)
+
+        minGroups = scoring.NUMPY_MIN_GROUPS
+        scoring.NUMPY_MIN_GROUPS = 10 ** 9
+        try:
+            plain = scoreGroupings(groupings, coplay=coplay)
+        finally:
+            scoring.NUMPY_MIN_GROUPS = minGroups
+        for a, b in zip(vectorized, plain):
+            self.assertEqual((a.groups, a.complete, a.brez, a.lust, a.ranged, a.offspec),
+                             (b.groups, b.complete, b.brez, b.lust, b.ranged, b.offspec))
+            self.assertAlmostEqual(a.novelty, b.novelty)
+            self.assertAlmostEqual(a.total, b.total)
+
+
+if __name__ == "__main__":
+    unittest.main()
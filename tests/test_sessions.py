@@ -0,0 +1,123 @@
+import asyncio
+import os
+import sys
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from engine import GroupEngine
+from sessions import PLAYER_BYTES, SESSION_BYTES, SessionManager
+from prebuilt_classes import *
+
+players = [
+    TankWarrior("Tank1"),
+    HealerShaman("Healer1"),
+    Mage("Mage1"),
+    Rogue("Rogue1"),
+    Warlock("Warlock1"),
+]
+
+
+class TestSessions(unittest.TestCase):
+    def test_sessions_are_separate(self):
+        """Test that every guild and channel gets its own session and engine"""
+        manager = SessionManager()
+        first = manager.get(1, 10)
+        self.assertIs(manager.get(1, 10), first)
+        other = manager.get(1, 11)
+        self.assertIsNot(other, first)
+        self.assertIsNot(other.engine, first.engine)
+
+        first.players = players
+        first.engine.create(players)
+        self.assertEqual(other.players, [])
+        self.assertEqual(other.groups, [])
+        self.assertIsNot(manager.get(2, 10), first)
+        self.assertEqual(len(manager), 3)
+
+    def test_engine_factory_gets_guild(self):
+        """Test that new engines are built for the session's guild"""
+        guilds = []
+        manager = SessionManager(engineFactory=lambda guildId: guilds.append(guildId) or GroupEngine())
+        manager.get(1, 10)
+        manager.get(1, 11)
+        manager.get(2, 10)
+        manager.get(1, 10)
+        self.assertEqual(guilds, [1, 1, 2])
+
+    def test_lru_eviction(self):
+        """Test that the least recently used sessions are dropped beyond the limit"""
+        manager = SessionManager(maxSessions=2)
+        manager.get(1, 1)
+        manager.get(1, 2)
+        manager.get(1, 1)
+        manager.get(1, 3)
+        self.assertIn((1, 1), manager)
+        self.assertNotIn((1, 2), manager)
+        self.assertIn((1, 3), manager)
+        self.assertIsNone(manager.peek(1, 2))
+
+    def test_dropping_cancels_rotation(self):
+        """Test that evicted and removed sessions stop planning their rounds"""
+        manager = SessionManager(maxSessions=1)
+
+        async def main():
+            evicted = manager.get(1, 1)
+            evicted.rotation = first = asyncio.create_task(asyncio.sleep(10))
+            manager.get(1, 2)
+            self.assertNotIn((1, 1), manager)
+            manager.get(1, 2).rotation = second = asyncio.create_task(asyncio.sleep(10))
+            manager.remove(1, 2)
+            await asyncio.sleep(0)
+            return first, second
+
+        first, second = asyncio.run(main())
+        self.assertTrue(first.cancelled())
+        self.assertTrue(second.cancelled())
+
+    def test_memory_cap(self):
+        """Test that sessions are dropped once their estimated memory goes over the cap"""
+        manager = SessionManager(maxBytes=2 * SESSION_BYTES + 5 * PLAYER_BYTES)
+        manager.get(1, 1).players = players
+        manager.get(1, 2)
+        self.assertEqual(len(manager), 2)
+        manager.get(1, 3).players = players
+        manager.get(1, 4)
+        self.assertNotIn((1, 1), manager)
+        self.assertLessEqual(manager.totalBytes(), manager.maxBytes)
+
+    def test_busy_sessions_are_kept(self):
+        """Test that commands on one channel run one at a time and their session is never dropped"""
+        manager = SessionManager(maxSessions=1)
+        order = []
+        seen = []
+
+        async def command(name, delay):
+            async with manager.acquire(1, 1) as session:
+                seen.append(session)
+                order.append(f"{name} start")
+                await asyncio.sleep(delay)
+                session.players = [name]
+                order.append(f"{name} end")
+
+        async def main():
+            first = asyncio.create_task(command("first", 0.02))
+            second = asyncio.create_task(command("second", 0))
+            await asyncio.sleep(0.005)
+            # Plenty of other channels come and go while the commands run
+            for channel in range(2, 6):
+                manager.get(1, channel)
+            self.assertIn((1, 1), manager)
+            await asyncio.gather(first, second)
+
+        asyncio.run(main())
+        self.assertEqual(order, ["first start", "first end", "second start", "second end"])
+        # Both commands worked on the same session, and once idle it could be dropped
+        self.assertIs(seen[0], seen[1])
+        self.assertEqual(seen[1].players, ["second"])
+        self.assertNotIn((1, 1), manager)
+
+
+if __name__ == "__main__":
+    unittest.main()
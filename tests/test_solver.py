@@ -0,0 +1,133 @@
+import os
+import random
+import sys
+import unittest
+from itertools import permutations
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from coplay_index import CoPlayIndex
+from models import SEATS, WoWGroup
+from pairing_history import PairingHistory
+from parallel_group_creator import GREEDY, OPTIMAL, clear, create_mythic_plus_groups
+from scoring import groupingScore
+from solver import getSeat, optimizeGroups, solveAssignment, withSeat
+from prebuilt_classes import *
+
+
+class TestSolver(unittest.TestCase):
+    def setUp(self):
+        clear()
+
+    def tearDown(self):
+        clear()
+
+    def test_solve_assignment(self):
+        """Test that the assignment solver finds the cheapest matching"""
+        cost = [
+            [4, 1, 3],
+            [2, 0, 5],
+            [3, 2, 2],
+        ]
+        self.assertEqual(solveAssignment(cost), [1, 0, 2])
+        self.assertEqual(solveAssignment([[5, 1, 9]]), [1])
+        self.assertEqual(solveAssignment([]), [])
+
+    def test_solve_assignment_matches_brute_force(self):
+        """Test that the assignment solver finds the cheapest matching with ties and more columns than rows"""
+        rng = random.Random(7)
+        for _ in range(200):
+            rows = rng.randint(1, 5)
+            columns = rng.randint(rows, 6)
+            cost = [[rng.choice((0, 1, 1, 2, 5)) + rng.choice((0, 0.5)) for _ in range(columns)] for _ in range(rows)]
+            best = min(sum(cost[i][j] for i, j in enumerate(picked)) for picked in permutations(range(columns), rows))
+            assignment = solveAssignment(cost)
+            self.assertEqual(len(set(assignment)), rows)
+            self.assertAlmostEqual(sum(cost[i][j] for i, j in enumerate(assignment)), best)
+
+    def test_no_seat_can_be_reassigned(self):
+        """Test that the optimized groups can't be improved by reassigning any one seat, history included"""
+        rng = random.Random(3)
+        makers = [
+            (TankWarrior, TankDeathKnight, TankMonk, TankDruid),
+            (HealerShaman, HealerPriest, HealerDruid, HealerPaladin),
+            (Mage, Rogue, DeathKnight, Hunter, Warrior, FeralDruid, Warlock, Priest, Shaman, Monk, Evoker, Paladin),
+        ]
+        for _ in range(10):
+            players = [rng.choice(makers[0])(f"Tank{n}") for n in range(4)] + \
+                [rng.choice(makers[1])(f"Healer{n}") for n in range(4)] + \
+                [rng.choice(makers[2])(f"Dps{n}") for n in range(12)]
+            groups = [WoWGroup(tank=players[n], healer=players[4 + n], dps=players[8 + 3 * n:11 + 3 * n])
+                      for n in range(4)]
+            history = PairingHistory()
+            for _ in range(2):
+                shuffled = rng.sample(players, len(players))
+                history.recordSession([WoWGroup(tank=shuffled[n], dps=shuffled[5 * n + 1:5 * n + 5]) for n in range(4)])
+            last = rng.sample(players, len(players))
+            coplay = CoPlayIndex([WoWGroup(dps=last[5 * n:5 * n + 5]) for n in range(4)])
+
+            optimized = optimizeGroups(groups, coplay=coplay, history=history)
+            score = groupingScore(optimized, coplay=coplay, history=history)
+            self.assertGreaterEqual(score, groupingScore(groups, coplay=coplay, history=history))
+            for seat in SEATS:
+                seated = [getSeat(group, seat) for group in optimized]
+                for order in permutations(seated):
+                    moved = [withSeat(group, seat, player) for group, player in zip(optimized, order)]
+                    self.assertLessEqual(groupingScore(moved, coplay=coplay, history=history), score + 1e-9)
+
+    def test_swap_fixes_brez(self):
+        """Test that two brez in one group get split up when another group has none"""
+        groups = [
+            WoWGroup(tank=TankWarrior("Tank1"), healer=HealerShaman("Healer1"),
+                     dps=[DeathKnight("Brez1"), FeralDruid("Brez2"), Rogue("Rogue1")]),
+            WoWGroup(tank=TankMonk("Tank2"), healer=HealerPriest("Healer2"),
+                     dps=[Mage("Lust1"), Rogue("Rogue2"), Rogue("Rogue3")]),
+        ]
+        optimized = optimizeGroups(groups)
+
+        self.assertEqual(len(optimized), 2)
+        for group in optimized:
+            self.assertTrue(group.has_brez and group.has_lust, f"group {group} should have both brez and lust")
+        self.assertGreater(groupingScore(optimized), groupingScore(groups))
+        self.assertEqual(
+            sorted(p.name for g in optimized for p in g.players),
+            sorted(p.name for g in groups for p in g.players),
+        )
+
+    def test_optimal_mode(self):
+        """Test that the optimal mode keeps every player and never scores worse than the greedy groups"""
+        players = [
+            TankWarrior("Tank1"),
+            TankDeathKnight("Brez1"),
+            HealerDruid("Brez2"),
+            HealerPriest("Healer2"),
+            Mage("Lust1"),
+            Mage("Lust2"),
+            Warrior("Warrior1"),
+            Warrior("Warrior2"),
+            FeralDruid("Feral1"),
+            FeralDruid("Feral2"),
+            Rogue("Rogue1"),
+        ]
+        for seed in range(10):
+            # The same seed gives the optimizer the same greedy groups to start from
+            clear()
+            greedy = create_mythic_plus_groups(players, debug=False, mode=GREEDY, rng=random.Random(seed))
+            clear()
+            groups = create_mythic_plus_groups(players, debug=False, mode=OPTIMAL, rng=random.Random(seed))
+
+            self.assertEqual(sum(group.size for group in groups), len(players))
+            for group in groups[:2]:
+                self.assertTrue(group.is_complete)
+                self.assertTrue(group.has_brez and group.has_lust, f"group {group} should have both brez and lust")
+            self.assertGreaterEqual(groupingScore(groups), groupingScore(greedy))
+
+    def test_unknown_mode(self):
+        """Test that an unknown mode is rejected"""
+        with self.assertRaises(ValueError):
+            create_mythic_plus_groups([], debug=False, mode="fastest")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import group_creator
+from parallel_group_creator import clear, create_mythic_plus_groups
+from tracing import DEBUG, INFO, OFF, WARNING, Tracer, parseLevel
+from prebuilt_classes import *
+
+players = [
+    TankWarrior("Tank1"),
+    TankPaladin("Tank2"),
+    HealerShaman("Healer1"),
+    HealerDruid("Healer2"),
+    Mage("Mage1"),
+    Rogue("Rogue1"),
+    Warlock("Warlock1"),
+    DeathKnight("DeathKnight1"),
+    Hunter("Hunter1"),
+    Priest("Priest1"),
+    Warrior("Warrior1"),
+]
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        clear()
+
+    def tearDown(self):
+        clear()
+
+    def test_lazy_messages(self):
+        """Test that messages below the level are never built"""
+        def explode():
+            raise AssertionError("message was built")
+
+        tracer = Tracer(level=INFO)
+        tracer.debug('ignored', explode)
+        self.assertEqual(len(tracer), 0)
+
+        tracer.info('kept', lambda: "built", count=3)
+        event = tracer.events()[0]
+        self.assertEqual((event.level, event.kind, event.message, event.fields), (INFO, 'kept', "built", {'count': 3}))
+
+        Tracer().warning('off', explode)
+
+    def test_ring_buffer(self):
+        """Test that only the newest events are kept and can be filtered by kind"""
+        tracer = Tracer(level=DEBUG, capacity=3)
+        for n in range(5):
+            tracer.debug('even' if n % 2 == 0 else 'odd', n=n)
+        self.assertEqual([e.fields['n'] for e in tracer.events()], [2, 3, 4])
+        self.assertEqual([e.fields['n'] for e in tracer.events('even')], [2, 4])
+        tracer.clear()
+        self.assertEqual(tracer.events(), [])
+
+    def test_parse_level(self):
+        """Test that levels can be given by name or number"""
+        self.assertEqual(parseLevel('debug'), DEBUG)
+        self.assertEqual(parseLevel(' Warning '), WARNING)
+        self.assertEqual(parseLevel('OFF'), OFF)
+        self.assertEqual(parseLevel('15'), 15)
+
+    def test_group_creator_events(self):
+        """Test that the group creators record their decisions without printing"""
+        tracer = Tracer(level=DEBUG)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            groups = create_mythic_plus_groups(players, tracer=tracer)
+            group_creator.create_mythic_plus_groups(players, tracer=tracer)
+        self.assertEqual(output.getvalue(), "")
+
+        self.assertEqual(len(tracer.events('pool_built')), 2)
+        picked = [e.fields['player'] for e in tracer.events('player_picked') if not e.fields.get('remainder')]
+        self.assertEqual(len(picked), sum(g.size for g in groups if g.is_complete))
+        self.assertTrue(tracer.events('remainder_formed'))
+
+    def test_debug_prints(self):
+        """Test that debug mode still prints what the group creator does"""
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            create_mythic_plus_groups(players, debug=True)
+        self.assertIn("Selected tank", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
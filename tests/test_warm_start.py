@@ -0,0 +1,144 @@
+import asyncio
+import os
+import sys
+import unittest
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from engine import GroupEngine
+from offload import OffloadResult
+from pairing_history import PairingHistory
+from roster_cache import ChannelRoster
+from tracing import INFO, Tracer
+from warm_start import WarmStarter
+from prebuilt_classes import *
+
+players = [
+    TankWarrior("Tank1"),
+    HealerDruid("Healer1"),
+    Mage("Mage1"),
+    Warrior("Warrior1"),
+    FeralDruid("Feral1"),
+]
+
+KEY = ("guild", "voice")
+
+
+class TestWarmStart(unittest.TestCase):
+    def setUp(self):
+        self.solves = []
+        self.tracer = Tracer(level=INFO)
+        self.engine = GroupEngine(history=PairingHistory(), seed=1)
+        self.roster = ChannelRoster("voice")
+        for n, player in enumerate(players):
+            self.roster.put(n, player)
+        self.warm = WarmStarter(solve=self.solve, debounce=0.01, tracer=self.tracer)
+
+    async def solve(self, engine, players):
+        self.solves.append(list(players))
+        await asyncio.sleep(0.01)
+        return OffloadResult(groups=engine.solve(players))
+
+    def test_precomputed_groups_are_used(self):
+        """Test that a settled roster's groups are ready for the wheel"""
+        async def main():
+            self.warm.schedule(KEY, self.engine, self.roster)
+            await asyncio.sleep(0.1)
+            return self.warm.take(KEY, self.engine, self.roster)
+
+        result = asyncio.run(main())
+        self.assertIsNotNone(result)
+        self.assertEqual(sum(group.size for group in result.groups), len(players))
+        self.assertEqual(len(self.solves), 1)
+        self.assertTrue(self.tracer.events('warm_hit'))
+        # A candidate is only used once
+        self.assertIsNone(self.warm.take(KEY, self.engine, self.roster))
+
+    def test_debounce(self):
+        """Test that a burst of roster changes is solved once, with the final roster"""
+        async def main():
+            for n in range(5):
+                self.roster.put(100 + n, Rogue(f"Rogue{n}"))
+                self.warm.schedule(KEY, self.engine, self.roster)
+                await asyncio.sleep(0.002)
+            await asyncio.sleep(0.1)
+
+        asyncio.run(main())
+        self.assertEqual(len(self.solves), 1)
+        self.assertEqual(len(self.solves[0]), len(players) + 5)
+        self.assertIsNotNone(self.warm.candidate(KEY))
+
+    def test_roster_change_invalidates(self):
+        """Test that a roster change after precomputing makes the candidate stale"""
+        async def main():
+            self.warm.schedule(KEY, self.engine, self.roster)
+            await asyncio.sleep(0.1)
+            self.roster.remove(0)
+            return self.warm.take(KEY, self.engine, self.roster)
+
+        self.assertIsNone(asyncio.run(main()))
+        self.assertTrue(self.tracer.events('warm_stale'))
+
+    def test_wheel_invalidates(self):
+        """Test that groups precomputed before another wheel are stale"""
+        async def main():
+            self.warm.schedule(KEY, self.engine, self.roster)
+            await asyncio.sleep(0.1)
+            self.engine.commit(self.engine.solve(players))
+            return self.warm.take(KEY, self.engine, self.roster)
+
+        self.assertIsNone(asyncio.run(main()))
+
+    def test_change_while_solving(self):
+        """Test that groups whose roster changed while they were solved are thrown away"""
+        async def main():
+            self.warm.schedule(KEY, self.engine, self.roster)
+            await asyncio.sleep(0.015)
+            self.roster.remove(0)
+            await asyncio.sleep(0.1)
+
+        asyncio.run(main())
+        self.assertEqual(len(self.solves), 1)
+        self.assertIsNone(self.warm.candidate(KEY))
+
+    def test_take_cancels_pending(self):
+        """Test that the wheel stops a precompute that hasn't finished"""
+        async def main():
+            self.warm.schedule(KEY, self.engine, self.roster)
+            self.assertTrue(self.warm.pending(KEY))
+            self.assertIsNone(self.warm.take(KEY, self.engine, self.roster))
+            await asyncio.sleep(0.1)
+            self.assertFalse(self.warm.pending(KEY))
+
+        asyncio.run(main())
+        self.assertEqual(self.solves, [])
+
+    def test_fallback_not_kept(self):
+        """Test that greedy fallback groups aren't kept as a candidate"""
+        async def solve(engine, players):
+            return OffloadResult(groups=engine.solve(players), fallback=True)
+
+        async def main():
+            warm = WarmStarter(solve=solve, debounce=0, tracer=self.tracer)
+            warm.schedule(KEY, self.engine, self.roster)
+            await asyncio.sleep(0.05)
+            return warm
+
+        self.assertEqual(len(asyncio.run(main())), 0)
+        self.assertTrue(self.tracer.events('warm_fallback'))
+
+    def test_close(self):
+        """Test that closing stops every precompute"""
+        async def main():
+            self.warm.schedule(KEY, self.engine, self.roster)
+            self.warm.schedule(("guild", "other"), self.engine, self.roster)
+            await self.warm.close()
+            self.assertFalse(self.warm.pending(KEY))
+
+        asyncio.run(main())
+        self.assertEqual(self.solves, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
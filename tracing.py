@@ -0,0 +1,98 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, List, Optional, Union
+import time
+
+# Trace levels, the same numbers the logging module uses
+DEBUG = 10
+INFO = 20
+WARNING = 30
+OFF = 100
+
+LEVEL_NAMES = {'DEBUG': DEBUG, 'INFO': INFO, 'WARNING': WARNING, 'OFF': OFF}
+
+# How many events a tracer keeps before dropping the oldest
+DEFAULT_CAPACITY = 1024
+
+# A message, or a function that builds it. Functions are only called when the
+# event is actually recorded, so expensive reprs cost nothing while tracing is off.
+Message = Union[str, Callable[[], str], None]
+
+
+@dataclass
+class TraceEvent:
+    time: float
+    level: int
+    # What happened, like 'pool_built' or 'player_picked'
+    kind: str
+    message: str = ''
+    # Anything else about the event, like the player that got picked
+    fields: dict = field(default_factory=dict)
+
+    def __str__(self) -> str:
+        return self.message or f"{self.kind} {self.fields}"
+
+
+# Records structured events about the decisions the group creators make.
+#
+# Events below the tracer's level are dropped before their message is built,
+# so a disabled trace is one comparison. Recorded events go into a bounded
+# ring buffer, so tracing can stay on in production without growing memory or
+# flooding stdout. With echo on every recorded event is also printed, which
+# is what the debug commands use.
+class Tracer:
+    def __init__(self, level: int = OFF, capacity: int = DEFAULT_CAPACITY, echo: bool = False):
+        self.level = level
+        self.echo = echo
+        self._events: Deque[TraceEvent] = deque(maxlen=capacity)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def enabledFor(self, level: int) -> bool:
+        return level >= self.level
+
+    def event(self, level: int, kind: str, message: Message = None, **fields):
+        if level < self.level:
+            return
+        if callable(message):
+            message = message()
+        event = TraceEvent(time=time.time(), level=level, kind=kind, message=message or '', fields=fields)
+        self._events.append(event)
+        if self.echo:
+            print(event)
+
+    def debug(self, kind: str, message: Message = None, **fields):
+        if DEBUG >= self.level:
+            self.event(DEBUG, kind, message, **fields)
+
+    def info(self, kind: str, message: Message = None, **fields):
+        if INFO >= self.level:
+            self.event(INFO, kind, message, **fields)
+
+    def warning(self, kind: str, message: Message = None, **fields):
+        if WARNING >= self.level:
+            self.event(WARNING, kind, message, **fields)
+
+    # The recorded events, oldest first, optionally only those of one kind
+    def events(self, kind: Optional[str] = None) -> List[TraceEvent]:
+        return [e for e in self._events if kind is None or e.kind == kind]
+
+    def clear(self):
+        self._events.clear()
+
+
+# Parses a level name like 'debug' or a number
+def parseLevel(level: str) -> int:
+    name = level.strip().upper()
+    return LEVEL_NAMES[name] if name in LEVEL_NAMES else int(name)
+
+
+# The tracer the group creators use when they aren't given one. Off until
+# something, like the bot, turns it on.
+defaultTracer = Tracer()
+
+
+# What the debug flag of the group creators means: everything, printed as it happens
+def debugTracer() -> Tracer:
+    return Tracer(level=DEBUG, echo=True)
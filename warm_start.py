@@ -0,0 +1,114 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+import asyncio
+from models import WoWPlayer
+from engine import GroupEngine
+from offload import OffloadResult
+from roster_cache import ChannelRoster
+from tracing import Tracer
+
+# How long the roster has to stay the same before the groups are precomputed, in seconds
+DEFAULT_DEBOUNCE = 2.0
+# Most precomputed groupings kept at once
+DEFAULT_MAX_CANDIDATES = 64
+
+# Roster version, engine version and pairing history sessions the groups were solved from
+Stamp = Tuple[int, int, int]
+
+
+def stampOf(engine: GroupEngine, roster: ChannelRoster) -> Stamp:
+    return (roster.version, engine.version, engine.history.sessions if engine.history is not None else 0)
+
+
+# Groups solved ahead of time, and what they were solved from
+@dataclass
+class Candidate:
+    stamp: Stamp
+    players: List[WoWPlayer]
+    result: OffloadResult
+
+
+# Solves a channel's groups in the background while players gather, so the
+# wheel can use them straight away instead of waiting for the solver.
+#
+# Every roster change calls schedule(), which throws away the channel's
+# candidate and restarts a debounce timer; once the roster has stayed the
+# same for `debounce` seconds the groups are solved with solve(engine,
+# players). take() hands the candidate to the wheel, but only if the roster,
+# the engine's last groups and the pairing history are all still what it
+# was solved from. Otherwise the wheel solves the groups itself as usual.
+class WarmStarter:
+    def __init__(self, solve: Callable[[GroupEngine, List[WoWPlayer]], Awaitable[OffloadResult]],
+                 debounce: float = DEFAULT_DEBOUNCE, maxCandidates: int = DEFAULT_MAX_CANDIDATES,
+                 tracer: Tracer = None):
+        self.solve = solve
+        self.debounce = debounce
+        self.maxCandidates = maxCandidates
+        self.tracer = tracer if tracer is not None else Tracer()
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._candidates: 'OrderedDict[Hashable, Candidate]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._candidates)
+
+    def pending(self, key: Hashable) -> bool:
+        task = self._tasks.get(key)
+        return task is not None and not task.done()
+
+    def candidate(self, key: Hashable) -> Optional[Candidate]:
+        return self._candidates.get(key)
+
+    # The roster changed, so precompute the groups again once it settles. Needs a running event loop.
+    def schedule(self, key: Hashable, engine: GroupEngine, roster: ChannelRoster):
+        self.cancel(key)
+        self._tasks[key] = asyncio.create_task(self._precompute(key, engine, roster))
+
+    async def _precompute(self, key: Hashable, engine: GroupEngine, roster: ChannelRoster):
+        try:
+            await asyncio.sleep(self.debounce)
+            stamp = stampOf(engine, roster)
+            players = roster.players
+            result = await self.solve(engine, players)
+            if result.fallback:
+                self.tracer.info('warm_fallback', lambda: f"Precomputing groups for {key} fell back to greedy",
+                                 key=key)
+            elif stampOf(engine, roster) != stamp:
+                self.tracer.info('warm_stale', lambda: f"Precomputed groups for {key} went stale while solving",
+                                 key=key)
+            else:
+                self._candidates[key] = Candidate(stamp=stamp, players=players, result=result)
+                self._candidates.move_to_end(key)
+                while len(self._candidates) > self.maxCandidates:
+                    self._candidates.popitem(last=False)
+                self.tracer.info('warm_ready', lambda: f"Precomputed {len(result.groups)} groups for {key} "
+                                                       f"in {result.elapsed:.3f}s", key=key, elapsed=result.elapsed)
+        finally:
+            if self._tasks.get(key) is asyncio.current_task():
+                del self._tasks[key]
+
+    # The precomputed groups for the wheel, if they're still up to date. Either way they're used
+    # up, and a precompute still running is stopped since the wheel solves the groups itself.
+    def take(self, key: Hashable, engine: GroupEngine, roster: ChannelRoster) -> Optional[OffloadResult]:
+        candidate = self._candidates.get(key)
+        self.cancel(key)
+        if candidate is None:
+            return None
+        if candidate.stamp != stampOf(engine, roster):
+            self.tracer.info('warm_stale', lambda: f"Precomputed groups for {key} are out of date", key=key)
+            return None
+        self.tracer.info('warm_hit', lambda: f"Using precomputed groups for {key}", key=key)
+        return candidate.result
+
+    # Stops any precompute for the channel and drops its candidate
+    def cancel(self, key: Hashable):
+        self._candidates.pop(key, None)
+        task = self._tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    async def close(self):
+        tasks = list(self._tasks.values())
+        for key in list(self._tasks):
+            self.cancel(key)
+        await asyncio.gather(*tasks, return_exceptions=True)